@@ -29,12 +29,6 @@ const ExamCard = ({ exam, onStartExam, isTeacher }: ExamCardProps) => {
     return now > endTime;
   };
 
-  const isExamStarted = () => {
-    const now = new Date();
-    const startTime = new Date(exam.start_time);
-    return now >= startTime;
-  };
-
   return (
     <div className="min-w-64 rounded-2xl bg-white shadow-lg hover:shadow-xl transition-shadow duration-300 overflow-hidden border-1 border-slate-100">
       <div className="bg-gray-800 text-white text-center py-3 px-4 font-semibold text-md tracking-wide">
@@ -76,20 +70,18 @@ const ExamCard = ({ exam, onStartExam, isTeacher }: ExamCardProps) => {
           ) : (
             <button
               onClick={onStartExam}
-              disabled={exam.status === "completed"}
+              disabled={exam.status !== "live"}
               className={`btn text-white font-semibold py-1 px-3 rounded-xl ${
-                isExamStarted()
+                exam.status === "live"
                   ? "bg-indigo-600 hover:bg-indigo-700"
                   : "bg-gray-400 cursor-not-allowed"
               } transition duration-200`}
             >
-              {isExamStarted()
-                ? exam.status === "pending"
-                  ? "Start"
-                  : exam.status === "completed"
-                  ? "Attempted"
-                  : "Not Started"
-                : "Not Started"}
+              {exam.status === "live"
+                ? "Start"
+                : exam.status === "scheduled"
+                ? "Not Started"
+                : "Closed"}
             </button>
           )}
         </div>
@@ -11,7 +11,9 @@ const MyExams = () => {
   useEffect(() => {
     const fetchExams = async () => {
       try {
-        const response = await api_client.get("/exams");
+        const response = await api_client.get("/exams", {
+          params: { attempted: true },
+        });
         setExams(response.data);
       } catch (error) {
         console.error("Error fetching exams:", error);
@@ -38,8 +40,6 @@ const MyExams = () => {
     );
   }
 
-  const completedExams = exams.filter((exam) => exam.status === "completed");
-
   return (
     <div className="flex">
       <main className="flex-1">
@@ -50,7 +50,7 @@ const MyExams = () => {
 
           <div className="bg-white rounded-lg shadow">
             <div className="divide-y divide-gray-200">
-              {completedExams.map((exam) => (
+              {exams.map((exam) => (
                 <div key={exam.id} className="p-6">
                   <div className="flex justify-between items-start">
                     <div>
@@ -88,7 +88,7 @@ const MyExams = () => {
               ))}
             </div>
 
-            {completedExams.length === 0 && (
+            {exams.length === 0 && (
               <div className="flex justify-center items-center min-h-[200px]">
                 <p className="text-lg text-gray-500">
                   No completed exams found
@@ -1,13 +1,14 @@
 import React, { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import apiClient from "../api_client";
+import { ExamStatus } from "../types";
 
 interface Exam {
   id: number;
   title: string;
   description: string;
   duration: number;
-  status: string;
+  status: ExamStatus;
   score?: number;
   startDateTime?: string;
   subject?: string;
@@ -34,27 +35,30 @@ const StudentExams: React.FC = () => {
     fetchExams();
   }, []);
 
-  const getStatusColor = (status: string) => {
+  const getStatusColor = (status: ExamStatus) => {
     switch (status) {
-      case "not_attempted":
+      case "scheduled":
         return "bg-yellow-100 text-yellow-800";
-      case "in_progress":
+      case "live":
         return "bg-blue-100 text-blue-800";
-      case "completed":
+      case "closed":
+      case "graded":
         return "bg-green-100 text-green-800";
       default:
         return "bg-gray-100 text-gray-800";
     }
   };
 
-  const getStatusText = (status: string) => {
+  const getStatusText = (status: ExamStatus) => {
     switch (status) {
-      case "not_attempted":
-        return "Not Attempted";
-      case "in_progress":
-        return "In Progress";
-      case "completed":
-        return "Completed";
+      case "scheduled":
+        return "Scheduled";
+      case "live":
+        return "Live";
+      case "closed":
+        return "Closed";
+      case "graded":
+        return "Graded";
       default:
         return status;
     }
@@ -229,7 +233,7 @@ const StudentExams: React.FC = () => {
                   )}
                 </div>
 
-                {exam.status === "not_attempted" && (
+                {exam.status === "live" && (
                   <button
                     onClick={() => navigate(`/exam/${exam.id}`)}
                     className="w-full bg-primary hover:bg-primary/90 text-white font-medium py-2 px-4 rounded-lg transition-colors duration-300 flex items-center justify-center"
@@ -7,13 +7,15 @@ interface Question {
     options: string[];
 }
 
+export type ExamStatus = "scheduled" | "live" | "closed" | "graded";
+
 export interface Exam {
     id: number;
     title: string;
     description: string;
     start_time: string;
     end_time: string;
-    status: string;
+    status: ExamStatus;
     duration_minutes: number;
     faculty_id: number;
     is_active: boolean;
@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from typing import List, Optional
+
+from app.auth.auth import get_current_faculty
+from app.config import settings
+from app.database.db import metrics
+from app.profiling import profiler
+from app.singleflight import FLIGHTS
+from app.users.models import User
+from . import schemas
+
+router = APIRouter()
+
+
+@router.get("/db", response_model=schemas.DatabaseStats)
+def database_stats(current_user: User = Depends(get_current_faculty)):
+    """Connection pool saturation, slowest recent statements, transaction
+    durations and lock waits"""
+    return metrics.report()
+
+
+@router.get("/coalescing", response_model=List[schemas.FlightStats])
+def coalescing_stats(current_user: User = Depends(get_current_faculty)):
+    """Loads run and loads shared by concurrent identical requests, per kind,
+    in this worker process"""
+    return [flight.stats() for flight in FLIGHTS.values()]
+
+
+@router.post(
+    "/profile",
+    response_model=schemas.ProfileReport,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def start_profile(
+    options: schemas.ProfileStart,
+    current_user: User = Depends(get_current_faculty),
+):
+    """Sample the stacks of requests in this worker process for a while"""
+    if options.seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Profile at most {settings.PROFILE_MAX_SECONDS} seconds",
+        )
+    interval = max(options.interval_ms, settings.PROFILE_MIN_INTERVAL_MS) / 1000
+    session = profiler.start(
+        options.seconds, interval, options.routes, options.sample_rate
+    )
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running",
+        )
+    return session.report()
+
+
+@router.get("/profile", response_model=schemas.ProfileReport)
+def profile_report(current_user: User = Depends(get_current_faculty)):
+    """Samples per route and the functions they were in, of the running or
+    last profile"""
+    return _profile().report()
+
+
+@router.get("/profile/collapsed", response_class=PlainTextResponse)
+def profile_collapsed(
+    route: Optional[str] = None,
+    current_user: User = Depends(get_current_faculty),
+):
+    """Collapsed stacks for flamegraph.pl or speedscope, optionally of the
+    routes containing ``route``"""
+    return PlainTextResponse(_profile().collapsed(route))
+
+
+@router.delete("/profile", response_model=schemas.ProfileReport)
+def stop_profile(current_user: User = Depends(get_current_faculty)):
+    """Stop the running profile early"""
+    _profile()
+    return profiler.stop().report()
+
+
+def _profile():
+    if profiler.session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No profile has run"
+        )
+    return profiler.session
@@ -0,0 +1,108 @@
+from pydantic import BaseModel, Field
+from typing import Any, List, Optional
+
+
+class PoolStats(BaseModel):
+    name: str
+    pool_class: str
+    size: Optional[int] = None
+    checkedout: Optional[int] = None
+    checkedin: Optional[int] = None
+    overflow: Optional[int] = None
+    max_overflow: Optional[int] = None
+    timeout: Optional[float] = None
+    checkouts: int
+
+
+class Durations(BaseModel):
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class TransactionStats(BaseModel):
+    completed: int
+    open: int
+    duration: Durations
+    connection_wait: Durations
+
+
+class WriterQueueStats(BaseModel):
+    waiting: int
+    turns: int
+    waits: int
+    timeouts: int
+    wait_ms: float
+    max_wait_ms: float
+
+
+class SlowStatement(BaseModel):
+    duration_ms: float
+    statement: str
+    parameters: Any
+    at: float
+
+
+class EngineStats(BaseModel):
+    name: str
+    statements: int
+    statement_ms: float
+    errors: int
+    lock_errors: int
+    last_lock_error: Optional[str] = None
+    slowest: List[SlowStatement]
+
+
+class DatabaseStats(BaseModel):
+    pools: List[PoolStats]
+    transactions: TransactionStats
+    writer_queue: Optional[WriterQueueStats] = None
+    engines: List[EngineStats]
+
+
+class FlightStats(BaseModel):
+    name: str
+    loads: int
+    shared: int
+    errors: int
+    in_flight: int
+    coalesced_ratio: float
+
+
+class ProfileStart(BaseModel):
+    seconds: float = Field(10, gt=0)
+    interval_ms: float = 10
+    # Route paths such as "/exams/{exam_id}/submit", empty for every route
+    routes: List[str] = []
+    sample_rate: float = Field(1.0, gt=0, le=1)
+
+
+class RouteProfile(BaseModel):
+    route: str
+    requests: int
+    samples: int
+    share: float
+
+
+class FrameProfile(BaseModel):
+    frame: str
+    samples: int
+    share: float
+
+
+class ProfileReport(BaseModel):
+    running: bool
+    started_at: float
+    elapsed_seconds: float
+    seconds: float
+    interval_ms: float
+    routes_filter: List[str]
+    sample_rate: float
+    ticks: int
+    samples: int
+    truncated: int
+    sampler_cpu_seconds: float
+    overhead: float
+    routes: List[RouteProfile]
+    top_frames: List[FrameProfile]
@@ -4,6 +4,12 @@ from app.auth.api import router as auth_router
 from app.users.api import router as users_router
 from app.exams.api import router as exams_router
 from app.faculty.api import router as faculty_router
+from app.jobs.api import router as jobs_router
+from app.bank.api import router as bank_router
+from app.reports.api import router as reports_router
+from app.proctoring.api import router as proctoring_router
+from app.admin.api import router as admin_router
+from app.changes.api import router as changes_router
 
 router = APIRouter()
 
@@ -11,3 +17,9 @@ router.include_router(auth_router, prefix="/auth", tags=["auth"])
 router.include_router(users_router, prefix="/users", tags=["users"])
 router.include_router(exams_router, prefix="/exams", tags=["exams"])
 router.include_router(faculty_router, prefix="/faculty", tags=["faculty"])
+router.include_router(jobs_router, prefix="/jobs", tags=["jobs"])
+router.include_router(bank_router, prefix="/bank", tags=["bank"])
+router.include_router(reports_router, prefix="/reports", tags=["reports"])
+router.include_router(proctoring_router, prefix="/proctoring", tags=["proctoring"])
+router.include_router(admin_router, prefix="/admin", tags=["admin"])
+router.include_router(changes_router, prefix="/changes", tags=["changes"])
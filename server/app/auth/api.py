@@ -1,17 +1,18 @@
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app.database.db import get_db
-from app.auth.auth import verify_password, create_access_token
+from app.auth.auth import verify_password
+from app.auth import refresh
+from app.auth import schemas as auth_schemas
 from app.users import models, schemas
 
 router = APIRouter()
 
 
 @router.post("/token", response_model=schemas.Token)
-async def login_for_access_token(
+def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
 ):
     user = (
@@ -26,8 +27,23 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": user.roll_number}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return refresh.session_tokens(db, user)
+
+
+@router.post("/refresh", response_model=schemas.Token)
+def refresh_access_token(
+    body: auth_schemas.RefreshRequest, db: Session = Depends(get_db)
+):
+    """Trade a refresh token for a new access token and refresh token.
+
+    Each refresh token works once; using one again ends its session.
+    """
+    user, refresh_token = refresh.rotate(db, body.refresh_token)
+    return refresh.session_tokens(db, user, refresh_token)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(body: auth_schemas.LogoutRequest, db: Session = Depends(get_db)):
+    """Revoke the session of a refresh token, or all of its user's sessions"""
+    refresh.revoke(db, body.refresh_token, everywhere=body.everywhere)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
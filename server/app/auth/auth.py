@@ -11,6 +11,10 @@ from app.database.db import get_db
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from app.users.models import User
+from app.singleflight import SingleFlight, attach, row_values
+
+# Requests of the same user arriving together look it up once
+user_lookups = SingleFlight("user_lookup")
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
@@ -56,14 +60,19 @@ async def get_current_user(
         print(e)
         raise credentials_exception
 
+    values = await user_lookups.do_async(roll_number, _user_values, db, roll_number)
+    if values is None:
+        raise credentials_exception
+    return attach(db, User, values)
+
+
+def _user_values(db: Session, subject: str):
     user = (
         db.query(User)
-        .filter(or_(User.roll_number == roll_number, User.email == roll_number))
+        .filter(or_(User.roll_number == subject, User.email == subject))
         .first()
     )
-    if user is None:
-        raise credentials_exception
-    return user
+    return row_values(user)
 
 
 async def get_current_faculty(current_user: User = Depends(get_current_user)) -> User:
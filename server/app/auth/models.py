@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+
+from app.database.db import Base
+
+
+class RefreshToken(Base):
+    """One refresh token of a login session; only its HMAC is stored.
+
+    Every refresh replaces the token with a new one of the same family. A
+    token presented twice means it leaked, and the whole family is revoked.
+    """
+
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    family = Column(String(32), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    used_at = Column(DateTime)  # rotated into a newer token
+    revoked_at = Column(DateTime)
@@ -0,0 +1,154 @@
+"""Rotating refresh tokens.
+
+A refresh token is 32 random bytes handed to the client once; the server keeps
+an HMAC-SHA256 of it (keyed with ``SECRET_KEY``) under a unique index, so
+renewing a session is one hash and one indexed lookup, no bcrypt. Each use
+marks the token used and issues its successor in the same family. Presenting
+a used or revoked token revokes the family: either the client or an attacker
+holds a stolen copy, and both have to log in again.
+"""
+
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timedelta
+from typing import Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.users.models import User
+from .auth import create_access_token
+from .models import RefreshToken
+
+
+def token_hash(token: str) -> str:
+    return hmac.new(
+        settings.SECRET_KEY.encode(), token.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def invalid_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def issue(db: Session, user: User, family: str = None) -> str:
+    """A new refresh token for ``user``, starting a family unless given one.
+
+    The caller commits.
+    """
+    token = secrets.token_urlsafe(32)
+    now = datetime.utcnow()
+    db.add(
+        RefreshToken(
+            user_id=user.id,
+            family=family or secrets.token_hex(16),
+            token_hash=token_hash(token),
+            created_at=now,
+            expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    return token
+
+
+def subject(user: User) -> str:
+    # What each login endpoint puts in "sub", see get_current_user
+    return user.email if user.is_faculty else user.roll_number
+
+
+def session_tokens(db: Session, user: User, refresh_token: str = None) -> dict:
+    """Access token for ``user`` with a refresh token, new unless given."""
+    if refresh_token is None:
+        refresh_token = issue(db, user)
+        db.commit()
+    access_token = create_access_token(
+        data={"sub": subject(user)},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+
+def revoke_family(db: Session, family: str):
+    db.query(RefreshToken).filter(
+        RefreshToken.family == family, RefreshToken.revoked_at.is_(None)
+    ).update({"revoked_at": datetime.utcnow()}, synchronize_session=False)
+
+
+def revoke_user(db: Session, user_id: int):
+    db.query(RefreshToken).filter(
+        RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None)
+    ).update({"revoked_at": datetime.utcnow()}, synchronize_session=False)
+
+
+def rotate(db: Session, token: str) -> Tuple[User, str]:
+    """Spend ``token``: its user and the refresh token replacing it."""
+    row = (
+        db.query(RefreshToken)
+        .filter(RefreshToken.token_hash == token_hash(token))
+        .first()
+    )
+    if row is None:
+        raise invalid_token()
+    now = datetime.utcnow()
+    if row.revoked_at is not None or row.used_at is not None:
+        revoke_family(db, row.family)
+        db.commit()
+        raise invalid_token()
+    if row.expires_at <= now:
+        raise invalid_token()
+
+    # Claim the token; a concurrent refresh with the same token loses here
+    claimed = (
+        db.query(RefreshToken)
+        .filter(
+            RefreshToken.id == row.id,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+        )
+        .update({"used_at": now}, synchronize_session=False)
+    )
+    user = db.query(User).filter(User.id == row.user_id).first()
+    if not claimed or user is None or not user.is_active:
+        db.rollback()
+        revoke_family(db, row.family)
+        db.commit()
+        raise invalid_token()
+    successor = issue(db, user, row.family)
+    db.commit()
+    return user, successor
+
+
+def revoke(db: Session, token: str, everywhere: bool = False):
+    """Log out the session of ``token``, or every session of its user."""
+    row = (
+        db.query(RefreshToken)
+        .filter(RefreshToken.token_hash == token_hash(token))
+        .first()
+    )
+    if row is None:
+        raise invalid_token()
+    if everywhere:
+        revoke_user(db, row.user_id)
+    else:
+        revoke_family(db, row.family)
+    db.commit()
+
+
+def purge(db: Session) -> int:
+    """Delete tokens that expired, they can no longer be used or reused."""
+    deleted = (
+        db.query(RefreshToken)
+        .filter(RefreshToken.expires_at < datetime.utcnow())
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
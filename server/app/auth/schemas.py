@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: str
+    everywhere: bool = False  # end every session of the user
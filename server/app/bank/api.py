@@ -0,0 +1,172 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from typing import List
+import json
+from datetime import UTC, datetime
+
+from app.changes import log as changes
+from app.database.db import get_db
+from app.auth.auth import get_current_faculty
+from app.exams import models as exam_models
+from app.exams import schemas as exam_schemas
+from app.exams.models import Question
+from app.users.models import User
+from . import models, schemas
+from .search import get_index, normalize_tags
+
+router = APIRouter()
+
+
+def bank_questions(db: Session):
+    return db.query(Question).filter(Question.exam_id.is_(None))
+
+
+def get_own_exam(exam_id: int, db: Session, current_user: User) -> exam_models.Exam:
+    exam = (
+        db.query(exam_models.Exam)
+        .filter(
+            exam_models.Exam.id == exam_id,
+            exam_models.Exam.faculty_id == current_user.id,
+        )
+        .first()
+    )
+    if not exam:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Exam not found"
+        )
+    return exam
+
+
+@router.post("/questions", response_model=List[schemas.BankQuestion])
+def add_questions(
+    questions: List[schemas.BankQuestionCreate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    """Add questions to the shared bank and index them for search"""
+    if not questions:
+        return []
+    index = get_index(db)
+    rows = [
+        {
+            "exam_id": None,
+            "faculty_id": current_user.id,
+            "question_text": q.question_text,
+            "marks": q.marks,
+            "options": json.dumps(q.options),
+            "correct_answer": q.correct_answer,
+            "tags": normalize_tags(q.tags),
+        }
+        for q in questions
+    ]
+    ids = db.scalars(
+        insert(Question).returning(Question.id, sort_by_parameter_order=True), rows
+    ).all()
+    index.add(db, [(i, r["question_text"], r["tags"]) for i, r in zip(ids, rows)])
+    changes.record(
+        db, Question, "insert", [dict(r, id=i) for i, r in zip(ids, rows)]
+    )
+    db.commit()
+    return bank_questions(db).filter(Question.id.in_(ids)).order_by(Question.id).all()
+
+
+@router.get("/questions/search", response_model=schemas.BankSearchResult)
+def search_questions(
+    q: str = "",
+    tags: List[str] = Query([]),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    """Search bank questions by words in their text or tags, and by exact tags"""
+    index = get_index(db)
+    ids = index.search(db, q, normalize_tags(tags).split(), limit)
+    if ids is None:
+        results = bank_questions(db).order_by(Question.id.desc()).limit(limit).all()
+    else:
+        found = {r.id: r for r in bank_questions(db).filter(Question.id.in_(ids))}
+        results = [found[i] for i in ids if i in found]
+    return {"backend": index.name, "results": results}
+
+
+@router.get("/questions/{question_id}", response_model=schemas.BankQuestion)
+def get_question(
+    question_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    question = bank_questions(db).filter(Question.id == question_id).first()
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    return question
+
+
+@router.post("/exams/{exam_id}/questions", response_model=exam_schemas.Exam)
+def attach_questions(
+    exam_id: int,
+    body: schemas.AttachQuestions,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    """Attach bank questions to an exam, after any already attached"""
+    exam = get_own_exam(exam_id, db, current_user)
+    wanted = list(dict.fromkeys(body.question_ids))
+    found = {
+        i for (i,) in bank_questions(db).with_entities(Question.id).filter(
+            Question.id.in_(wanted)
+        )
+    }
+    missing = [i for i in wanted if i not in found]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Not bank questions: {missing}",
+        )
+
+    links = db.query(models.ExamBankQuestion).filter(
+        models.ExamBankQuestion.exam_id == exam_id
+    )
+    attached = {link.question_id for link in links}
+    position = (
+        db.query(func.coalesce(func.max(models.ExamBankQuestion.position), -1))
+        .filter(models.ExamBankQuestion.exam_id == exam_id)
+        .scalar()
+    )
+    for question_id in wanted:
+        if question_id not in attached:
+            position += 1
+            db.add(
+                models.ExamBankQuestion(
+                    exam_id=exam_id, question_id=question_id, position=position
+                )
+            )
+    # A new version of the paper: cached copies of it are keyed on this
+    exam.updated_at = datetime.now(UTC)
+    db.commit()
+    db.refresh(exam)
+    return exam
+
+
+@router.delete("/exams/{exam_id}/questions/{question_id}", response_model=exam_schemas.Exam)
+def detach_question(
+    exam_id: int,
+    question_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    exam = get_own_exam(exam_id, db, current_user)
+    deleted = (
+        db.query(models.ExamBankQuestion)
+        .filter(
+            models.ExamBankQuestion.exam_id == exam_id,
+            models.ExamBankQuestion.question_id == question_id,
+        )
+        .delete()
+    )
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Question not attached")
+    exam.updated_at = datetime.now(UTC)
+    db.commit()
+    db.refresh(exam)
+    return exam
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, ForeignKey, Integer
+from app.database.db import Base
+
+
+class ExamBankQuestion(Base):
+    """Attaches a bank question to an exam without copying it"""
+
+    __tablename__ = "exam_bank_questions"
+
+    exam_id = Column(Integer, ForeignKey("exams.id"), primary_key=True)
+    question_id = Column(
+        Integer, ForeignKey("questions.id"), primary_key=True, index=True
+    )
+    position = Column(Integer, default=0)
@@ -0,0 +1,47 @@
+from pydantic import BaseModel, validator
+from typing import List, Optional
+import json
+
+
+class BankQuestionCreate(BaseModel):
+    question_text: str
+    marks: int
+    options: List[str]
+    correct_answer: str
+    tags: List[str] = []
+
+
+class BankQuestion(BaseModel):
+    id: int
+    question_text: str
+    marks: int
+    options: List[str]
+    correct_answer: str
+    tags: List[str]
+    faculty_id: Optional[int] = None
+
+    @validator("options", pre=True)
+    def parse_options(cls, v):
+        if isinstance(v, str):
+            return json.loads(v)
+        return v
+
+    @validator("tags", pre=True)
+    def split_tags(cls, v):
+        if v is None:
+            return []
+        if isinstance(v, str):
+            return v.split()
+        return v
+
+    class Config:
+        from_attributes = True
+
+
+class BankSearchResult(BaseModel):
+    backend: str
+    results: List[BankQuestion]
+
+
+class AttachQuestions(BaseModel):
+    question_ids: List[int]
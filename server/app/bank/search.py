@@ -0,0 +1,219 @@
+"""Full-text search over bank questions.
+
+The backend follows the database: an FTS5 table on SQLite, a GIN expression
+index over ``to_tsvector`` on PostgreSQL, and an in-process inverted index for
+anything else (or SQLite databases without the FTS5 table). All of them match
+every query word against question text and tags, and every requested tag
+exactly.
+
+The FTS5 table and the GIN index are created, and the FTS5 table filled from
+the bank, by the ``create_bank_search_index`` migration or ``create_index``
+(init-db, ``DB_CREATE_ALL``), never while serving a request.
+"""
+
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.exams.models import Question
+
+WORD = re.compile(r"\w+", re.UNICODE)
+TAG = re.compile(r"[\w-]+", re.UNICODE)
+
+
+def words(value: Optional[str]) -> List[str]:
+    return WORD.findall((value or "").lower())
+
+
+def normalize_tags(tags: Iterable[str]) -> str:
+    seen = []
+    for tag in tags:
+        for t in TAG.findall(tag.lower()):
+            if t not in seen:
+                seen.append(t)
+    return " ".join(seen)
+
+
+class Fts5Index:
+    name = "fts5"
+    CREATE = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS question_bank_fts "
+        "USING fts5(question_text, tags, tokenize='unicode61')"
+    )
+    # Bank questions not indexed yet
+    BACKFILL = (
+        "INSERT INTO question_bank_fts (rowid, question_text, tags) "
+        "SELECT id, question_text, coalesce(tags, '') FROM questions "
+        "WHERE exam_id IS NULL "
+        "AND id NOT IN (SELECT rowid FROM question_bank_fts)"
+    )
+
+    @staticmethod
+    def exists(db: Session) -> bool:
+        return (
+            db.execute(
+                text(
+                    "SELECT 1 FROM sqlite_master "
+                    "WHERE type = 'table' AND name = 'question_bank_fts'"
+                )
+            ).first()
+            is not None
+        )
+
+    def add(self, db: Session, rows: List[Tuple[int, str, str]]):
+        db.execute(
+            text(
+                "INSERT INTO question_bank_fts (rowid, question_text, tags) "
+                "VALUES (:id, :question_text, :tags)"
+            ),
+            [{"id": i, "question_text": t, "tags": g or ""} for i, t, g in rows],
+        )
+
+    def search(
+        self, db: Session, query: str, tags: List[str], limit: int
+    ) -> Optional[List[int]]:
+        terms = [f'"{w}"' for w in words(query)]
+        terms += [f'tags:"{t}"' for t in tags]
+        if not terms:
+            return None
+        rows = db.execute(
+            text(
+                "SELECT rowid FROM question_bank_fts WHERE question_bank_fts MATCH :q "
+                "ORDER BY bm25(question_bank_fts) LIMIT :limit"
+            ),
+            {"q": " AND ".join(terms), "limit": limit},
+        )
+        return [row[0] for row in rows]
+
+
+class PostgresIndex:
+    name = "tsvector"
+    DOCUMENT = (
+        "to_tsvector('simple', coalesce(question_text, '') || ' ' || "
+        "coalesce(tags, ''))"
+    )
+
+    CREATE = (
+        "CREATE INDEX IF NOT EXISTS ix_questions_bank_search ON questions "
+        f"USING GIN (({DOCUMENT})) WHERE exam_id IS NULL"
+    )
+
+    def add(self, db: Session, rows):
+        # The expression index maintains itself
+        pass
+
+    def search(self, db, query, tags, limit):
+        terms = words(query) + tags
+        if not terms:
+            return None
+        rows = db.execute(
+            text(
+                f"SELECT id FROM questions WHERE exam_id IS NULL AND {self.DOCUMENT} "
+                "@@ to_tsquery('simple', :q) "
+                f"ORDER BY ts_rank({self.DOCUMENT}, to_tsquery('simple', :q)) DESC "
+                "LIMIT :limit"
+            ),
+            {"q": " & ".join(terms), "limit": limit},
+        )
+        # Word matches may come from the text, tags have to be actual tags
+        ids = [row[0] for row in rows]
+        if tags and ids:
+            found = db.query(Question.id, Question.tags).filter(Question.id.in_(ids))
+            tagged = {i for i, g in found if set(tags) <= set((g or "").split())}
+            ids = [i for i in ids if i in tagged]
+        return ids
+
+
+class InvertedIndex:
+    """In-process posting lists, rebuilt when another process adds questions."""
+
+    name = "inverted"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._words: Dict[str, Set[int]] = defaultdict(set)
+        self._tags: Dict[str, Set[int]] = defaultdict(set)
+        self._state = None
+
+    def _index(self, rows):
+        for question_id, question_text, tags in rows:
+            for w in words(question_text) + words(tags):
+                self._words[w].add(question_id)
+            for t in (tags or "").split():
+                self._tags[t].add(question_id)
+
+    def add(self, db: Session, rows):
+        with self._lock:
+            if self._state is not None:
+                self._index(rows)
+                count, max_id = self._state
+                self._state = (count + len(rows), max(max_id, *(r[0] for r in rows)))
+
+    def _refresh(self, db: Session):
+        state = tuple(
+            db.query(func.count(Question.id), func.coalesce(func.max(Question.id), 0))
+            .filter(Question.exam_id.is_(None))
+            .one()
+        )
+        if state == self._state:
+            return
+        self._words.clear()
+        self._tags.clear()
+        self._index(
+            db.query(Question.id, Question.question_text, Question.tags)
+            .filter(Question.exam_id.is_(None))
+            .yield_per(5000)
+        )
+        self._state = state
+
+    def search(self, db, query, tags, limit):
+        with self._lock:
+            self._refresh(db)
+            postings = [self._words.get(w, set()) for w in words(query)]
+            postings += [self._tags.get(t, set()) for t in tags]
+            if not postings:
+                return None
+            postings.sort(key=len)
+            matches = set(postings[0]).intersection(*postings[1:])
+        return sorted(matches, reverse=True)[:limit]
+
+
+def create_index(bind: Engine):
+    """Create the search index of ``bind``'s database and index the bank."""
+    dialect = bind.dialect.name
+    with bind.begin() as conn:
+        if dialect == "postgresql":
+            conn.execute(text(PostgresIndex.CREATE))
+        elif dialect == "sqlite":
+            try:
+                conn.execute(text(Fts5Index.CREATE))
+            except OperationalError:
+                # SQLite compiled without FTS5: searches use the inverted index
+                return
+            conn.execute(text(Fts5Index.BACKFILL))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(db: Session):
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                dialect = db.get_bind().dialect.name
+                if dialect == "postgresql":
+                    # Without the GIN index searches still work, unindexed
+                    _index = PostgresIndex()
+                elif dialect == "sqlite" and Fts5Index.exists(db):
+                    _index = Fts5Index()
+                else:
+                    _index = InvertedIndex()
+    return _index
@@ -0,0 +1,152 @@
+import heapq
+from datetime import UTC, datetime, timedelta
+from itertools import islice
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database.db import get_db
+from app.auth.auth import get_current_user
+from app.exams import shards
+from app.exams.models import Exam
+from app.users.models import User
+from . import log, models, schemas  # noqa: F401  (log registers the flush hook)
+
+router = APIRouter()
+
+
+def parse_cursor(since: str) -> List[int]:
+    """Positions in the primary's change log, then in each shard's."""
+    try:
+        positions = [int(position) for position in since.split(".")]
+    except ValueError:
+        positions = [-1]
+    if any(position < 0 for position in positions):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    # Shards added since the cursor was handed out are read from their start
+    return (positions + [0] * shards.count())[: shards.count()]
+
+
+def visible(user: User, exam_ids: List[int], primary: bool):
+    """The changes of rows ``user`` can read through the REST endpoints."""
+    Change = models.Change
+    if not user.is_faculty:
+        # Questions carry their answers: students get exams and their own rows
+        return or_(Change.entity == "exam", Change.user_id == user.id)
+    clauses = [
+        # Their exams with their questions and submissions, bank questions
+        Change.exam_id.in_(exam_ids),
+        and_(Change.entity == "exam", Change.user_id == user.id),
+        and_(Change.entity == "question", Change.exam_id.is_(None)),
+    ]
+    if primary:
+        # Users live on the primary: themselves and the students
+        students = select(User.id).where(User.is_faculty.is_(False))
+        clauses.append(
+            and_(
+                Change.entity == "user",
+                or_(Change.user_id == user.id, Change.user_id.in_(students)),
+            )
+        )
+    return or_(*clauses)
+
+
+def read_changes(
+    db: Session, after: int, limit: int, scope, settled: datetime
+) -> List[models.Change]:
+    """Changes after ``after`` within ``scope``, in log order."""
+    oldest = (
+        db.query(models.Change.id, models.Change.op)
+        .order_by(models.Change.id)
+        .first()
+    )
+    if oldest is not None and (
+        # A purge leaves its newest entry behind, emptied
+        after < oldest.id if oldest.op == log.PURGED else after + 1 < oldest.id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Cursor expired, sync again from the full listings",
+        )
+    rows = (
+        db.query(models.Change)
+        .filter(models.Change.id > after, scope)
+        .order_by(models.Change.id)
+        .limit(limit + 1)
+        .all()
+    )
+    # Recent entries wait, so that a transaction committing after a later
+    # one is not skipped
+    for index, row in enumerate(rows):
+        if row.changed_at > settled:
+            return rows[:index]
+    return rows
+
+
+@router.get("", response_model=schemas.ChangeFeed)
+def get_changes(
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Exams, questions, submissions and users changed after the cursor
+
+    Without ``since`` only the current cursor is returned: fetch the full
+    listings, then follow the changes from there.
+    """
+    if since is None:
+        positions = [
+            source.query(func.max(models.Change.id)).scalar() or 0
+            for source in shards.submission_dbs(db)
+        ]
+        return {
+            "changes": [],
+            "cursor": ".".join(map(str, positions)),
+            "has_more": False,
+        }
+
+    positions = parse_cursor(since)
+    settled = datetime.now(UTC).replace(tzinfo=None) - timedelta(
+        seconds=settings.CHANGE_FEED_LAG_SECONDS
+    )
+    exam_ids = []
+    if current_user.is_faculty:
+        exam_ids = [
+            exam_id
+            for (exam_id,) in db.query(Exam.id).filter(
+                Exam.faculty_id == current_user.id
+            )
+        ]
+    fetched = [
+        [
+            (number, row)
+            for row in read_changes(
+                source,
+                positions[number],
+                limit,
+                visible(current_user, exam_ids, number == 0),
+                settled,
+            )
+        ]
+        for number, source in enumerate(shards.submission_dbs(db))
+    ]
+    # Each log stays in id order, the logs interleave by time
+    changes = list(
+        islice(
+            heapq.merge(*fetched, key=lambda change: (change[1].changed_at, change[0])),
+            limit,
+        )
+    )
+    for number, row in changes:
+        positions[number] = row.id
+    return {
+        "changes": [row for _, row in changes],
+        "cursor": ".".join(map(str, positions)),
+        "has_more": sum(map(len, fetched)) > len(changes),
+    }
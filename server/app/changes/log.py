@@ -0,0 +1,180 @@
+"""Change log behind the delta-sync feed at ``GET /api/changes``.
+
+Every flush that inserts, updates or deletes an exam, question, submission or
+user also logs one ``change_log`` entry per changed row. Inserts log the whole
+row, updates only the columns that changed, deletes only the id. Columns in
+``EXCLUDED`` are never logged.
+
+Entries are kept on the session and written through its connection when it
+commits, so a change and its entry commit or roll back together, and entries
+get their ids (the feed positions) and timestamps moments before they become
+visible. A transaction that stays open after flushing therefore can't commit
+entries behind positions readers have already passed.
+
+Writes that bypass the unit of work (executemany inserts, UPDATE statements)
+log themselves with ``record``. Submissions on a shard are logged in that
+shard's ``change_log``.
+"""
+
+import json
+from datetime import UTC, date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, func, insert, inspect
+from sqlalchemy.orm import Session
+
+from app.exams.models import Exam, ExamSubmission, Question
+from app.users.models import User
+from .models import Change
+
+TRACKED = {
+    Exam: "exam",
+    Question: "question",
+    ExamSubmission: "submission",
+    User: "user",
+}
+# Column naming the user a row belongs to: a student, or an exam's faculty
+OWNERS = {"exam": "faculty_id", "submission": "student_id", "user": "id"}
+# Column naming the exam of a row, None for bank questions
+EXAMS = {"exam": "id", "question": "exam_id", "submission": "exam_id"}
+# Never written to the log
+EXCLUDED = {"hashed_password"}
+# Entries left by a purge: changes up to theirs are gone
+PURGED = "purged"
+# Session.info key of the entries waiting for the commit
+PENDING = "pending_changes"
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _entry(entity: str, op: str, entity_id: int, data: Optional[Dict], row: Dict):
+    owner, exam = OWNERS.get(entity), EXAMS.get(entity)
+    return {
+        "entity": entity,
+        "entity_id": entity_id,
+        "op": op,
+        "data": json.dumps(data, default=_encode) if data else None,
+        "user_id": row.get(owner) if owner else None,
+        "exam_id": row.get(exam) if exam else None,
+    }
+
+
+def _pend(session: Session, entries: List[Dict]):
+    session.info.setdefault(PENDING, []).extend(entries)
+
+
+def _columns(state, changed_only: bool) -> Dict:
+    data = {}
+    for attr in state.mapper.column_attrs:
+        if attr.key in EXCLUDED:
+            continue
+        if changed_only:
+            added = state.attrs[attr.key].history.added
+            if added:
+                data[attr.key] = added[0]
+        elif attr.key in state.dict:
+            data[attr.key] = state.dict[attr.key]
+    return data
+
+
+@event.listens_for(Session, "after_flush")
+def _log_flush(session: Session, flush_context):
+    entries = []
+    for objects, op in (
+        (session.new, "insert"),
+        (session.dirty, "update"),
+        (session.deleted, "delete"),
+    ):
+        for obj in objects:
+            entity = TRACKED.get(type(obj))
+            if entity is None:
+                continue
+            state = inspect(obj)
+            data = None if op == "delete" else _columns(state, op == "update")
+            if op == "update" and not data:
+                continue
+            # Read from the loaded state: a deleted row can't be refreshed, and
+            # new rows get their identity key after the flush
+            entries.append(_entry(entity, op, state.dict["id"], data, state.dict))
+    if entries:
+        _pend(session, entries)
+
+
+@event.listens_for(Session, "before_commit")
+def _write_pending(session: Session):
+    # Objects still pending are flushed (and logged) before the entries go out
+    session.flush()
+    entries = session.info.pop(PENDING, None)
+    if entries:
+        now = datetime.now(UTC).replace(tzinfo=None)
+        for entry in entries:
+            entry["changed_at"] = now
+        session.connection().execute(insert(Change), entries)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending(session: Session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING, None)
+
+
+def record(db: Session, model, op: str, rows: List[Dict]):
+    """Log ``op`` on ``rows`` of ``model``, written without the ORM.
+
+    Each row holds the ``id``, the owner and exam columns of the entity (see
+    ``OWNERS`` and ``EXAMS``) and, unless deleted, the columns it was given.
+    The entries are written when ``db`` commits.
+    """
+    entity = TRACKED[model]
+    keys = {"id", OWNERS.get(entity), EXAMS.get(entity)}
+    entries = [
+        _entry(
+            entity,
+            op,
+            row["id"],
+            None
+            if op == "delete"
+            else {
+                k: v
+                for k, v in row.items()
+                if k not in EXCLUDED and (op == "insert" or k not in keys)
+            },
+            row,
+        )
+        for row in rows
+    ]
+    if entries:
+        _pend(db, entries)
+
+
+def purge(db: Session, before: datetime) -> int:
+    """Delete changes logged before ``before``; cursors older than that expire.
+
+    The newest purged entry stays behind, emptied, as the oldest entry of the
+    log: it tells expired cursors apart even once everything was purged.
+    """
+    last = (
+        db.query(func.max(Change.id)).filter(Change.changed_at < before).scalar()
+    )
+    if last is None:
+        return 0
+    deleted = (
+        db.query(Change).filter(Change.id < last).delete(synchronize_session=False)
+    )
+    emptied = db.query(Change).filter(Change.id == last, Change.op != PURGED).update(
+        {
+            "entity": PURGED,
+            "entity_id": 0,
+            "op": PURGED,
+            "data": None,
+            "user_id": None,
+            "exam_id": None,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    return deleted + emptied
@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from app.database.db import Base
+
+
+class Change(Base):
+    """One insert, update or delete of a synced row; ``id`` is the feed position"""
+
+    __tablename__ = "change_log"
+    # Ids of purged changes are never handed out again
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)  # exam, question, submission, user
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)  # insert, update, delete
+    data = Column(Text)  # JSON of the new or changed columns, none on delete
+    # The user the row belongs to, a student or an exam's faculty
+    user_id = Column(Integer, index=True)
+    # The row's exam, None for users and bank questions
+    exam_id = Column(Integer)
+    changed_at = Column(DateTime, default=datetime.utcnow, index=True)
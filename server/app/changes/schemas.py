@@ -0,0 +1,28 @@
+from pydantic import BaseModel, validator
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import json
+
+
+class Change(BaseModel):
+    entity: str
+    entity_id: int
+    op: str
+    data: Optional[Dict[str, Any]] = None
+    changed_at: datetime
+
+    @validator("data", pre=True)
+    def parse_data(cls, v):
+        if isinstance(v, str):
+            return json.loads(v)
+        return v
+
+    class Config:
+        from_attributes = True
+
+
+class ChangeFeed(BaseModel):
+    changes: List[Change]
+    # Pass back as ?since= for the changes after these
+    cursor: str
+    has_more: bool
@@ -0,0 +1,251 @@
+"""Negotiated response compression.
+
+gzip is always available. zstd (the ``zstandard`` package, or the standard
+library from Python 3.14) and brotli (``brotli``) are offered too when they
+are installed. The client's ``Accept-Encoding`` q-values decide first, then
+the order of ``COMPRESSION_ENCODINGS``.
+
+``CompressionMiddleware`` compresses each response on the fly at a fast
+level. Payloads that many clients download unchanged should be compressed
+once at ``STATIC_LEVELS`` and served with their ``Content-Encoding`` already
+set, which the middleware leaves alone (see app/exams/payloads.py).
+"""
+
+import gzip
+import zlib
+from typing import Callable, Dict, Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import settings
+
+# Per response: cheap levels that still get most of the gain on JSON
+DYNAMIC_LEVELS = {"zstd": 3, "br": 4, "gzip": 6}
+# Compressed once, served many times
+STATIC_LEVELS = {"zstd": 19, "br": 11, "gzip": 9}
+# Larger bodies are compressed off the event loop
+OFFLOAD_BYTES = 64 * 1024
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+class _Stream:
+    def __init__(self, compress: Callable, flush: Callable):
+        self.compress = compress
+        self.flush = flush
+
+
+class Codec:
+    def __init__(self, name: str, compress: Callable, stream: Callable):
+        self.name = name
+        self._compress = compress
+        self._stream = stream
+
+    def compress(self, data: bytes, level: int) -> bytes:
+        return self._compress(data, level)
+
+    def stream(self, level: int) -> _Stream:
+        return self._stream(level)
+
+
+def _gzip() -> Codec:
+    def stream(level):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return _Stream(compressor.compress, compressor.flush)
+
+    return Codec(
+        "gzip",
+        lambda data, level: gzip.compress(data, compresslevel=level, mtime=0),
+        stream,
+    )
+
+
+def _zstd() -> Optional[Codec]:
+    try:
+        from compression import zstd  # Python 3.14+
+
+        def stream(level):
+            compressor = zstd.ZstdCompressor(level=level)
+            return _Stream(compressor.compress, compressor.flush)
+
+        return Codec("zstd", lambda data, level: zstd.compress(data, level), stream)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        return None
+
+    def stream(level):
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        return _Stream(compressor.compress, compressor.flush)
+
+    return Codec(
+        "zstd",
+        lambda data, level: zstandard.ZstdCompressor(level=level).compress(data),
+        stream,
+    )
+
+
+def _brotli() -> Optional[Codec]:
+    try:
+        import brotli
+    except ImportError:
+        return None
+
+    def stream(level):
+        compressor = brotli.Compressor(quality=level)
+        return _Stream(compressor.process, compressor.finish)
+
+    return Codec("br", lambda data, level: brotli.compress(data, quality=level), stream)
+
+
+def available_codecs() -> Dict[str, Codec]:
+    found = {"zstd": _zstd(), "br": _brotli(), "gzip": _gzip()}
+    return {
+        name: found[name]
+        for name in settings.COMPRESSION_ENCODINGS
+        if found.get(name) is not None
+    }
+
+
+CODECS = available_codecs()
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """The encoding to answer a request sending this ``Accept-Encoding`` with."""
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    best, best_q = None, 0.0
+    for name in CODECS:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    return CODECS[encoding].compress(data, level or DYNAMIC_LEVELS[encoding])
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.split(";")[0].strip().lower()
+    return (
+        content_type.startswith("text/")
+        or content_type in COMPRESSIBLE_TYPES
+        or content_type.endswith(("+json", "+xml"))
+    )
+
+
+class CompressionMiddleware:
+    """Compresses text and JSON responses of at least ``minimum_size`` bytes."""
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _Responder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _Responder:
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        # None until the first body message decides, then "pass" or "stream"
+        self.mode = None
+        self.stream: Optional[_Stream] = None
+
+    def _encode_headers(self):
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # Same content, different bytes
+            headers["ETag"] = "W/" + etag
+        return headers
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.mode is None:
+            headers = Headers(raw=self.start["headers"])
+            if (
+                "content-encoding" in headers
+                or not is_compressible(headers.get("content-type", ""))
+                or (not more_body and len(body) < self.minimum_size)
+            ):
+                self.mode = "pass"
+            elif not more_body:
+                await self._send_whole(body)
+                return
+            else:
+                self.mode = "stream"
+                headers = self._encode_headers()
+                del headers["Content-Length"]
+                self.stream = CODECS[self.encoding].stream(
+                    DYNAMIC_LEVELS[self.encoding]
+                )
+                await self._send(self.start)
+
+        if self.mode == "pass":
+            if self.start is not None:
+                await self._send(self.start)
+                self.start = None
+            await self._send(message)
+            return
+
+        chunk = self.stream.compress(body)
+        if not more_body:
+            chunk += self.stream.flush()
+        if chunk or not more_body:
+            await self._send(
+                {"type": "http.response.body", "body": chunk, "more_body": more_body}
+            )
+
+    async def _send_whole(self, body: bytes):
+        if len(body) > OFFLOAD_BYTES:
+            compressed = await anyio.to_thread.run_sync(compress, body, self.encoding)
+        else:
+            compressed = compress(body, self.encoding)
+        self.mode = "pass"
+        if len(compressed) < len(body):
+            headers = self._encode_headers()
+            headers["Content-Length"] = str(len(compressed))
+            body = compressed
+        await self._send(self.start)
+        self.start = None
+        await self._send({"type": "http.response.body", "body": body})
@@ -5,11 +5,106 @@ from typing import List
 class Settings(BaseSettings):
     # Database settings
     DATABASE_URL: str = "sqlite:///./examination.db"
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 disables recycling
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 500
+    # Create missing tables at startup; turn off where Alembic or
+    # `python cli.py init-db` manage the schema
+    DB_CREATE_ALL: bool = True
+    # Pool, statement and transaction metrics served at /api/admin/db
+    DB_METRICS: bool = True
+    DB_SLOW_STATEMENTS: int = 20  # slowest statements kept per engine
+    DB_METRICS_WINDOW_SECONDS: int = 300  # how long a slow statement is kept
+
+    # Read replicas serving read-only endpoints (empty: everything on primary)
+    DATABASE_REPLICA_URLS: List[str] = []
+    REPLICA_STICKY_SECONDS: int = 10  # read-your-writes window after a write
+    REPLICA_RETRY_SECONDS: int = 30  # how long a failing replica is skipped
+
+    # Extra databases holding exam submissions, spread by exam (empty: all on
+    # the primary). See app/exams/shards.py
+    SUBMISSION_SHARD_URLS: List[str] = []
+    SUBMISSION_SHARD_MAP_SECONDS: int = 60  # how long an exam's shard is cached
+    SUBMISSION_ID_BLOCK: int = 1000  # submission ids reserved at a time
+
+    # SQLite tuning (ignored for other databases)
+    SQLITE_WAL: bool = True
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_SINGLE_WRITER: bool = True
+
+    # Per-student paper layouts kept in memory
+    PAPER_CACHE_SIZE: int = 50_000
+
+    # Submissions of exams closed this long ago move to the archive tables
+    ARCHIVE_AFTER_DAYS: int = 30
+
+    # Columnar snapshot behind the cross-exam reports
+    REPORTS_DIR: str = "./reports"
+    REPORT_SNAPSHOT_INTERVAL_MINUTES: int = 60  # 0 disables periodic rebuilds
+
+    # Rank index per exam, reloaded from the database when older than this
+    LEADERBOARD_REFRESH_SECONDS: int = 60
+
+    # Exam status transitions (app/exams/lifecycle.py): exams created by other
+    # processes are picked up after at most this long
+    LIFECYCLE_RELOAD_SECONDS: int = 300
+    # A failed finalization is retried after this long, doubling each time,
+    # until it failed this many times
+    FINALIZE_RETRY_SECONDS: int = 300
+    FINALIZE_MAX_ATTEMPTS: int = 5
+
+    # Change feed at /api/changes. Entries are logged as their transaction
+    # commits; younger ones than the lag are held back so that commits still
+    # in flight behind them are not skipped
+    CHANGE_FEED_LAG_SECONDS: float = 1.0
+    CHANGE_LOG_RETENTION_DAYS: int = 30  # `python cli.py purge-changes`
+
+    # Proctoring webcam frames
+    PROCTORING_DIR: str = "./proctoring"
+    PROCTORING_MAX_FRAME_KB: int = 512
+    PROCTORING_QUEUE_FRAMES: int = 256  # uploads beyond this get a 503
+    PROCTORING_BATCH_FRAMES: int = 200  # frames written per transaction
+    PROCTORING_SEGMENT_MB: int = 64
+    PROCTORING_COMPACT_INTERVAL_MINUTES: int = 30  # 0 disables compaction
+    PROCTORING_COMPACT_LIVE_RATIO: float = 0.5  # rewrite segments below this
+    PROCTORING_RETENTION_DAYS: int = 90  # 0 keeps frames forever
+
+    # On-demand sampling profiler at /api/admin/profile
+    PROFILE_MAX_SECONDS: int = 60
+    PROFILE_MIN_INTERVAL_MS: float = 1.0
+
+    # Background jobs
+    JOB_WORKERS: int = 2
+
+    # Response compression; zstd and br are used only where installed
+    COMPRESSION_ENCODINGS: List[str] = ["zstd", "br", "gzip"]  # preference
+    COMPRESSION_MIN_BYTES: int = 1024
+
+    # Replay of POST /exams and /exams/{id}/submit sent with an Idempotency-Key
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600
+    IDEMPOTENCY_WAIT_SECONDS: int = 30  # how long a duplicate waits for the first
+
+    # Production server (serve.py)
+    BIND: str = "0.0.0.0:8000"
+    WEB_CONCURRENCY: int = 0  # worker processes, 0: one per available core
+    WORKER_TIMEOUT: int = 60
+    GRACEFUL_TIMEOUT: int = 30  # seconds to finish in-flight requests
+    KEEPALIVE_SECONDS: int = 5
+    MAX_REQUESTS: int = 10000  # recycle a worker after this many requests
+    MAX_REQUESTS_JITTER: int = 1000
+    WORKER_MAX_MEMORY_MB: int = 1024  # recycle a worker above this, 0 disables
 
     # JWT settings
     SECRET_KEY: str = "your-secret-key-here"  # Change this in production
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
     # CORS settings
     CORS_ORIGINS: List[str] = ["http://localhost:3000"]
@@ -1,19 +1,108 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
+from app.database import sqlite
+from app.database.metrics import DatabaseMetrics
+from app.database.replicas import ReplicaRouter
 
-engine = create_engine(settings.DATABASE_URL, echo=True)
+
+def build_engine(database_url: str):
+    url = make_url(database_url)
+    is_sqlite = url.get_backend_name() == "sqlite"
+    options = {
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "query_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+    if is_sqlite:
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+            "cached_statements": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    if not (is_sqlite and sqlite.is_memory_database(url)):
+        # In-memory SQLite uses a singleton pool that takes no sizing options
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+
+    engine = create_engine(url, **options)
+    if is_sqlite:
+        event.listen(engine, "connect", sqlite.apply_pragmas)
+    return engine
+
+
+engine = build_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+writer_queue = None
+if engine.dialect.name == "sqlite" and settings.SQLITE_SINGLE_WRITER:
+    writer_queue = sqlite.WriterQueue()
+    writer_queue.install(SessionLocal)
+
+replicas = ReplicaRouter(
+    [build_engine(url) for url in settings.DATABASE_REPLICA_URLS],
+    sticky_seconds=settings.REPLICA_STICKY_SECONDS,
+    retry_seconds=settings.REPLICA_RETRY_SECONDS,
+)
+replicas.install(SessionLocal)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+# Submission shards 1..N, shard 0 being the primary (see app/exams/shards.py)
+shard_engines = [build_engine(url) for url in settings.SUBMISSION_SHARD_URLS]
+ShardSessions = []
+for shard_engine in shard_engines:
+    shard_sessions = sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)
+    if shard_engine.dialect.name == "sqlite" and settings.SQLITE_SINGLE_WRITER:
+        sqlite.WriterQueue().install(shard_sessions)
+    ShardSessions.append(shard_sessions)
+
+metrics = DatabaseMetrics(
+    slow_statements=settings.DB_SLOW_STATEMENTS,
+    window_seconds=settings.DB_METRICS_WINDOW_SECONDS,
+)
+if settings.DB_METRICS:
+    metrics.install_engine("primary", engine)
+    for number, replica in enumerate(replicas.engines):
+        metrics.install_engine(f"replica-{number}", replica)
+    for number, shard_engine in enumerate(shard_engines, 1):
+        metrics.install_engine(f"shard-{number}", shard_engine)
+    metrics.install_sessions(SessionLocal, writer_queue)
+
 Base = declarative_base()
 
 
+def client_key(request: Request):
+    # The bearer token identifies a client session for read-your-writes
+    return request.headers.get("authorization")
+
+
 # Dependency to get DB session
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["client"] = client_key(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Dependency for read-only endpoints, served by a replica when one is usable
+def get_read_db(request: Request):
+    connection = replicas.connect(client_key(request))
+    if connection is None:
+        yield from get_db(request)
+        return
+    db = ReadSessionLocal(bind=connection)
     try:
         yield db
     finally:
         db.close()
+        connection.close()
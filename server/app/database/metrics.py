@@ -0,0 +1,219 @@
+"""Database metrics collected from engine, pool and session events.
+
+Per engine: pool occupancy, statement counts and time, the slowest recent
+statements with the shape of their parameters (never the values) and lock
+errors. Per session: how long transactions wait for a connection and how long
+they stay open. Hooks only take timestamps and update counters; the slow
+statement list is a bounded heap, rotated every ``DB_METRICS_WINDOW_SECONDS``
+so it reflects recent traffic.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+MAX_STATEMENT_LENGTH = 500
+RECENT_SAMPLES = 1024
+LOCK_ERRORS = ("database is locked", "deadlock", "lock timeout", "could not obtain lock")
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """Parameter names and types, without the values."""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def summarize(samples) -> Dict[str, float]:
+    """Percentiles in milliseconds of a sample of durations in seconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+    def at(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+
+    return {
+        "p50_ms": at(0.50),
+        "p95_ms": at(0.95),
+        "p99_ms": at(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+class EngineMetrics:
+    def __init__(self, name: str, engine, slow_statements: int, window_seconds: int):
+        self.name = name
+        self.engine = engine
+        self.slow_statements = slow_statements
+        self.window_seconds = window_seconds
+        self.statements = 0
+        self.statement_seconds = 0.0
+        self.errors = 0
+        self.lock_errors = 0
+        self.last_lock_error: Optional[str] = None
+        self.checkouts = 0
+        self._slow: List = []
+        self._previous_slow: List = []
+        self._window_started = time.monotonic()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def install(self):
+        event.listen(self.engine, "before_cursor_execute", self._before_execute)
+        event.listen(self.engine, "after_cursor_execute", self._after_execute)
+        event.listen(self.engine, "handle_error", self._on_error)
+        event.listen(self.engine.pool, "checkout", self._on_checkout)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["statement_started"].pop()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.statements += 1
+            self.statement_seconds += elapsed
+            self._rotate()
+            if len(self._slow) < self.slow_statements:
+                heapq.heappush(self._slow, self._entry(elapsed, statement, parameters, executemany))
+            elif elapsed > self._slow[0][0]:
+                heapq.heapreplace(self._slow, self._entry(elapsed, statement, parameters, executemany))
+
+    def _entry(self, elapsed, statement, parameters, executemany):
+        return (
+            elapsed,
+            next(self._sequence),
+            {
+                "duration_ms": round(elapsed * 1000, 3),
+                "statement": statement[:MAX_STATEMENT_LENGTH],
+                "parameters": parameter_shape(parameters, executemany),
+                "at": time.time(),
+            },
+        )
+
+    def _rotate(self):
+        now = time.monotonic()
+        if now - self._window_started >= self.window_seconds:
+            self._previous_slow, self._slow = self._slow, []
+            self._window_started = now
+
+    def _on_error(self, context):
+        conn = context.connection
+        if conn is not None and conn.info.get("statement_started"):
+            conn.info["statement_started"].pop()
+        message = str(context.original_exception).lower()
+        with self._lock:
+            self.errors += 1
+            if any(text in message for text in LOCK_ERRORS):
+                self.lock_errors += 1
+                self.last_lock_error = str(context.original_exception)[:200]
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+
+    def pool(self) -> Dict:
+        pool = self.engine.pool
+        stats = {"name": self.name, "pool_class": type(pool).__name__}
+        for key in ("size", "checkedout", "checkedin", "overflow"):
+            method = getattr(pool, key, None)
+            stats[key] = method() if callable(method) else None
+        stats["max_overflow"] = getattr(pool, "_max_overflow", None)
+        stats["timeout"] = getattr(pool, "_timeout", None)
+        stats["checkouts"] = self.checkouts
+        return stats
+
+    def report(self) -> Dict:
+        with self._lock:
+            self._rotate()
+            slow = sorted(self._slow + self._previous_slow, reverse=True)
+            return {
+                "name": self.name,
+                "statements": self.statements,
+                "statement_ms": round(self.statement_seconds * 1000, 3),
+                "errors": self.errors,
+                "lock_errors": self.lock_errors,
+                "last_lock_error": self.last_lock_error,
+                "slowest": [entry for _, _, entry in slow[: self.slow_statements]],
+            }
+
+
+class DatabaseMetrics:
+    """Metrics of every engine and of the sessions of a session factory."""
+
+    def __init__(self, slow_statements: int = 20, window_seconds: int = 300):
+        self.slow_statements = slow_statements
+        self.window_seconds = window_seconds
+        self.engines: List[EngineMetrics] = []
+        self.writer_queue = None
+        self.transactions = 0
+        self.open_transactions = 0
+        self._waits = deque(maxlen=RECENT_SAMPLES)
+        self._durations = deque(maxlen=RECENT_SAMPLES)
+        self._lock = threading.Lock()
+
+    def install_engine(self, name: str, engine):
+        metrics = EngineMetrics(name, engine, self.slow_statements, self.window_seconds)
+        metrics.install()
+        self.engines.append(metrics)
+
+    def install_sessions(self, session_factory, writer_queue=None):
+        self.writer_queue = writer_queue
+        event.listen(session_factory, "after_transaction_create", self._on_create)
+        event.listen(session_factory, "after_begin", self._on_begin)
+        event.listen(session_factory, "after_transaction_end", self._on_end)
+
+    # The root transaction is created when the session is first used and
+    # begins once it holds a connection: the gap is the wait for the pool
+
+    def _on_create(self, session, transaction):
+        if transaction.parent is None:
+            session.info["transaction_created"] = time.perf_counter()
+
+    def _on_begin(self, session, transaction, connection):
+        created = session.info.get("transaction_created")
+        if created is not None and "transaction_began" not in session.info:
+            now = time.perf_counter()
+            session.info["transaction_began"] = now
+            with self._lock:
+                self._waits.append(now - created)
+                self.open_transactions += 1
+
+    def _on_end(self, session, transaction):
+        if transaction.parent is not None:
+            return
+        session.info.pop("transaction_created", None)
+        began = session.info.pop("transaction_began", None)
+        if began is not None:
+            with self._lock:
+                self.transactions += 1
+                self.open_transactions -= 1
+                self._durations.append(time.perf_counter() - began)
+
+    def report(self) -> Dict:
+        with self._lock:
+            waits = list(self._waits)
+            durations = list(self._durations)
+            transactions = {
+                "completed": self.transactions,
+                "open": self.open_transactions,
+                "duration": summarize(durations),
+                "connection_wait": summarize(waits),
+            }
+        queue = self.writer_queue
+        return {
+            "pools": [e.pool() for e in self.engines],
+            "transactions": transactions,
+            "writer_queue": queue.stats() if queue is not None else None,
+            "engines": [e.report() for e in self.engines],
+        }
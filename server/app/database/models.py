@@ -0,0 +1,18 @@
+"""Every model, so ``Base.metadata`` knows all tables (init-db, Alembic)."""
+
+from app.auth.models import RefreshToken  # noqa: F401
+from app.bank.models import ExamBankQuestion  # noqa: F401
+from app.changes.models import Change  # noqa: F401
+from app.exams.models import (  # noqa: F401
+    AnswerSubmission,
+    ArchivedSubmission,
+    Exam,
+    ExamSubmission,
+    Question,
+    SubmissionIdBlock,
+    SubmissionShard,
+)
+from app.idempotency.models import IdempotencyKey  # noqa: F401
+from app.jobs.models import Job  # noqa: F401
+from app.proctoring.models import FrameBlob, ProctoringFrame  # noqa: F401
+from app.users.models import User  # noqa: F401
@@ -0,0 +1,85 @@
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, exc
+
+
+class ReplicaRouter:
+    """Picks the engine that serves a read-only request.
+
+    Reads rotate over the healthy replicas. A replica that refuses connections
+    is skipped for ``retry_seconds``, and with no healthy replica left reads go
+    to the primary. Clients that wrote within the last ``sticky_seconds`` are
+    pinned to the primary so they always read their own writes, whatever the
+    replication lag.
+    """
+
+    def __init__(
+        self,
+        engines: List,
+        sticky_seconds: float,
+        retry_seconds: float,
+        max_clients: int = 100_000,
+    ):
+        self.engines = engines
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self.max_clients = max_clients
+        self._cycle = itertools.cycle(range(len(engines))) if engines else None
+        self._down_until: Dict[int, float] = {}
+        self._last_write: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def install(self, session_factory):
+        event.listen(session_factory, "after_flush", self._on_flush)
+        event.listen(session_factory, "do_orm_execute", self._on_execute)
+        event.listen(session_factory, "after_commit", self._on_commit)
+
+    def _on_flush(self, session, flush_context):
+        session.info["wrote"] = True
+
+    def _on_execute(self, orm_execute_state):
+        if not orm_execute_state.is_select:
+            orm_execute_state.session.info["wrote"] = True
+
+    def _on_commit(self, session):
+        client = session.info.get("client")
+        if client and session.info.pop("wrote", False):
+            self.record_write(client)
+
+    def record_write(self, client: str):
+        now = time.monotonic()
+        with self._lock:
+            self._last_write.pop(client, None)
+            self._last_write[client] = now
+            if len(self._last_write) > self.max_clients:
+                # Dicts keep write order: drop expired entries, then the oldest
+                cutoff = now - self.sticky_seconds
+                for key, at in list(self._last_write.items()):
+                    if at >= cutoff and len(self._last_write) <= self.max_clients:
+                        break
+                    del self._last_write[key]
+
+    def is_sticky(self, client: Optional[str]) -> bool:
+        if not client:
+            return False
+        at = self._last_write.get(client)
+        return at is not None and time.monotonic() - at < self.sticky_seconds
+
+    def connect(self, client: Optional[str]):
+        """A connection to a healthy replica, or None to use the primary."""
+        if not self.engines or self.is_sticky(client):
+            return None
+        for _ in range(len(self.engines)):
+            with self._lock:
+                index = next(self._cycle)
+                if self._down_until.get(index, 0) > time.monotonic():
+                    continue
+            try:
+                return self.engines[index].connect()
+            except exc.DBAPIError:
+                with self._lock:
+                    self._down_until[index] = time.monotonic() + self.retry_seconds
+        return None
@@ -0,0 +1,123 @@
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app.config import settings
+
+
+def is_memory_database(url) -> bool:
+    return url.database in (None, "", ":memory:") or "mode=memory" in str(url)
+
+
+def apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}")
+    if settings.SQLITE_WAL:
+        # Persistent per database file, cheap to repeat on every connection
+        cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.close()
+
+
+class WriterQueue:
+    """FIFO queue that lets one session at a time write to the database.
+
+    SQLite allows a single writer per file. Letting every request race for the
+    file lock ends in busy-timeout sleeps and SQLITE_BUSY errors under load, so
+    writers queue up here instead and are served in arrival order. A session
+    takes its turn on its first write and gives it up when its transaction
+    ends, reads never wait.
+
+    A writer waits at most ``SQLITE_BUSY_TIMEOUT_MS`` for its turn, like it
+    would for the file lock, then gets the same ``OperationalError``. Waiting
+    blocks the calling thread: ``async def`` handlers must not write through
+    a queued session, or they stall the event loop and every request on it.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        # Tickets of writers that gave up waiting, skipped when their turn comes
+        self._abandoned = set()
+        self.turns = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+
+    def acquire(self):
+        with self._condition:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self.turns += 1
+            if ticket != self._serving:
+                started = time.perf_counter()
+                deadline = started + settings.SQLITE_BUSY_TIMEOUT_MS / 1000
+                while ticket != self._serving:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._abandoned.add(ticket)
+                        self.waits += 1
+                        self.timeouts += 1
+                        raise OperationalError(
+                            None, None, sqlite3.OperationalError("database is locked")
+                        )
+                    self._condition.wait(remaining)
+                waited = time.perf_counter() - started
+                self.waits += 1
+                self.wait_seconds += waited
+                self.max_wait = max(self.max_wait, waited)
+
+    def release(self):
+        with self._condition:
+            self._serving += 1
+            while self._serving in self._abandoned:
+                self._abandoned.remove(self._serving)
+                self._serving += 1
+            self._condition.notify_all()
+
+    def _waiting(self) -> int:
+        queued = self._next_ticket - self._serving - len(self._abandoned)
+        return max(0, queued - 1)
+
+    @property
+    def waiting(self) -> int:
+        with self._condition:
+            return self._waiting()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "waiting": self._waiting(),
+                "turns": self.turns,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "wait_ms": round(self.wait_seconds * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+    def install(self, session_factory):
+        event.listen(session_factory, "before_flush", self._on_write)
+        event.listen(session_factory, "do_orm_execute", self._on_execute)
+        event.listen(session_factory, "after_transaction_end", self._on_end)
+
+    def _take_turn(self, session):
+        if not session.info.get("writer_turn"):
+            self.acquire()
+            session.info["writer_turn"] = True
+
+    def _on_write(self, session, flush_context, instances):
+        self._take_turn(session)
+
+    def _on_execute(self, orm_execute_state):
+        if not orm_execute_state.is_select:
+            self._take_turn(orm_execute_state.session)
+
+    def _on_end(self, session, transaction):
+        if transaction.parent is None and session.info.pop("writer_turn", False):
+            self.release()
@@ -1,17 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import or_
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime, UTC
-import json
 
-from app.database.db import get_db
+from app.config import settings
+from app.database.db import get_db, get_read_db
 from app.auth.auth import get_current_faculty, get_current_user
 from app.users.models import User
-from . import models, schemas
+from app.jobs import schemas as job_schemas
+from app.jobs.runner import runner
+from app.singleflight import SingleFlight, attach, row_values
+from . import jobs  # noqa: F401  (registers the exam job handlers)
+from . import archive, dashboard, models, papers, payloads, schemas, shards, transfer
+from .bulk import insert_questions
+from .grading import grade_answer
+from .leaderboard import leaderboards
+from .lifecycle import scheduler as lifecycle
 
 router = APIRouter()
 
+exam_lookups = SingleFlight("exam_lookup")
+
 
 @router.post("", response_model=schemas.Exam)
 def create_exam(
@@ -19,40 +37,135 @@ def create_exam(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_faculty),
 ):
-    print(current_user)
     db_exam = models.Exam(
         title=exam.title,
         description=exam.description,
         start_time=exam.start_time,
         end_time=exam.end_time,
         duration_minutes=exam.duration_minutes,
+        shuffle_questions=exam.shuffle_questions,
+        shuffle_options=exam.shuffle_options,
+        questions_per_student=exam.questions_per_student,
+        paper_seed=exam.paper_seed,
         faculty_id=current_user.id,
     )
     db.add(db_exam)
     db.flush()  # Get the exam ID before committing
 
-    for question in exam.questions:
-        db_question = models.Question(
-            exam_id=db_exam.id,
-            question_text=question.question_text,
-            marks=question.marks,
-            options=json.dumps(question.options),  # Convert list to JSON string
-            correct_answer=question.correct_answer,
-        )
-        db.add(db_question)
+    insert_questions(db, db_exam.id, exam.questions)
 
     db.commit()
     db.refresh(db_exam)
+    lifecycle.track(db_exam)
     return db_exam
 
 
+@router.post(
+    "/bulk", response_model=job_schemas.Job, status_code=status.HTTP_202_ACCEPTED
+)
+def create_exam_in_background(
+    exam: schemas.ExamCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    """Create a large exam off the request path, poll /jobs/{id} for the result"""
+    return runner.enqueue(
+        db,
+        "create_exam",
+        {"exam": exam.model_dump(mode="json"), "faculty_id": current_user.id},
+        current_user.id,
+    )
+
+
+@router.post(
+    "/{exam_id}/regrade",
+    response_model=job_schemas.Job,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def regrade_exam(
+    exam_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    """Re-grade all submissions of an exam against its current answer key"""
+    exam = (
+        db.query(models.Exam)
+        .filter(models.Exam.id == exam_id, models.Exam.faculty_id == current_user.id)
+        .first()
+    )
+    if not exam:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Exam not found"
+        )
+    return runner.enqueue(db, "regrade_exam", {"exam_id": exam_id}, current_user.id)
+
+
+@router.post("/import", response_model=schemas.ExamImportResult)
+def import_exam(
+    file: UploadFile,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    """Create an exam from an archive produced by /exams/{exam_id}/export"""
+    chunks = iter(lambda: file.file.read(transfer.CHUNK_SIZE), b"")
+    try:
+        exam, count = transfer.import_exam(db, chunks, current_user.id)
+    except transfer.ArchiveError as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    lifecycle.track(exam)
+    return {"exam_id": exam.id, "questions": count}
+
+
+@router.get("/{exam_id}/export")
+def export_exam(
+    exam_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    """Stream an exam and its questions as a gzipped NDJSON archive"""
+    exam = (
+        db.query(models.Exam)
+        .filter(models.Exam.id == exam_id, models.Exam.faculty_id == current_user.id)
+        .first()
+    )
+    if not exam:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Exam not found"
+        )
+    return StreamingResponse(
+        transfer.export_exam(exam_id),
+        media_type="application/gzip",
+        headers={
+            "Content-Disposition": f'attachment; filename="exam-{exam_id}.ndjson.gz"'
+        },
+    )
+
+
+@router.post(
+    "/archive", response_model=job_schemas.Job, status_code=status.HTTP_202_ACCEPTED
+)
+def archive_submissions(
+    older_than_days: int = settings.ARCHIVE_AFTER_DAYS,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    """Move submissions of your exams closed that long ago to the archive"""
+    return runner.enqueue(
+        db,
+        "archive_submissions",
+        {"older_than_days": older_than_days, "faculty_id": current_user.id},
+        current_user.id,
+    )
+
+
 @router.get("/results", response_model=List[schemas.ExamWithSubmissions])
 def get_exam_results(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     """Get all exams with their submissions for the current faculty"""
-    if current_user.is_faculty:
+    if not current_user.is_faculty:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only faculty can view exam results",
@@ -65,23 +178,22 @@ def get_exam_results(
 
     result = []
     for exam in exams:
-        # Get all submissions for this exam
-        submissions = (
-            db.query(models.ExamSubmission)
-            .filter(models.ExamSubmission.exam_id == exam.id)
-            .all()
-        )
+        # Live and archived submissions for this exam
+        submissions = archive.exam_submissions(db, exam.id)
 
-        # Get student names for each submission
+        # Get student names for all submissions at once
+        student_ids = {submission.student_id for submission in submissions}
+        names = dict(
+            db.query(User.id, User.name).filter(User.id.in_(student_ids)).all()
+        )
         submissions_with_names = []
         for submission in submissions:
-            student = db.query(User).filter(User.id == submission.student_id).first()
             submissions_with_names.append(
                 {
                     "id": submission.id,
                     "exam_id": submission.exam_id,
                     "student_id": submission.student_id,
-                    "student_name": f"{student.first_name} {student.last_name}",
+                    "student_name": names.get(submission.student_id, ""),
                     "submission_time": submission.submission_time,
                     "total_marks": submission.total_marks,
                     "is_submitted": submission.is_submitted,
@@ -92,7 +204,7 @@ def get_exam_results(
             {
                 "id": exam.id,
                 "title": exam.title,
-                "total_marks": sum(q.marks for q in exam.questions),
+                "total_marks": sum(q.marks for q in exam.paper),
                 "submissions": submissions_with_names,
             }
         )
@@ -100,49 +212,65 @@ def get_exam_results(
     return result
 
 
+@router.get("/dashboard", response_model=schemas.StudentDashboard)
+def get_dashboard(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Your upcoming, in-progress, attempted and missed exams, with scores"""
+    return dashboard.student_exams(db, current_user.id)
+
+
+def _exam_values(db: Session, exam_id: int):
+    return row_values(db.query(models.Exam).filter(models.Exam.id == exam_id).first())
+
+
 @router.get("/{exam_id}", response_model=schemas.Exam)
 def get_exam(
     exam_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    exam = db.query(models.Exam).filter(models.Exam.id == exam_id).first()
-    if not exam:
+    # Everyone opens the exam at its start time: one lookup for all of them
+    values = exam_lookups.do(exam_id, _exam_values, db, exam_id)
+    if values is None:
         raise HTTPException(status_code=404, detail="Exam not found")
-    return exam
+    exam = attach(db, models.Exam, values)
+    if current_user.is_faculty or not papers.is_randomized(exam):
+        # Everyone gets the same paper: serve the shared, precompressed copy
+        return payloads.exam_response(exam, request)
+
+    # Students get their own deterministic shuffle/sample of the paper
+    paper = schemas.Exam.model_validate(exam)
+    pool = sorted(paper.questions, key=lambda q: q.id)
+    return paper.model_copy(
+        update={"questions": papers.student_questions(exam, current_user.id, pool)}
+    )
 
 
 @router.get("", response_model=List[schemas.Exam])
 def get_exams(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     upcoming: bool = False,
+    live: bool = False,
     attempted: bool = False,
     previous: bool = False,
     current_user: User = Depends(get_current_user),
 ):
+    # Statuses are kept current by the lifecycle scheduler
     exams = db.query(models.Exam)
     if previous:
-        exams = exams.filter(
-            or_(
-                models.Exam.end_time < datetime.now(UTC),
-                models.Exam.start_time < datetime.now(UTC),
-            ),
-            models.Exam.status == "completed",
-        )
+        exams = exams.filter(models.Exam.status.in_((models.CLOSED, models.GRADED)))
     if upcoming:
-        exams = exams.filter(
-            or_(
-                models.Exam.start_time > datetime.now(UTC),
-                models.Exam.end_time > datetime.now(UTC),
-            ),
-            models.Exam.status == "upcoming",
-        )
+        exams = exams.filter(models.Exam.status == models.SCHEDULED)
+    if live:
+        exams = exams.filter(models.Exam.status == models.LIVE)
     if attempted:
         exams = exams.filter(
-            models.ExamSubmission.student_id == current_user.id,
-            models.ExamSubmission.status == "completed",
+            models.Exam.id.in_(dashboard.attempted_exam_ids(db, current_user.id))
         )
     return exams.offset(skip).limit(limit).all()
 
@@ -168,14 +296,34 @@ def submit_exam(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Exam has ended"
         )
 
-    # Check if already submitted
+    # Submissions live in the exam's shard, exams and questions on the primary
+    with shards.submission_db(db, exam_id) as live:
+        return _submit(db, live, exam, submission, current_user)
+
+
+def _submit(
+    db: Session,
+    live: Session,
+    exam: models.Exam,
+    submission: schemas.ExamSubmissionCreate,
+    current_user: User,
+):
+    exam_id = exam.id
+    # Check if already submitted, archived submissions included
     existing_submission = (
-        db.query(models.ExamSubmission)
+        live.query(models.ExamSubmission.id)
         .filter(
             models.ExamSubmission.exam_id == exam_id,
             models.ExamSubmission.student_id == current_user.id,
         )
         .first()
+    ) or (
+        db.query(models.ArchivedSubmission.id)
+        .filter(
+            models.ArchivedSubmission.exam_id == exam_id,
+            models.ArchivedSubmission.student_id == current_user.id,
+        )
+        .first()
     )
 
     if existing_submission:
@@ -185,13 +333,14 @@ def submit_exam(
 
     # Create submission
     db_submission = models.ExamSubmission(
+        id=shards.submission_ids.next(),
         exam_id=exam_id,
         student_id=current_user.id,
         submission_time=datetime.now(UTC),
         is_submitted=True,
     )
-    db.add(db_submission)
-    db.flush()
+    live.add(db_submission)
+    live.flush()
 
     total_marks = 0
     if not isinstance(submission.answers.model_dump(), dict):
@@ -209,14 +358,33 @@ def submit_exam(
             detail="Both 'question_id' and 'answer' must be provided in answers.",
         )
 
-    question = (
-        db.query(models.Question)
-        .filter(
-            models.Question.id == question_id,
-            models.Question.exam_id == exam_id,
+    if exam.questions_per_student:
+        # Sampled papers: the question's pool position decides if it was dealt
+        pool = (
+            db.query(
+                models.Question.id,
+                models.Question.marks,
+                models.Question.correct_answer,
+            )
+            .filter(models.in_paper(exam_id))
+            .order_by(models.Question.id)
+            .all()
+        )
+        index = next((i for i, q in enumerate(pool) if q.id == question_id), None)
+        question = None
+        if index is not None and papers.in_student_paper(
+            exam, current_user.id, len(pool), index
+        ):
+            question = pool[index]
+    else:
+        question = (
+            db.query(models.Question)
+            .filter(
+                models.Question.id == question_id,
+                models.in_paper(exam_id),
+            )
+            .first()
         )
-        .first()
-    )
 
     if not question:
         raise HTTPException(
@@ -224,28 +392,22 @@ def submit_exam(
             detail=f"Question {question_id} not found in exam",
         )
 
-    marks_obtained = question.marks if student_answer == question.correct_answer else 0
+    marks_obtained = grade_answer(question, student_answer)
     total_marks += marks_obtained
-    print(
-        "Marks obtained:",
-        marks_obtained,
-        "Total marks:",
-        total_marks,
-        "Question ID:",
-        question_id,
-    )
     db_answer = models.AnswerSubmission(
+        id=shards.answer_ids.next(),
         submission_id=db_submission.id,
         question_id=int(question_id),
         answer=student_answer,
         marks_obtained=marks_obtained,
     )
-    db.add(db_answer)
+    live.add(db_answer)
 
     db_submission.total_marks = int(total_marks)
-    exam.status = "completed" if total_marks >= 0 else "failed"
+    live.commit()
     db.commit()
-    db.refresh(db_submission)
+    live.refresh(db_submission)
+    leaderboards.record(exam_id, current_user.id, db_submission.total_marks)
     return db_submission
 
 
@@ -265,12 +427,7 @@ def get_exam_submissions(
             detail="Only faculty can view submissions",
         )
 
-    submissions = (
-        db.query(models.ExamSubmission)
-        .filter(models.ExamSubmission.exam_id == exam_id)
-        .all()
-    )
-    return submissions
+    return archive.exam_submissions(db, exam_id)
 
 
 @router.get(
@@ -283,7 +440,7 @@ def get_submission_details(
     current_user: User = Depends(get_current_user),
 ):
     """Get detailed information about a specific submission"""
-    if current_user.role != "faculty":
+    if not current_user.is_faculty:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only faculty can view submission details",
@@ -301,15 +458,8 @@ def get_submission_details(
             status_code=status.HTTP_404_NOT_FOUND, detail="Exam not found"
         )
 
-    # Get the submission
-    submission = (
-        db.query(models.ExamSubmission)
-        .filter(
-            models.ExamSubmission.id == submission_id,
-            models.ExamSubmission.exam_id == exam_id,
-        )
-        .first()
-    )
+    # Get the submission, reading through to the archive
+    submission, answers = archive.find_submission(db, exam_id, submission_id)
 
     if not submission:
         raise HTTPException(
@@ -319,26 +469,27 @@ def get_submission_details(
     # Get student details
     student = db.query(User).filter(User.id == submission.student_id).first()
 
-    # Get all answers for this submission
-    answers = (
-        db.query(models.AnswerSubmission, models.Question)
-        .join(
-            models.Question, models.AnswerSubmission.question_id == models.Question.id
+    # Get the questions answered in this submission
+    questions = {
+        question.id: question
+        for question in db.query(models.Question).filter(
+            models.Question.id.in_({answer["question_id"] for answer in answers})
         )
-        .filter(models.AnswerSubmission.submission_id == submission_id)
-        .all()
-    )
+    }
 
     # Format the answers
     formatted_answers = []
-    for answer, question in answers:
+    for answer in answers:
+        question = questions.get(answer["question_id"])
+        if question is None:
+            continue
         formatted_answers.append(
             {
                 "question_id": question.id,
-                "question_text": question.text,
+                "question_text": question.question_text,
                 "correct_answer": question.correct_answer,
-                "student_answer": answer.answer,
-                "marks_obtained": answer.marks_obtained,
+                "student_answer": answer["answer"],
+                "marks_obtained": answer["marks_obtained"],
                 "total_marks": question.marks,
             }
         )
@@ -347,9 +498,9 @@ def get_submission_details(
         "id": submission.id,
         "exam_id": submission.exam_id,
         "exam_title": exam.title,
-        "student_name": f"{student.first_name} {student.last_name}",
+        "student_name": student.name if student else "",
         "submission_time": submission.submission_time,
-        "total_marks": sum(q.marks for q in exam.questions),
+        "total_marks": sum(q.marks for q in exam.paper),
         "marks_obtained": submission.total_marks,
         "answers": formatted_answers,
     }
@@ -358,11 +509,11 @@ def get_submission_details(
 @router.get("/{exam_id}/analytics", response_model=schemas.ExamAnalytics)
 def get_exam_analytics(
     exam_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     """Get analytics for a specific exam"""
-    if current_user.role != "faculty":
+    if not current_user.is_faculty:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only faculty can view exam analytics",
@@ -380,12 +531,8 @@ def get_exam_analytics(
             status_code=status.HTTP_404_NOT_FOUND, detail="Exam not found"
         )
 
-    # Get all submissions for this exam
-    submissions = (
-        db.query(models.ExamSubmission)
-        .filter(models.ExamSubmission.exam_id == exam_id)
-        .all()
-    )
+    # Get all submissions for this exam, live and archived
+    submissions = archive.exam_submissions(db, exam_id)
 
     # Calculate statistics
     total_submissions = len(submissions)
@@ -406,30 +553,15 @@ def get_exam_analytics(
     lowest_marks = min(marks)
 
     # Calculate pass percentage (assuming 40% is passing)
-    passing_marks = sum(q.marks for q in exam.questions) * 0.4
+    passing_marks = sum(q.marks for q in exam.paper) * 0.4
     pass_count = sum(1 for mark in marks if mark >= passing_marks)
     pass_percentage = (pass_count / total_submissions) * 100
 
-    # Get question-wise analysis
-    question_analysis = []
-    for question in exam.questions:
-        correct_answers = (
-            db.query(models.AnswerSubmission)
-            .filter(
-                models.AnswerSubmission.question_id == question.id,
-                models.AnswerSubmission.answer == question.correct_answer,
-            )
-            .count()
-        )
-        question_analysis.append(
-            {
-                "question_id": question.id,
-                "question_text": question.text,
-                "correct_answers": correct_answers,
-                "total_attempts": total_submissions,
-                "correct_percentage": (correct_answers / total_submissions) * 100,
-            }
-        )
+    # Item statistics from one answer matrix, cached per exam version. Imported
+    # here so workers only load NumPy once analytics are asked for
+    from . import items
+
+    items_analysis = items.item_analysis(db, exam, submissions)
 
     return {
         "exam_id": exam_id,
@@ -438,5 +570,116 @@ def get_exam_analytics(
         "highest_marks": highest_marks,
         "lowest_marks": lowest_marks,
         "pass_percentage": pass_percentage,
-        "question_wise_analysis": question_analysis,
+        "reliability": items_analysis["reliability"],
+        "question_wise_analysis": items_analysis["questions"],
+    }
+
+
+@router.get("/{exam_id}/leaderboard", response_model=schemas.Leaderboard)
+def get_leaderboard(
+    exam_id: int,
+    limit: int = Query(10, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    """Top students of an exam, tied scores sharing a rank"""
+    exam = (
+        db.query(models.Exam)
+        .filter(models.Exam.id == exam_id, models.Exam.faculty_id == current_user.id)
+        .first()
+    )
+    if not exam:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Exam not found"
+        )
+    ranking = leaderboards.get(db, exam_id)
+    top = ranking.top(limit)
+    names = dict(
+        db.query(User.id, User.name).filter(User.id.in_([s for _, s, _ in top]))
+    )
+    return {
+        "exam_id": exam_id,
+        "participants": len(ranking),
+        "entries": [
+            {
+                "rank": rank,
+                "student_id": student_id,
+                "student_name": names.get(student_id),
+                "total_marks": score,
+            }
+            for rank, student_id, score in top
+        ],
+    }
+
+
+@router.get("/{exam_id}/rank", response_model=schemas.StudentRank)
+def get_rank(
+    exam_id: int,
+    student_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """A student's rank and percentile; students see their own once the exam ended"""
+    exam = db.query(models.Exam).filter(models.Exam.id == exam_id).first()
+    if not exam:
+        raise HTTPException(status_code=404, detail="Exam not found")
+
+    if current_user.is_faculty:
+        if exam.faculty_id != current_user.id:
+            raise HTTPException(status_code=404, detail="Exam not found")
+        if student_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="student_id is required",
+            )
+    else:
+        if student_id not in (None, current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Students can only view their own rank",
+            )
+        if datetime.now(UTC) <= exam.end_time.replace(tzinfo=UTC):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Ranks are available once the exam has ended",
+            )
+        student_id = current_user.id
+
+    ranking = leaderboards.get(db, exam_id)
+    score = ranking.scores.get(student_id)
+    if score is None:
+        raise HTTPException(status_code=404, detail="No submission for this student")
+    return {
+        "exam_id": exam_id,
+        "student_id": student_id,
+        "total_marks": score,
+        "rank": ranking.rank(score),
+        "percentile": ranking.percentile(score),
+        "participants": len(ranking),
+    }
+
+
+@router.get("/{exam_id}/percentile", response_model=schemas.PercentileCutoff)
+def get_percentile_cutoff(
+    exam_id: int,
+    percentile: float = Query(..., ge=0, le=100),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    """Lowest score within the top (100 - percentile)% of an exam"""
+    exam = (
+        db.query(models.Exam)
+        .filter(models.Exam.id == exam_id, models.Exam.faculty_id == current_user.id)
+        .first()
+    )
+    if not exam:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Exam not found"
+        )
+    ranking = leaderboards.get(db, exam_id)
+    return {
+        "exam_id": exam_id,
+        "percentile": percentile,
+        "total_marks": ranking.cutoff(percentile),
+        "participants": len(ranking),
     }
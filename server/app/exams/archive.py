@@ -0,0 +1,244 @@
+"""Archive tier for submissions of closed exams.
+
+Once an exam has been closed for ``ARCHIVE_AFTER_DAYS`` its submissions move
+out of ``exam_submissions``/``answer_submissions`` into
+``archived_submissions``. That table keeps one row per submission, with the
+answers packed column-wise into a zlib-compressed blob, and a ``term`` column
+so old terms can be pruned or moved wholesale. The archive is on the primary
+whichever shard held the live rows. The helpers below read live and archived
+rows alike, so callers don't need to know where a submission lives.
+"""
+
+import json
+import zlib
+from collections import defaultdict
+from datetime import UTC, datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.jobs.runner import JobContext, job_handler
+from . import models, shards
+
+
+def term_of(when: datetime) -> str:
+    # Two terms a year: January-June and July-December
+    return f"{when.year}-{1 if when.month <= 6 else 2}"
+
+
+ANSWER_COLUMNS = ("id", "question_id", "answer", "marks_obtained")
+
+
+def _pack(columns: Dict[str, List]) -> bytes:
+    return zlib.compress(json.dumps(columns, separators=(",", ":")).encode(), 9)
+
+
+def pack_answers(answers: List[models.AnswerSubmission]) -> bytes:
+    return _pack({c: [getattr(a, c) for a in answers] for c in ANSWER_COLUMNS})
+
+
+def repack_answers(answers: List[Dict]) -> bytes:
+    """Pack answers as returned by ``unpack_answers``."""
+    return _pack({c: [a[c] for a in answers] for c in ANSWER_COLUMNS})
+
+
+def unpack_answers(blob: bytes) -> List[Dict]:
+    columns = json.loads(zlib.decompress(blob))
+    return [
+        {
+            "id": i,
+            "question_id": question_id,
+            "answer": answer,
+            "marks_obtained": marks,
+        }
+        for i, question_id, answer, marks in zip(
+            columns["id"],
+            columns["question_id"],
+            columns["answer"],
+            columns["marks_obtained"],
+        )
+    ]
+
+
+def archive_exam(db: Session, exam: models.Exam) -> int:
+    """Move an exam's live submissions into the archive.
+
+    One transaction when the exam's submissions are on the primary. On another
+    shard the archived rows are committed before the live ones are deleted,
+    and rows archived by an interrupted run are skipped.
+    """
+    with shards.submission_db(db, exam.id) as live:
+        submissions = (
+            live.query(models.ExamSubmission)
+            .filter(models.ExamSubmission.exam_id == exam.id)
+            .all()
+        )
+        if not submissions:
+            return 0
+        ids = [s.id for s in submissions]
+        answers = defaultdict(list)
+        for answer in (
+            live.query(models.AnswerSubmission)
+            .filter(models.AnswerSubmission.submission_id.in_(ids))
+            .order_by(models.AnswerSubmission.id)
+        ):
+            answers[answer.submission_id].append(answer)
+        archived = set()
+        if live is not db:
+            archived = {
+                archived_id
+                for (archived_id,) in db.query(models.ArchivedSubmission.id).filter(
+                    models.ArchivedSubmission.id.in_(ids)
+                )
+            }
+
+        term = term_of(exam.end_time)
+        now = datetime.now(UTC)
+        rows = [
+            {
+                "id": s.id,
+                "exam_id": s.exam_id,
+                "student_id": s.student_id,
+                "submission_time": s.submission_time,
+                "total_marks": s.total_marks,
+                "is_submitted": s.is_submitted,
+                "term": term,
+                "archived_at": now,
+                "answers": pack_answers(answers[s.id]),
+            }
+            for s in submissions
+            if s.id not in archived
+        ]
+        if rows:
+            db.execute(insert(models.ArchivedSubmission), rows)
+        if live is not db:
+            db.commit()
+        live.query(models.AnswerSubmission).filter(
+            models.AnswerSubmission.submission_id.in_(ids)
+        ).delete(synchronize_session=False)
+        live.query(models.ExamSubmission).filter(
+            models.ExamSubmission.id.in_(ids)
+        ).delete(synchronize_session=False)
+        live.commit()
+    return len(ids)
+
+
+def archivable_exams(db: Session, older_than_days: int, faculty_id=None):
+    cutoff = datetime.now(UTC).replace(tzinfo=None) - timedelta(days=older_than_days)
+    # Exams with live submissions, on any shard
+    with_submissions = set()
+    for live in shards.submission_dbs(db):
+        with_submissions.update(
+            exam_id
+            for (exam_id,) in live.query(models.ExamSubmission.exam_id).distinct()
+        )
+    exams = db.query(models.Exam).filter(
+        models.Exam.end_time < cutoff,
+        models.Exam.id.in_(with_submissions),
+    )
+    if faculty_id is not None:
+        exams = exams.filter(models.Exam.faculty_id == faculty_id)
+    return exams.order_by(models.Exam.id).all()
+
+
+@job_handler("archive_submissions")
+def archive_submissions(ctx: JobContext, params: dict):
+    db = ctx.db
+    exams = archivable_exams(
+        db,
+        params.get("older_than_days", settings.ARCHIVE_AFTER_DAYS),
+        params.get("faculty_id"),
+    )
+    moved = 0
+    ctx.progress(0, len(exams))
+    for done, exam in enumerate(exams, 1):
+        moved += archive_exam(db, exam)
+        ctx.progress(done)
+    return {"exams": len(exams), "submissions": moved}
+
+
+# Read-through helpers, live rows first
+
+
+def exam_submissions(db: Session, exam_id: int) -> List:
+    with shards.submission_db(db, exam_id) as live_db:
+        live = (
+            live_db.query(models.ExamSubmission)
+            .filter(models.ExamSubmission.exam_id == exam_id)
+            .all()
+        )
+    archived = (
+        db.query(models.ArchivedSubmission)
+        .filter(models.ArchivedSubmission.exam_id == exam_id)
+        .all()
+    )
+    return live + archived
+
+
+def find_submission(db: Session, exam_id: int, submission_id: int):
+    """The submission and its answers as ``(submission, [answer dicts])``."""
+    with shards.submission_db(db, exam_id) as live:
+        submission = (
+            live.query(models.ExamSubmission)
+            .filter(
+                models.ExamSubmission.id == submission_id,
+                models.ExamSubmission.exam_id == exam_id,
+            )
+            .first()
+        )
+        if submission is not None:
+            answers = [
+                {
+                    "id": a.id,
+                    "question_id": a.question_id,
+                    "answer": a.answer,
+                    "marks_obtained": a.marks_obtained,
+                }
+                for a in live.query(models.AnswerSubmission)
+                .filter(models.AnswerSubmission.submission_id == submission_id)
+                .order_by(models.AnswerSubmission.id)
+            ]
+            return submission, answers
+
+    archived = (
+        db.query(models.ArchivedSubmission)
+        .filter(
+            models.ArchivedSubmission.id == submission_id,
+            models.ArchivedSubmission.exam_id == exam_id,
+        )
+        .first()
+    )
+    if archived is None:
+        return None, []
+    return archived, unpack_answers(archived.answers)
+
+
+def exam_answers(db: Session, exam_id: int) -> Iterator[Tuple[int, int, str, int]]:
+    """``(submission_id, question_id, answer, marks_obtained)`` for an exam."""
+    # Plain rows straight off the connection, this can be millions of them
+    live = (
+        select(
+            models.AnswerSubmission.submission_id,
+            models.AnswerSubmission.question_id,
+            models.AnswerSubmission.answer,
+            models.AnswerSubmission.marks_obtained,
+        )
+        .join(models.ExamSubmission)
+        .where(models.ExamSubmission.exam_id == exam_id)
+        .execution_options(stream_results=True)
+    )
+    with shards.submission_db(db, exam_id) as live_db:
+        for rows in live_db.connection().execute(live).partitions(10000):
+            yield from rows
+    for submission_id, blob in db.query(
+        models.ArchivedSubmission.id, models.ArchivedSubmission.answers
+    ).filter(models.ArchivedSubmission.exam_id == exam_id):
+        for answer in unpack_answers(blob):
+            yield (
+                submission_id,
+                answer["question_id"],
+                answer["answer"],
+                answer["marks_obtained"],
+            )
@@ -0,0 +1,43 @@
+import json
+from typing import Iterable
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.changes import log as changes
+from . import models
+
+
+def insert_questions(db: Session, exam_id: int, questions: Iterable) -> int:
+    """Insert questions with one executemany instead of a flush per row.
+
+    ``questions`` may hold ``QuestionCreate`` models or plain dicts with the
+    same fields.
+    """
+    rows = []
+    for question in questions:
+        if not isinstance(question, dict):
+            question = question.model_dump()
+        rows.append(
+            {
+                "exam_id": exam_id,
+                "question_text": question["question_text"],
+                "marks": question["marks"],
+                "options": json.dumps(question["options"]),
+                "correct_answer": question["correct_answer"],
+            }
+        )
+    if rows:
+        ids = db.scalars(
+            insert(models.Question).returning(
+                models.Question.id, sort_by_parameter_order=True
+            ),
+            rows,
+        ).all()
+        changes.record(
+            db,
+            models.Question,
+            "insert",
+            [dict(row, id=question_id) for question_id, row in zip(ids, rows)],
+        )
+    return len(rows)
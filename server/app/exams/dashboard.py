@@ -0,0 +1,104 @@
+"""Per-student view of every exam, for the student dashboard.
+
+One query on the primary joins each active exam to the student's live and
+archived submission, through the ``(student_id, exam_id)`` indexes. Exams
+whose live submissions are on another shard get one more indexed query per
+shard, for the student's submissions there.
+"""
+
+from datetime import UTC, datetime
+from typing import Dict, Set
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from . import models, shards
+
+STATES = ("upcoming", "in_progress", "attempted", "missed")
+
+
+def attempted_exam_ids(db: Session, student_id: int) -> Set[int]:
+    """Exams the student has a live or archived submission for."""
+    attempted = {
+        exam_id
+        for (exam_id,) in db.query(models.ArchivedSubmission.exam_id).filter(
+            models.ArchivedSubmission.student_id == student_id
+        )
+    }
+    for live in shards.submission_dbs(db):
+        attempted.update(
+            exam_id
+            for (exam_id,) in live.query(models.ExamSubmission.exam_id).filter(
+                models.ExamSubmission.student_id == student_id
+            )
+        )
+    return attempted
+
+
+def student_exams(db: Session, student_id: int) -> Dict[str, list]:
+    """Active exams grouped by state for ``student_id``, with their scores."""
+    live = models.ExamSubmission
+    archived = models.ArchivedSubmission
+    rows = db.execute(
+        select(
+            models.Exam.id,
+            models.Exam.title,
+            models.Exam.description,
+            models.Exam.start_time,
+            models.Exam.end_time,
+            models.Exam.duration_minutes,
+            func.coalesce(live.id, archived.id).label("submission_id"),
+            func.coalesce(live.submission_time, archived.submission_time).label(
+                "submitted_at"
+            ),
+            func.coalesce(live.total_marks, archived.total_marks).label(
+                "marks_obtained"
+            ),
+        )
+        .outerjoin(
+            live, and_(live.exam_id == models.Exam.id, live.student_id == student_id)
+        )
+        .outerjoin(
+            archived,
+            and_(
+                archived.exam_id == models.Exam.id, archived.student_id == student_id
+            ),
+        )
+        .where(models.Exam.is_active.is_(True))
+        .order_by(models.Exam.start_time, models.Exam.id)
+    ).all()
+
+    elsewhere = {}
+    if shards.enabled():
+        for shard in range(1, shards.count()):
+            other = shards.session(shard)
+            try:
+                elsewhere.update(
+                    (exam_id, (submission_id, submitted_at, marks))
+                    for exam_id, submission_id, submitted_at, marks in other.query(
+                        live.exam_id, live.id, live.submission_time, live.total_marks
+                    ).filter(live.student_id == student_id)
+                )
+            finally:
+                other.close()
+
+    now = datetime.now(UTC).replace(tzinfo=None)
+    dashboard = {state: [] for state in STATES}
+    for row in rows:
+        exam = row._asdict()
+        if exam["submission_id"] is None and row.id in elsewhere:
+            (
+                exam["submission_id"],
+                exam["submitted_at"],
+                exam["marks_obtained"],
+            ) = elsewhere[row.id]
+        if exam["submission_id"] is not None:
+            state = "attempted"
+        elif row.start_time > now:
+            state = "upcoming"
+        elif row.end_time >= now:
+            state = "in_progress"
+        else:
+            state = "missed"
+        dashboard[state].append(exam)
+    return dashboard
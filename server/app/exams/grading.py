@@ -0,0 +1,3 @@
+def grade_answer(question, answer: str) -> int:
+    """Marks earned for ``answer`` on ``question`` (all or nothing)."""
+    return question.marks if answer == question.correct_answer else 0
@@ -0,0 +1,213 @@
+"""Item analysis of an exam's questions.
+
+All answers of an exam (live and archived) are loaded once into a
+submissions x questions matrix of chosen options, and every statistic is a
+vectorized reduction over it:
+
+- difficulty: share of attempts answered correctly
+- discrimination: point-biserial correlation between an item and the rest of
+  the score (the total without that item)
+- options: how often each option was picked, overall and in the top and bottom
+  27% of students by score
+- reliability: KR-20 over the whole paper
+
+On sampled exams a question counts as attempted only when it was answered,
+and KR-20 is not reported since students sat different papers. Results are
+cached per exam version: the paper, its answer keys and the set of
+submissions.
+"""
+
+import hashlib
+import json
+import math
+from itertools import islice
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import archive, models
+from .papers import LRUCache
+
+NOT_ANSWERED = -2
+NOT_AN_OPTION = -1
+GROUP_SHARE = 0.27
+BATCH_SIZE = 50_000
+
+_cache = LRUCache(256)
+
+
+def _positions(values: np.ndarray, keys: Sequence[int]) -> np.ndarray:
+    """Index of each of ``values`` in ``keys``, -1 where it is absent."""
+    keys = np.asarray(keys, dtype=np.int64)
+    if not len(keys):
+        return np.full(len(values), -1)
+    order = np.argsort(keys)
+    found = np.minimum(np.searchsorted(keys, values, sorter=order), len(keys) - 1)
+    return np.where(keys[order[found]] == values, order[found], -1)
+
+
+def _options(question) -> List[str]:
+    options = question.options
+    if isinstance(options, str):
+        try:
+            options = json.loads(options)
+        except json.JSONDecodeError:
+            options = []
+    return list(options or [])
+
+
+def version(exam, paper, submissions) -> tuple:
+    digest = hashlib.blake2b(digest_size=16)
+    for q in paper:
+        digest.update(repr((q.id, q.marks, q.correct_answer, q.options)).encode())
+    return (
+        exam.id,
+        exam.updated_at,
+        exam.questions_per_student,
+        digest.hexdigest(),
+        len(submissions),
+        max((s.id for s in submissions), default=0),
+    )
+
+
+def answer_matrix(db: Session, exam, paper, submissions):
+    """Chosen option per (submission, question) and whether it was correct."""
+    options = [_options(q) for q in paper]
+    chosen = np.full((len(submissions), len(paper)), NOT_ANSWERED, dtype=np.int16)
+    correct = np.zeros(chosen.shape, dtype=bool)
+    submission_ids = [s.id for s in submissions]
+    question_ids = [q.id for q in paper]
+    texts: Dict[Optional[str], int] = {}
+    r, c, t = [], [], []
+    answers = archive.exam_answers(db, exam.id)
+    while batch := list(islice(answers, BATCH_SIZE)):
+        subs, questions, text, _ = zip(*batch)
+        r.append(_positions(np.fromiter(subs, np.int64, len(batch)), submission_ids))
+        c.append(_positions(np.fromiter(questions, np.int64, len(batch)), question_ids))
+        t.append(
+            np.fromiter(
+                (texts.setdefault(a, len(texts)) for a in text), np.int64, len(batch)
+            )
+        )
+    if not texts:
+        return options, chosen, correct
+    r, c, t = np.concatenate(r), np.concatenate(c), np.concatenate(t)
+    keep = (r >= 0) & (c >= 0)
+    r, c, t = r[keep], c[keep], t[keep]
+
+    # Resolve each distinct (question, answer text) pair once
+    text_of = list(texts)
+    pairs, inverse = np.unique(c * len(text_of) + t, return_inverse=True)
+    codes = np.empty(len(pairs), dtype=np.int16)
+    right = np.empty(len(pairs), dtype=bool)
+    for i, pair in enumerate(pairs.tolist()):
+        j, text = divmod(pair, len(text_of))
+        answer = text_of[text]
+        codes[i] = options[j].index(answer) if answer in options[j] else NOT_AN_OPTION
+        right[i] = answer == paper[j].correct_answer
+    chosen[r, c] = codes[inverse]
+    correct[r, c] = right[inverse]
+    return options, chosen, correct
+
+
+def analyze(exam, paper, options, chosen, correct) -> Dict:
+    n, k = chosen.shape
+    marks = np.array([q.marks or 0 for q in paper], dtype=np.float64)
+    if exam.questions_per_student:
+        attempted = chosen != NOT_ANSWERED
+    else:
+        attempted = np.ones(chosen.shape, dtype=bool)
+    x = correct.astype(np.float64)
+    w = attempted.astype(np.float64)
+    attempts = attempted.sum(axis=0)
+    right = correct.sum(axis=0)
+    totals = x @ marks
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        difficulty = right / attempts
+
+        # Point-biserial against the rest score, over attempts only
+        rest = totals[:, None] - x * marks
+        mean_x = (x * w).sum(axis=0) / attempts
+        mean_rest = (rest * w).sum(axis=0) / attempts
+        dx = (x - mean_x) * w
+        drest = (rest - mean_rest) * w
+        discrimination = (dx * drest).sum(axis=0) / np.sqrt(
+            (dx**2).sum(axis=0) * (drest**2).sum(axis=0)
+        )
+
+    # Option counts overall and in the upper and lower groups
+    width = max((len(o) for o in options), default=0) or 1
+    cols = np.broadcast_to(np.arange(k), chosen.shape)
+    picked = chosen >= 0
+
+    def counts(mask):
+        m = picked & mask
+        return np.bincount(
+            (cols[m] * width + chosen[m]).astype(np.int64), minlength=k * width
+        ).reshape(k, width)
+
+    by_score = np.argsort(totals, kind="stable")
+    group = max(1, math.ceil(n * GROUP_SHARE)) if n else 0
+    lower = np.zeros(n, dtype=bool)
+    upper = np.zeros(n, dtype=bool)
+    lower[by_score[:group]] = True
+    upper[by_score[n - group :]] = True
+    everyone = counts(np.ones(chosen.shape, dtype=bool))
+    upper_counts = counts(upper[:, None])
+    lower_counts = counts(lower[:, None])
+
+    reliability = None
+    if not exam.questions_per_student and n > 1 and k > 1:
+        variance = x.sum(axis=1).var()
+        p = right / n
+        if variance > 0:
+            reliability = float(k / (k - 1) * (1 - (p * (1 - p)).sum() / variance))
+
+    questions = []
+    for j, question in enumerate(paper):
+        questions.append(
+            {
+                "question_id": question.id,
+                "question_text": question.question_text,
+                "correct_answers": int(right[j]),
+                "total_attempts": int(attempts[j]),
+                "correct_percentage": float(difficulty[j] * 100) if attempts[j] else 0,
+                "difficulty": float(difficulty[j]) if attempts[j] else None,
+                "discrimination": (
+                    float(discrimination[j])
+                    if np.isfinite(discrimination[j])
+                    else None
+                ),
+                "options": [
+                    {
+                        "option": option,
+                        "is_correct": option == question.correct_answer,
+                        "count": int(everyone[j, i]),
+                        "percentage": (
+                            everyone[j, i] / attempts[j] * 100 if attempts[j] else 0
+                        ),
+                        "discrimination": (
+                            (upper_counts[j, i] - lower_counts[j, i]) / group
+                            if group
+                            else None
+                        ),
+                    }
+                    for i, option in enumerate(options[j])
+                ],
+            }
+        )
+    return {"reliability": reliability, "questions": questions}
+
+
+def item_analysis(db: Session, exam: models.Exam, submissions: List) -> Dict:
+    """Item statistics for ``exam``, recomputed only when its version changes."""
+    paper = exam.paper
+    key = version(exam, paper, submissions)
+    result = _cache.get(key)
+    if result is None:
+        options, chosen, correct = answer_matrix(db, exam, paper, submissions)
+        result = analyze(exam, paper, options, chosen, correct)
+        _cache.put(key, result)
+    return result
@@ -0,0 +1,190 @@
+from collections import defaultdict
+
+from app.changes import log as changes
+from app.jobs.runner import JobContext, job_handler
+from . import archive, models, schemas, shards
+from .lifecycle import scheduler as lifecycle
+from .bulk import insert_questions
+from .grading import grade_answer
+from .leaderboard import leaderboards
+
+BATCH_SIZE = 1000
+
+
+@job_handler("create_exam")
+def create_exam(ctx: JobContext, params: dict):
+    db = ctx.db
+    exam = schemas.ExamCreate.model_validate(params["exam"])
+    db_exam = models.Exam(
+        title=exam.title,
+        description=exam.description,
+        start_time=exam.start_time,
+        end_time=exam.end_time,
+        duration_minutes=exam.duration_minutes,
+        shuffle_questions=exam.shuffle_questions,
+        shuffle_options=exam.shuffle_options,
+        questions_per_student=exam.questions_per_student,
+        paper_seed=exam.paper_seed,
+        faculty_id=params["faculty_id"],
+    )
+    db.add(db_exam)
+    db.flush()
+    exam_id = db_exam.id
+
+    try:
+        total = len(exam.questions)
+        for start in range(0, total, BATCH_SIZE):
+            insert_questions(db, exam_id, exam.questions[start : start + BATCH_SIZE])
+            ctx.progress(min(start + BATCH_SIZE, total), total)
+        db.commit()
+    except BaseException:
+        # Batches are committed as they go, don't leave half an exam behind
+        db.rollback()
+        questions = db.query(models.Question).filter(
+            models.Question.exam_id == exam_id
+        )
+        deleted = [
+            {"id": q_id, "exam_id": exam_id}
+            for (q_id,) in questions.values(models.Question.id)
+        ]
+        changes.record(db, models.Question, "delete", deleted)
+        questions.delete()
+        db.query(models.Exam).filter(models.Exam.id == exam_id).delete()
+        changes.record(
+            db,
+            models.Exam,
+            "delete",
+            [{"id": exam_id, "faculty_id": params["faculty_id"]}],
+        )
+        db.commit()
+        raise
+    lifecycle.track(db_exam)
+    return {"exam_id": exam_id, "questions": total}
+
+
+@job_handler("regrade_exam")
+def regrade_exam(ctx: JobContext, params: dict):
+    """Grade every stored answer of an exam again against its current key.
+
+    Archived submissions are regraded in their packed answers.
+    """
+    db = ctx.db
+    exam_id = params["exam_id"]
+    questions = {
+        q.id: q
+        for q in db.query(models.Question).filter(models.in_paper(exam_id))
+    }
+    with shards.submission_db(db, exam_id) as live:
+        submission_ids = [
+            submission_id
+            for (submission_id,) in live.query(models.ExamSubmission.id)
+            .filter(models.ExamSubmission.exam_id == exam_id)
+            .order_by(models.ExamSubmission.id)
+        ]
+        archived_ids = [
+            submission_id
+            for (submission_id,) in db.query(models.ArchivedSubmission.id)
+            .filter(models.ArchivedSubmission.exam_id == exam_id)
+            .order_by(models.ArchivedSubmission.id)
+        ]
+
+        changed = 0
+        total = len(submission_ids) + len(archived_ids)
+        ctx.progress(0, total)
+        for start in range(0, len(submission_ids), BATCH_SIZE):
+            batch = submission_ids[start : start + BATCH_SIZE]
+            totals = defaultdict(int)
+            answers = (
+                live.query(models.AnswerSubmission)
+                .filter(models.AnswerSubmission.submission_id.in_(batch))
+                .all()
+            )
+            for answer in answers:
+                question = questions.get(answer.question_id)
+                marks = grade_answer(question, answer.answer) if question else 0
+                if marks != answer.marks_obtained:
+                    answer.marks_obtained = marks
+                    changed += 1
+                totals[answer.submission_id] += marks
+
+            submissions = (
+                live.query(models.ExamSubmission)
+                .filter(models.ExamSubmission.id.in_(batch))
+                .all()
+            )
+            for submission in submissions:
+                submission.total_marks = totals[submission.id]
+            # On another shard the batch is committed there, then the job
+            live.commit()
+            ctx.progress(start + len(batch), total)
+
+    done = len(submission_ids)
+    for start in range(0, len(archived_ids), BATCH_SIZE):
+        batch = archived_ids[start : start + BATCH_SIZE]
+        regraded = []
+        for submission in db.query(models.ArchivedSubmission).filter(
+            models.ArchivedSubmission.id.in_(batch)
+        ):
+            answers = archive.unpack_answers(submission.answers)
+            answers_changed = 0
+            for answer in answers:
+                question = questions.get(answer["question_id"])
+                marks = grade_answer(question, answer["answer"]) if question else 0
+                if marks != answer["marks_obtained"]:
+                    answer["marks_obtained"] = marks
+                    answers_changed += 1
+            total_marks = sum(answer["marks_obtained"] for answer in answers)
+            if answers_changed:
+                submission.answers = archive.repack_answers(answers)
+                changed += answers_changed
+            if total_marks != submission.total_marks:
+                submission.total_marks = total_marks
+                regraded.append(
+                    {
+                        "id": submission.id,
+                        "exam_id": exam_id,
+                        "student_id": submission.student_id,
+                        "total_marks": total_marks,
+                    }
+                )
+        # Archived rows aren't tracked, log them as the submissions they were
+        changes.record(db, models.ExamSubmission, "update", regraded)
+        db.commit()
+        ctx.progress(done + start + len(batch), total)
+    leaderboards.invalidate(exam_id)
+    return {
+        "submissions": total,
+        "archived": len(archived_ids),
+        "answers_changed": changed,
+    }
+
+
+@job_handler("finalize_exam")
+def finalize_exam(ctx: JobContext, params: dict):
+    """Index the ranks and item statistics of a closed exam, then mark it graded."""
+    db = ctx.db
+    exam = db.get(models.Exam, params["exam_id"])
+    if exam is None or exam.status != models.CLOSED:
+        return {"exam_id": params["exam_id"], "graded": False}
+    # Late submissions are in now: rank every one of them
+    leaderboards.invalidate(exam.id)
+    ranking = leaderboards.get(db, exam.id)
+
+    submissions = archive.exam_submissions(db, exam.id)
+    if submissions:
+        # Imported here so workers only load NumPy once an exam closes
+        from . import items
+
+        items.item_analysis(db, exam, submissions)
+
+    graded = (
+        db.query(models.Exam)
+        .filter(models.Exam.id == exam.id, models.Exam.status == models.CLOSED)
+        .update({"status": models.GRADED}, synchronize_session=False)
+    )
+    if graded:
+        changes.record(
+            db, models.Exam, "update", [{"id": exam.id, "status": models.GRADED}]
+        )
+    db.commit()
+    return {"exam_id": exam.id, "graded": bool(graded), "submissions": len(ranking)}
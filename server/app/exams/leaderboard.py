@@ -0,0 +1,153 @@
+"""Per-exam rank index over submission totals.
+
+Each exam keeps its ``(-total_marks, student_id)`` pairs in a sorted list, so
+rank, percentile and cutoff lookups are a bisect or an index away. Ties share
+a rank (competition ranking: 1, 2, 2, 4), and a student's percentile is the
+share of the others scoring below them, counting ties as half.
+
+The index is rebuilt from live submissions in the background at startup (a
+read before it is done loads its exam directly) and updated by
+``submit_exam`` in this process. Exams are reloaded from the database, archive
+included, once older than ``LEADERBOARD_REFRESH_SECONDS``, which picks up
+submissions and regrades made by other processes.
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database.db import SessionLocal
+from . import models, shards
+
+
+class ExamRanking:
+    def __init__(self, scores: Dict[int, int]):
+        self.scores = dict(scores)
+        self.keys: List[Tuple[int, int]] = sorted(
+            (-score, student_id) for student_id, score in self.scores.items()
+        )
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def record(self, student_id: int, score: int):
+        # Copy on write: readers keep using the list they started with
+        keys = list(self.keys)
+        old = self.scores.get(student_id)
+        if old is not None:
+            del keys[bisect_left(keys, (-old, student_id))]
+        insort(keys, (-score, student_id))
+        self.scores[student_id] = score
+        self.keys = keys
+
+    def rank(self, score: int) -> int:
+        return bisect_left(self.keys, (-score,)) + 1
+
+    def percentile(self, score: int) -> float:
+        keys = self.keys
+        if len(keys) < 2:
+            return 100.0
+        higher = bisect_left(keys, (-score,))
+        at_least = bisect_left(keys, (-score + 1,))
+        below = len(keys) - at_least
+        # Among the others: the student's own entry is one of the ties
+        ties = at_least - higher - 1
+        return (below + ties / 2) / (len(keys) - 1) * 100
+
+    def top(self, limit: int) -> List[Tuple[int, int, int]]:
+        """``(rank, student_id, score)`` of the best ``limit`` entries."""
+        entries = []
+        keys = self.keys[:limit]
+        for position, (negated, student_id) in enumerate(keys):
+            if position and negated == keys[position - 1][0]:
+                rank = entries[-1][0]
+            else:
+                rank = position + 1
+            entries.append((rank, student_id, -negated))
+        return entries
+
+    def cutoff(self, percentile: float) -> Optional[int]:
+        """Lowest score within the top ``100 - percentile`` percent."""
+        keys = self.keys
+        if not keys:
+            return None
+        position = math.ceil((100 - percentile) / 100 * len(keys)) - 1
+        return -keys[min(max(position, 0), len(keys) - 1)][0]
+
+
+class Leaderboards:
+    def __init__(self):
+        self._exams: Dict[int, ExamRanking] = {}
+        self._lock = threading.Lock()
+        self.built = False
+
+    def rebuild(self):
+        """Index every exam with live submissions."""
+        db = SessionLocal()
+        try:
+            scores = defaultdict(dict)
+            for live in shards.submission_dbs(db):
+                rows = live.query(
+                    models.ExamSubmission.exam_id,
+                    models.ExamSubmission.student_id,
+                    models.ExamSubmission.total_marks,
+                ).yield_per(10000)
+                for exam_id, student_id, total in rows:
+                    scores[exam_id][student_id] = total or 0
+        finally:
+            db.close()
+        with self._lock:
+            for exam_id, exam_scores in scores.items():
+                # Exams loaded by a read in the meantime are at least as fresh
+                if exam_id not in self._exams:
+                    self._exams[exam_id] = ExamRanking(exam_scores)
+            self.built = True
+
+    def _load(self, db: Session, exam_id: int) -> ExamRanking:
+        scores = {}
+        with shards.submission_db(db, exam_id) as live:
+            for model, source in (
+                (models.ArchivedSubmission, db),
+                (models.ExamSubmission, live),
+            ):
+                rows = source.query(model.student_id, model.total_marks).filter(
+                    model.exam_id == exam_id
+                )
+                for student_id, total in rows:
+                    scores[student_id] = total or 0
+        return ExamRanking(scores)
+
+    def get(self, db: Session, exam_id: int) -> ExamRanking:
+        with self._lock:
+            ranking = self._exams.get(exam_id)
+        if (
+            ranking is None
+            or time.monotonic() - ranking.loaded_at
+            > settings.LEADERBOARD_REFRESH_SECONDS
+        ):
+            ranking = self._load(db, exam_id)
+            with self._lock:
+                self._exams[exam_id] = ranking
+        return ranking
+
+    def record(self, exam_id: int, student_id: int, score: int):
+        with self._lock:
+            ranking = self._exams.get(exam_id)
+            if ranking is None:
+                # Nothing indexed yet: the first read loads the exam
+                return
+            ranking.record(student_id, score)
+
+    def invalidate(self, exam_id: int):
+        with self._lock:
+            self._exams.pop(exam_id, None)
+
+
+leaderboards = Leaderboards()
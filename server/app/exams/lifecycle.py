@@ -0,0 +1,271 @@
+"""Exam status transitions at their exact times.
+
+An exam is ``scheduled`` until its start time, ``live`` until its end time,
+then ``closed`` until the finalization job has built its rank index and item
+statistics, after which it is ``graded``. List endpoints filter on the
+indexed status column instead of comparing times.
+
+``LifecycleScheduler`` keeps the transitions still ahead in a heap, loaded at
+startup from exams not yet graded. Exams created in this process are added as
+they are created. A thread sleeps until the earliest transition is due, then
+applies every due transition with one UPDATE per target status. The UPDATE
+is guarded by the exam's times and current status. Every worker process
+runs a scheduler, and only the process whose UPDATE closed an exam enqueues
+its finalization. The heap is reloaded every ``LIFECYCLE_RELOAD_SECONDS`` to
+pick up exams created by other processes that have since exited.
+
+Closed exams found by a reload are finalized again, with one finalization
+job per exam pending at a time across processes. A finalization that failed
+is retried after ``FINALIZE_RETRY_SECONDS``, doubling after each failure,
+and given up after ``FINALIZE_MAX_ATTEMPTS`` failures.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from datetime import UTC, datetime, timedelta
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import func, or_, update
+from sqlalchemy.orm import Session
+
+from app.changes import log as changes
+from app.config import settings
+from app.database.db import SessionLocal
+from app.jobs.models import Job
+from app.jobs.runner import runner
+from . import models
+from .models import CLOSED, GRADED, LIVE
+
+logger = logging.getLogger(__name__)
+
+RETRY_SECONDS = 10
+
+
+def _naive(when: datetime) -> datetime:
+    if when.tzinfo is not None:
+        return when.astimezone(UTC).replace(tzinfo=None)
+    return when
+
+
+def _movable(target: str):
+    """Exams that may still move to ``target``.
+
+    Statuses of older releases ("pending", "upcoming", "completed") count as
+    scheduled.
+    """
+    later = (LIVE, CLOSED, GRADED) if target == LIVE else (CLOSED, GRADED)
+    return or_(models.Exam.status.is_(None), models.Exam.status.notin_(later))
+
+
+class LifecycleScheduler:
+    def __init__(self, reload_seconds: int):
+        self.reload_seconds = reload_seconds
+        self.transitions = 0
+        # (when, sequence, exam_id, status)
+        self._heap: List[Tuple[datetime, int, int, str]] = []
+        self._pending: Set[Tuple[int, str, datetime]] = set()
+        # Exams created already closed, to finalize
+        self._closed: Set[int] = set()
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._loop, name="exam-lifecycle", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self._thread = None
+
+    def track(self, exam: models.Exam):
+        """Schedule the transitions still ahead of ``exam``."""
+        self._track(exam.id, exam.status, exam.start_time, exam.end_time)
+        with self._condition:
+            if exam.status == CLOSED:
+                self._closed.add(exam.id)
+            self._condition.notify()
+
+    def _track(self, exam_id: int, status: str, start_time, end_time):
+        ahead = []
+        if status not in (LIVE, CLOSED, GRADED):
+            ahead.append((_naive(start_time), LIVE))
+        if status not in (CLOSED, GRADED):
+            ahead.append((_naive(end_time), CLOSED))
+        with self._condition:
+            for when, target in ahead:
+                key = (exam_id, target, when)
+                if key not in self._pending:
+                    self._pending.add(key)
+                    heapq.heappush(
+                        self._heap, (when, next(self._sequence), exam_id, target)
+                    )
+
+    def _due(self, now: datetime) -> List[Tuple[datetime, int, int, str]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            self._pending.discard((entry[2], entry[3], entry[0]))
+            due.append(entry)
+        return due
+
+    def _loop(self):
+        next_reload = 0.0
+        while True:
+            due = []
+            with self._condition:
+                while not self._stopping:
+                    due = self._due(datetime.now(UTC).replace(tzinfo=None))
+                    closed, self._closed = list(self._closed), set()
+                    timeout = next_reload - time.monotonic()
+                    if due or closed or timeout <= 0:
+                        break
+                    if self._heap:
+                        now = datetime.now(UTC).replace(tzinfo=None)
+                        timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+                    self._condition.wait(max(timeout, 0))
+                if self._stopping:
+                    return
+            try:
+                if due:
+                    self.apply(due)
+                if closed:
+                    self.finalize(closed)
+                if time.monotonic() >= next_reload:
+                    self.load()
+                    next_reload = time.monotonic() + self.reload_seconds
+            except Exception:
+                logger.exception("Exam lifecycle transitions failed")
+                # Reloading from the database reschedules whatever was lost
+                next_reload = time.monotonic() + RETRY_SECONDS
+
+    def load(self):
+        """Schedule every exam not graded yet, finalize closed ones."""
+        db = SessionLocal()
+        try:
+            closed = []
+            for exam_id, status, start_time, end_time in db.query(
+                models.Exam.id,
+                models.Exam.status,
+                models.Exam.start_time,
+                models.Exam.end_time,
+            ).filter(
+                or_(models.Exam.status.is_(None), models.Exam.status != GRADED)
+            ):
+                if status == CLOSED:
+                    closed.append(exam_id)
+                else:
+                    self._track(exam_id, status, start_time, end_time)
+            _finalize(db, closed)
+        finally:
+            db.close()
+
+    def finalize(self, exam_ids: List[int]):
+        db = SessionLocal()
+        try:
+            _finalize(db, exam_ids)
+        finally:
+            db.close()
+
+    def apply(self, due: List[Tuple[datetime, int, int, str]]):
+        """Move the exams of ``due`` transitions, one UPDATE per status."""
+        now = datetime.now(UTC).replace(tzinfo=None)
+        targets = {LIVE: set(), CLOSED: set()}
+        for _, _, exam_id, target in due:
+            targets[target].add(exam_id)
+        db = SessionLocal()
+        try:
+            closed = []
+            # Exams going live and closing in the same batch end up closed
+            for target, reached in (
+                (LIVE, models.Exam.start_time <= now),
+                (CLOSED, models.Exam.end_time < now),
+            ):
+                if not targets[target]:
+                    continue
+                moved = self._update(
+                    db,
+                    update(models.Exam)
+                    .where(
+                        models.Exam.id.in_(targets[target]), reached, _movable(target)
+                    )
+                    .values(status=target),
+                )
+                self.transitions += len(moved)
+                changes.record(
+                    db,
+                    models.Exam,
+                    "update",
+                    [{"id": exam_id, "status": target} for exam_id in moved],
+                )
+                if target == CLOSED:
+                    closed = moved
+            db.commit()
+            _finalize(db, closed)
+        finally:
+            db.close()
+        # Times moved since they were scheduled are picked up by the next load
+
+    def _update(self, db: Session, statement) -> List[int]:
+        if db.get_bind().dialect.update_returning:
+            moved = db.execute(statement.returning(models.Exam.id))
+            return [exam_id for (exam_id,) in moved]
+        # Without RETURNING: the exams matching now, then the guarded update
+        moved = [
+            exam_id
+            for (exam_id,) in db.query(models.Exam.id).filter(
+                statement.whereclause
+            )
+        ]
+        db.execute(statement)
+        return moved
+
+
+def _finalize(db: Session, exam_ids: List[int]):
+    """Enqueue the finalization of closed exams, unless pending or backing off."""
+    if not exam_ids:
+        return
+    params = {exam_id: json.dumps({"exam_id": exam_id}) for exam_id in exam_ids}
+    failures = {
+        job_params: (count, last)
+        for job_params, count, last in db.query(
+            Job.params, func.count(), func.max(Job.finished_at)
+        )
+        .filter(
+            Job.kind == "finalize_exam",
+            Job.status == "failed",
+            Job.params.in_(params.values()),
+        )
+        .group_by(Job.params)
+    }
+    now = datetime.now(UTC).replace(tzinfo=None)
+    for exam_id in exam_ids:
+        count, last = failures.get(params[exam_id], (0, None))
+        if count >= settings.FINALIZE_MAX_ATTEMPTS:
+            continue
+        if last is not None:
+            delay = settings.FINALIZE_RETRY_SECONDS * 2 ** (count - 1)
+            if now < last + timedelta(seconds=delay):
+                continue
+        runner.enqueue(
+            db,
+            "finalize_exam",
+            {"exam_id": exam_id},
+            None,
+            dedupe_key=f"finalize_exam:{exam_id}",
+        )
+
+
+scheduler = LifecycleScheduler(settings.LIFECYCLE_RELOAD_SECONDS)
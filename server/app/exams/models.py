@@ -1,20 +1,42 @@
 from datetime import UTC, datetime
-from turtle import update
 from sqlalchemy import (
-    ARRAY,
     Column,
     Integer,
     String,
     DateTime,
     Boolean,
     ForeignKey,
+    Index,
     Text,
+    LargeBinary,
 )
+from sqlalchemy import or_, select
 from sqlalchemy.orm import relationship
+from app.bank.models import ExamBankQuestion
 from app.database.db import Base
 from sqlalchemy.orm import Mapped, mapped_column
 
 
+# Exam lifecycle, driven by app/exams/lifecycle.py
+SCHEDULED, LIVE, CLOSED, GRADED = "scheduled", "live", "closed", "graded"
+
+
+def status_at(start_time, end_time, now=None) -> str:
+    """The status an exam with these times should have at ``now``."""
+    now = now or datetime.now(UTC).replace(tzinfo=None)
+    if start_time.tzinfo is not None:
+        start_time = start_time.astimezone(UTC).replace(tzinfo=None)
+        end_time = end_time.astimezone(UTC).replace(tzinfo=None)
+    if now < start_time:
+        return SCHEDULED
+    return LIVE if now <= end_time else CLOSED
+
+
+def _initial_status(context):
+    params = context.get_current_parameters()
+    return status_at(params["start_time"], params["end_time"])
+
+
 class Exam(Base):
     __tablename__ = "exams"
 
@@ -25,36 +47,73 @@ class Exam(Base):
     end_time: Mapped[DateTime] = mapped_column(DateTime)
     duration_minutes = Column(Integer)
     faculty_id = Column(Integer, ForeignKey("users.id"))
-    status = Column(String, default="pending")
+    status = Column(String, default=_initial_status, index=True)
     is_active = Column(Boolean, default=True)
     total_marks = Column(Integer, default=0)
-    created_at: Mapped[DateTime] = mapped_column(DateTime, default=datetime.now(UTC))
+    shuffle_questions = Column(Boolean, default=False)
+    shuffle_options = Column(Boolean, default=False)
+    questions_per_student = Column(Integer, nullable=True)  # sample from the pool
+    paper_seed = Column(Integer, default=0)
+    created_at: Mapped[DateTime] = mapped_column(
+        DateTime, default=lambda: datetime.now(UTC)
+    )
     updated_at: Mapped[DateTime] = mapped_column(
-        DateTime, default=datetime.now(UTC), onupdate=datetime.now(UTC)
+        DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC)
     )
     # Relationships
     faculty = relationship("User", back_populates="created_exams")
     questions = relationship("Question", back_populates="exam")
+    bank_questions = relationship(
+        "Question",
+        secondary="exam_bank_questions",
+        order_by="ExamBankQuestion.position",
+        viewonly=True,
+    )
     submissions = relationship("ExamSubmission", back_populates="exam")
 
+    @property
+    def paper(self):
+        """The exam's own questions followed by those attached from the bank"""
+        return list(self.questions) + list(self.bank_questions)
+
 
 class Question(Base):
     __tablename__ = "questions"
 
     id = Column(Integer, primary_key=True, index=True)
-    exam_id = Column(Integer, ForeignKey("exams.id"))
+    exam_id = Column(Integer, ForeignKey("exams.id"))  # None for bank questions
     question_text = Column(Text)
     marks = Column(Integer)
     options = Column(Text)  # JSON string of options
     correct_answer = Column(String)
+    faculty_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    tags = Column(Text, nullable=True)  # space separated, normalized
 
     # Relationships
     exam = relationship("Exam", back_populates="questions")
     submissions = relationship("AnswerSubmission", back_populates="question")
 
 
+def in_paper(exam_id: int):
+    """Filter for questions on an exam's paper, own or attached from the bank"""
+    return or_(
+        Question.exam_id == exam_id,
+        Question.id.in_(
+            select(ExamBankQuestion.question_id).where(
+                ExamBankQuestion.exam_id == exam_id
+            )
+        ),
+    )
+
+
 class ExamSubmission(Base):
     __tablename__ = "exam_submissions"
+    __table_args__ = (
+        # A student's submission of an exam, for dashboards and duplicate checks
+        Index("ix_exam_submissions_student_exam", "student_id", "exam_id"),
+        # Archived rows keep their id, SQLite must not hand it out again
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     exam_id = Column(Integer, ForeignKey("exams.id"))
@@ -81,3 +140,38 @@ class AnswerSubmission(Base):
     # Relationships
     submission = relationship("ExamSubmission", back_populates="answers")
     question = relationship("Question", back_populates="submissions")
+
+
+class ArchivedSubmission(Base):
+    """A submission of a closed exam, with its answers packed into one blob"""
+
+    __tablename__ = "archived_submissions"
+
+    id = Column(Integer, primary_key=True)  # id it had in exam_submissions
+    exam_id = Column(Integer, ForeignKey("exams.id"), index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), index=True)
+    submission_time = Column(DateTime)
+    total_marks = Column(Integer, default=0)
+    is_submitted = Column(Boolean, default=True)
+    term = Column(String, index=True)
+    archived_at = Column(DateTime)
+    answers = Column(LargeBinary)  # see app/exams/archive.py
+
+
+class SubmissionShard(Base):
+    """Which database holds an exam's live submissions, see app/exams/shards.py"""
+
+    __tablename__ = "submission_shards"
+
+    exam_id = Column(Integer, ForeignKey("exams.id"), primary_key=True)
+    shard = Column(Integer, nullable=False, index=True)  # 0 is the primary
+    assigned_at = Column(DateTime)
+
+
+class SubmissionIdBlock(Base):
+    """The next submission or answer id to hand out, when submissions are sharded"""
+
+    __tablename__ = "submission_id_blocks"
+
+    id = Column(Integer, primary_key=True)  # 1 for submissions, 2 for answers
+    next_id = Column(Integer, nullable=False)
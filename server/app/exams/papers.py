@@ -0,0 +1,122 @@
+"""Per-student question papers.
+
+A student's paper is a pure function of ``(exam_id, student_id, seed)`` and the
+shape of the question pool, so it is recomputed on demand instead of stored.
+The pool is the exam's paper ordered by question id. Question and option
+orders are cached as compact arrays of indices in bounded LRU caches, so
+serving and grading skip the shuffle for students seen recently, and grading
+needs nothing beyond the pool itself.
+"""
+
+import hashlib
+import random
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Sequence, Tuple
+
+from app.config import settings
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_orders = LRUCache(settings.PAPER_CACHE_SIZE)
+_options = LRUCache(settings.PAPER_CACHE_SIZE)
+
+
+def is_randomized(exam) -> bool:
+    return bool(
+        exam.shuffle_questions or exam.shuffle_options or exam.questions_per_student
+    )
+
+
+def _rng(*parts) -> random.Random:
+    # hash() is salted per process, every worker must derive the same paper
+    digest = hashlib.blake2b(
+        ":".join(map(str, parts)).encode(), digest_size=8
+    ).digest()
+    return random.Random(int.from_bytes(digest, "big"))
+
+
+def question_order(exam, student_id: int, pool_size: int) -> array:
+    """Pool indices in the order ``student_id`` sees them."""
+    seed = exam.paper_seed or 0
+    sample = exam.questions_per_student
+    shuffle = bool(exam.shuffle_questions)
+    key = (exam.id, student_id, seed, pool_size, shuffle, sample)
+    order = _orders.get(key)
+    if order is None:
+        rng = _rng(exam.id, student_id, seed)
+        if sample and sample < pool_size:
+            indices = rng.sample(range(pool_size), sample)
+            if not shuffle:
+                indices.sort()
+        else:
+            indices = list(range(pool_size))
+            if shuffle:
+                rng.shuffle(indices)
+        order = array("I", indices)
+        _orders.put(key, order)
+    return order
+
+
+def option_orders(exam, student_id: int, counts: Tuple[int, ...]) -> Tuple[array, ...]:
+    """Option permutations for the student's questions, given their counts.
+
+    Cached per exam version: editing the exam bumps ``updated_at``.
+    """
+    seed = exam.paper_seed or 0
+    key = (exam.id, exam.updated_at, student_id)
+    orders = _options.get(key)
+    if orders is None:
+        rng = _rng(exam.id, student_id, seed, "options")
+        orders = []
+        for count in counts:
+            perm = list(range(count))
+            rng.shuffle(perm)
+            orders.append(array("H", perm))
+        orders = tuple(orders)
+        _options.put(key, orders)
+    return orders
+
+
+def student_questions(exam, student_id: int, pool: Sequence) -> List:
+    """``pool`` (parsed questions ordered by id) as ``student_id`` sees it."""
+    questions = [pool[i] for i in question_order(exam, student_id, len(pool))]
+    if not exam.shuffle_options:
+        return questions
+    perms = option_orders(exam, student_id, tuple(len(q.options) for q in questions))
+    return [
+        q.model_copy(update={"options": [q.options[i] for i in perm]})
+        for q, perm in zip(questions, perms)
+    ]
+
+
+def in_student_paper(exam, student_id: int, pool_size: int, index: int) -> bool:
+    """Whether pool entry ``index`` was dealt to ``student_id``."""
+    if not exam.questions_per_student:
+        return True
+    return index in question_order(exam, student_id, pool_size)
@@ -0,0 +1,98 @@
+"""Serialized exam papers shared by everyone who gets the same view.
+
+Faculty and students of exams without randomization all download the same
+JSON for a given version of an exam. It is serialized once per
+``(exam_id, updated_at)``, by one of the requests that missed the cache, and
+compressed at most once per encoding at a high level. An exam start costs one
+serialization and one compression per encoding per worker, however many
+students open the paper.
+"""
+
+import hashlib
+import threading
+from datetime import UTC, datetime, timedelta
+from typing import Dict, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy.orm import Session
+
+from app import compression
+from app.config import settings
+from app.singleflight import SingleFlight
+from . import models, schemas
+from .papers import LRUCache
+
+_cache = LRUCache(256)
+_builds = SingleFlight("exam_payload")
+
+
+class ExamPayload:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self._encoded: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str) -> bytes:
+        body = self._encoded.get(encoding)
+        if body is None:
+            with self._lock:
+                body = self._encoded.get(encoding)
+                if body is None:
+                    body = compression.compress(
+                        self.body, encoding, compression.STATIC_LEVELS[encoding]
+                    )
+                    self._encoded[encoding] = body
+        return body
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+def payload(exam: models.Exam) -> ExamPayload:
+    key = (exam.id, exam.updated_at)
+    cached = _cache.get(key)
+    if cached is None:
+        # Requests that missed together serialize the paper once
+        cached = _builds.do(key, _build, key, exam)
+    return cached
+
+
+def _build(key, exam: models.Exam) -> ExamPayload:
+    body = schemas.Exam.model_validate(exam).model_dump_json().encode()
+    built = ExamPayload(body)
+    _cache.put(key, built)
+    return built
+
+
+def exam_response(exam: models.Exam, request: Request) -> Response:
+    """The shared paper of ``exam``, precompressed when the client accepts it."""
+    shared = payload(exam)
+    encoding = compression.negotiate(request.headers.get("accept-encoding", ""))
+    if len(shared.body) < settings.COMPRESSION_MIN_BYTES:
+        encoding = None
+    headers = {"ETag": shared.etag(encoding), "Vary": "Accept-Encoding"}
+    if shared.digest in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if encoding is None:
+        return Response(shared.body, media_type="application/json", headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(
+        shared.encoded(encoding), media_type="application/json", headers=headers
+    )
+
+
+def warm(db: Session, within: timedelta = timedelta(hours=1)) -> int:
+    """Prepare the papers of exams running now or starting soon."""
+    now = datetime.now(UTC).replace(tzinfo=None)
+    exams = db.query(models.Exam).filter(
+        models.Exam.start_time <= now + within, models.Exam.end_time >= now
+    )
+    warmed = 0
+    for exam in exams:
+        shared = payload(exam)
+        if len(shared.body) >= settings.COMPRESSION_MIN_BYTES:
+            for encoding in compression.CODECS:
+                shared.encoded(encoding)
+        warmed += 1
+    return warmed
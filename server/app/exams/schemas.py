@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import AliasChoices, BaseModel, Field, validator
 from typing import List, Optional
 from datetime import datetime
 import json
@@ -20,7 +20,7 @@ class QuestionResponse(BaseModel):
     marks: int
     correct_answer: str
     id: int
-    exam_id: int
+    exam_id: Optional[int] = None  # None for questions attached from the bank
     options: list[str]
 
     @validator("options", pre=True)
@@ -57,6 +57,11 @@ class ExamBase(BaseModel):
     start_time: datetime
     end_time: datetime
     duration_minutes: int
+    # Per-student randomization, see app/exams/papers.py
+    shuffle_questions: bool = False
+    shuffle_options: bool = False
+    questions_per_student: Optional[int] = Field(None, ge=1)
+    paper_seed: int = 0
 
 
 class ExamCreate(ExamBase):
@@ -68,12 +73,39 @@ class Exam(ExamBase):
     faculty_id: int
     is_active: bool
     status: str
-    questions: List[QuestionResponse]
+    # ORM exams expose their full paper, own and bank questions, as "paper"
+    questions: List[QuestionResponse] = Field(
+        validation_alias=AliasChoices("paper", "questions")
+    )
 
     class Config:
         from_attributes = True
 
 
+class DashboardExam(BaseModel):
+    id: int
+    title: str
+    description: Optional[str] = None
+    start_time: datetime
+    end_time: datetime
+    duration_minutes: int
+    submission_id: Optional[int] = None
+    submitted_at: Optional[datetime] = None
+    marks_obtained: Optional[int] = None
+
+
+class StudentDashboard(BaseModel):
+    upcoming: List[DashboardExam]
+    in_progress: List[DashboardExam]
+    attempted: List[DashboardExam]
+    missed: List[DashboardExam]
+
+
+class ExamImportResult(BaseModel):
+    exam_id: int
+    questions: int
+
+
 class AnswerSubmissionBase(BaseModel):
     question_id: int
     answer: str
@@ -118,6 +150,35 @@ class ExamWithSubmissions(BaseModel):
         from_attributes = True
 
 
+class LeaderboardEntry(BaseModel):
+    rank: int
+    student_id: int
+    student_name: Optional[str] = None
+    total_marks: int
+
+
+class Leaderboard(BaseModel):
+    exam_id: int
+    participants: int
+    entries: List[LeaderboardEntry]
+
+
+class StudentRank(BaseModel):
+    exam_id: int
+    student_id: int
+    total_marks: int
+    rank: int
+    percentile: float
+    participants: int
+
+
+class PercentileCutoff(BaseModel):
+    exam_id: int
+    percentile: float
+    total_marks: Optional[int] = None
+    participants: int
+
+
 class AnswerSubmissionDetail(BaseModel):
     question_id: int
     question_text: str
@@ -144,12 +205,24 @@ class SubmissionDetails(BaseModel):
         from_attributes = True
 
 
+class OptionAnalysis(BaseModel):
+    option: str
+    is_correct: bool
+    count: int
+    percentage: float
+    # Share picking it in the top 27% by score minus the share in the bottom 27%
+    discrimination: Optional[float] = None
+
+
 class QuestionAnalysis(BaseModel):
     question_id: int
     question_text: str
     correct_answers: int
     total_attempts: int
     correct_percentage: float
+    difficulty: Optional[float] = None  # share of attempts answered correctly
+    discrimination: Optional[float] = None  # point-biserial vs. the rest score
+    options: List[OptionAnalysis] = []
 
     class Config:
         from_attributes = True
@@ -162,6 +235,7 @@ class ExamAnalytics(BaseModel):
     highest_marks: int
     lowest_marks: int
     pass_percentage: float
+    reliability: Optional[float] = None  # KR-20
     question_wise_analysis: List[QuestionAnalysis]
 
     class Config:
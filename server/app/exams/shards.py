@@ -0,0 +1,400 @@
+"""Submissions spread over several databases, by exam.
+
+Each exam's live submissions and answers live in one shard: shard 0 is the
+primary, shards 1..N are the databases of ``SUBMISSION_SHARD_URLS``, each
+holding its own ``exam_submissions``, ``answer_submissions`` and the
+``change_log`` of the submissions written there. Everything
+else (exams, users, the archive, the shard map itself) stays on the primary.
+
+An exam is assigned a shard the first time its submissions are touched and
+the assignment is recorded in ``submission_shards``. Exams that already have
+submissions on the primary stay there, new ones go to ``1 + exam_id % N``.
+Assignments are cached per process for ``SUBMISSION_SHARD_MAP_SECONDS``.
+
+Submission and answer ids stay unique across shards (the archive and the
+reports key on them, and moves copy them): with shards configured they are
+reserved in blocks of ``SUBMISSION_ID_BLOCK`` from ``submission_id_blocks`` on
+the primary, row 1 for submissions and row 2 for answers.
+
+Without ``SUBMISSION_SHARD_URLS`` every helper hands back the caller's session
+and nothing is recorded, so unsharded deployments behave as before.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import MetaData, func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.changes.models import Change
+from app.config import settings
+from app.database.db import SessionLocal, ShardSessions, shard_engines
+from . import models
+
+SHARDED_MODELS = (models.ExamSubmission, models.AnswerSubmission, Change)
+COPY_BATCH = 1000
+
+
+def enabled() -> bool:
+    return bool(ShardSessions)
+
+
+def count() -> int:
+    """Number of shards, the primary included."""
+    return 1 + len(ShardSessions)
+
+
+def shard_metadata() -> MetaData:
+    """The sharded tables, without foreign keys into tables of the primary."""
+    metadata = MetaData()
+    for model in SHARDED_MODELS:
+        model.__table__.to_metadata(metadata)
+    for table in metadata.tables.values():
+        for constraint in list(table.foreign_key_constraints):
+            if constraint.elements[0].target_fullname.split(".")[0] in metadata.tables:
+                continue
+            table.constraints.discard(constraint)
+            for element in constraint.elements:
+                element.parent.foreign_keys.discard(element)
+                table.foreign_keys.discard(element)
+    return metadata
+
+
+def create_tables():
+    """Create missing submission tables and indexes on every shard."""
+    metadata = shard_metadata()
+    for shard_engine in shard_engines:
+        metadata.create_all(bind=shard_engine)
+        # Shards have no migrations: indexes added later are created here
+        for table in metadata.tables.values():
+            for index in table.indexes:
+                index.create(bind=shard_engine, checkfirst=True)
+
+
+def session(shard: int) -> Session:
+    return SessionLocal() if shard == 0 else ShardSessions[shard - 1]()
+
+
+# Shard map
+
+
+class ShardMap:
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._cache: Dict[int, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def shard_of(self, exam_id: int) -> int:
+        if not enabled():
+            return 0
+        with self._lock:
+            cached = self._cache.get(exam_id)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl_seconds:
+            return cached[0]
+        db = SessionLocal()
+        try:
+            shard = self._lookup(db, exam_id)
+            if shard is None:
+                shard = self._assign(db, exam_id)
+        finally:
+            db.close()
+        with self._lock:
+            self._cache[exam_id] = (shard, time.monotonic())
+        return shard
+
+    def _lookup(self, db: Session, exam_id: int) -> Optional[int]:
+        row = (
+            db.query(models.SubmissionShard.shard)
+            .filter(models.SubmissionShard.exam_id == exam_id)
+            .first()
+        )
+        return row.shard if row is not None else None
+
+    def _assign(self, db: Session, exam_id: int) -> int:
+        on_primary = (
+            db.query(models.ExamSubmission.id)
+            .filter(models.ExamSubmission.exam_id == exam_id)
+            .first()
+        )
+        shard = 0 if on_primary else 1 + exam_id % len(ShardSessions)
+        db.add(
+            models.SubmissionShard(
+                exam_id=exam_id, shard=shard, assigned_at=datetime.now(UTC)
+            )
+        )
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another process assigned it first
+            db.rollback()
+            shard = self._lookup(db, exam_id)
+        return shard
+
+    def move(self, db: Session, exam_id: int, shard: int):
+        updated = (
+            db.query(models.SubmissionShard)
+            .filter(models.SubmissionShard.exam_id == exam_id)
+            .update({"shard": shard, "assigned_at": datetime.now(UTC)})
+        )
+        if not updated:
+            db.add(
+                models.SubmissionShard(
+                    exam_id=exam_id, shard=shard, assigned_at=datetime.now(UTC)
+                )
+            )
+        db.commit()
+        self.forget(exam_id)
+
+    def forget(self, exam_id: Optional[int] = None):
+        with self._lock:
+            if exam_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(exam_id, None)
+
+
+shard_map = ShardMap(settings.SUBMISSION_SHARD_MAP_SECONDS)
+
+
+@contextmanager
+def submission_db(db: Session, exam_id: int) -> Iterator[Session]:
+    """The session holding ``exam_id``'s live submissions.
+
+    That is ``db`` itself when the exam is on the primary. Otherwise a session
+    of its shard, closed on exit: the caller commits it.
+    """
+    shard = shard_map.shard_of(exam_id)
+    if shard == 0:
+        yield db
+        return
+    live = session(shard)
+    try:
+        yield live
+    finally:
+        live.close()
+
+
+def submission_dbs(db: Session) -> Iterator[Session]:
+    """``db``, then a session of each shard, for reads across all exams."""
+    yield db
+    for shard in range(1, count()):
+        live = session(shard)
+        try:
+            yield live
+        finally:
+            live.close()
+
+
+# Submission ids
+
+
+class SubmissionIds:
+    def __init__(self, block: int, row: int, highest):
+        self.block = block
+        self.row = row
+        # The highest id in use, where the first block starts
+        self.highest = highest
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def next(self) -> Optional[int]:
+        """A new id, None to let the database pick one."""
+        if not enabled():
+            return None
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = self._reserve()
+            submission_id = self._next
+            self._next += 1
+            return submission_id
+
+    def _reserve(self) -> Tuple[int, int]:
+        db = SessionLocal()
+        try:
+            while True:
+                row = db.get(models.SubmissionIdBlock, self.row)
+                if row is None:
+                    start = self.highest(db) + 1
+                    db.add(
+                        models.SubmissionIdBlock(id=self.row, next_id=start + self.block)
+                    )
+                    try:
+                        db.commit()
+                    except IntegrityError:
+                        db.rollback()
+                        continue
+                    return start, start + self.block
+                start = row.next_id
+                reserved = (
+                    db.query(models.SubmissionIdBlock)
+                    .filter(
+                        models.SubmissionIdBlock.id == row.id,
+                        models.SubmissionIdBlock.next_id == start,
+                    )
+                    .update({"next_id": start + self.block}, synchronize_session=False)
+                )
+                db.commit()
+                if reserved:
+                    return start, start + self.block
+        finally:
+            db.close()
+
+
+def highest_submission_id(db: Session) -> int:
+    highest = db.query(func.max(models.ArchivedSubmission.id)).scalar() or 0
+    for live in submission_dbs(db):
+        highest = max(highest, live.query(func.max(models.ExamSubmission.id)).scalar() or 0)
+    return highest
+
+
+def highest_answer_id(db: Session) -> int:
+    return max(
+        live.query(func.max(models.AnswerSubmission.id)).scalar() or 0
+        for live in submission_dbs(db)
+    )
+
+
+submission_ids = SubmissionIds(settings.SUBMISSION_ID_BLOCK, 1, highest_submission_id)
+answer_ids = SubmissionIds(settings.SUBMISSION_ID_BLOCK, 2, highest_answer_id)
+
+
+# Rebalancing
+
+
+def shard_sizes(db: Session) -> List[Dict[int, int]]:
+    """Live submissions per exam, for each shard."""
+    return [
+        dict(
+            live.query(models.ExamSubmission.exam_id, func.count())
+            .group_by(models.ExamSubmission.exam_id)
+            .all()
+        )
+        for live in submission_dbs(db)
+    ]
+
+
+def move_exam(exam_id: int, target: int, grace_seconds: float = None) -> int:
+    """Move an exam's live submissions to shard ``target``.
+
+    Rows are copied first, ids included, then the map is switched, then the
+    source rows are deleted once every process has dropped its cached
+    assignment. Submissions written to the source in between would be lost:
+    only move exams that are not being taken.
+
+    Waiting out the caches is a ``time.sleep`` of ``grace_seconds`` that
+    blocks the caller, ``cli.py rebalance`` pausing per exam moved:
+    do not call this from a request handler or a job worker.
+    """
+    source = shard_map.shard_of(exam_id)
+    if source == target:
+        return 0
+    if grace_seconds is None:
+        grace_seconds = settings.SUBMISSION_SHARD_MAP_SECONDS
+    primary = SessionLocal()
+    src = session(source)
+    dst = session(target)
+    try:
+        # Leftovers of an interrupted move
+        _delete(dst, exam_id)
+        moved = 0
+        submissions = (
+            src.query(models.ExamSubmission)
+            .filter(models.ExamSubmission.exam_id == exam_id)
+            .order_by(models.ExamSubmission.id)
+            .all()
+        )
+        for start in range(0, len(submissions), COPY_BATCH):
+            batch = submissions[start : start + COPY_BATCH]
+            dst.execute(
+                insert(models.ExamSubmission),
+                [
+                    {
+                        "id": s.id,
+                        "exam_id": s.exam_id,
+                        "student_id": s.student_id,
+                        "submission_time": s.submission_time,
+                        "total_marks": s.total_marks,
+                        "is_submitted": s.is_submitted,
+                    }
+                    for s in batch
+                ],
+            )
+            answers = (
+                src.query(models.AnswerSubmission)
+                .filter(models.AnswerSubmission.submission_id.in_([s.id for s in batch]))
+                .order_by(models.AnswerSubmission.id)
+                .all()
+            )
+            if answers:
+                dst.execute(
+                    insert(models.AnswerSubmission),
+                    [
+                        {
+                            "id": a.id,
+                            "submission_id": a.submission_id,
+                            "question_id": a.question_id,
+                            "answer": a.answer,
+                            "marks_obtained": a.marks_obtained,
+                        }
+                        for a in answers
+                    ],
+                )
+            moved += len(batch)
+        dst.commit()
+
+        shard_map.move(primary, exam_id, target)
+        time.sleep(grace_seconds)
+        _delete(src, exam_id)
+        return moved
+    finally:
+        dst.close()
+        src.close()
+        primary.close()
+
+
+def _delete(db: Session, exam_id: int):
+    ids = db.query(models.ExamSubmission.id).filter(
+        models.ExamSubmission.exam_id == exam_id
+    )
+    db.query(models.AnswerSubmission).filter(
+        models.AnswerSubmission.submission_id.in_(ids.scalar_subquery())
+    ).delete(synchronize_session=False)
+    db.query(models.ExamSubmission).filter(
+        models.ExamSubmission.exam_id == exam_id
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def plan_rebalance(sizes: List[Dict[int, int]], movable) -> List[Tuple[int, int, int]]:
+    """``(exam_id, from, to)`` moves evening out submissions across shards.
+
+    Only exams for which ``movable(exam_id)`` holds are moved, largest first,
+    from the fullest shard to the emptiest while that narrows the gap.
+    """
+    sizes = [dict(shard) for shard in sizes]
+    moves = []
+    while True:
+        totals = [sum(shard.values()) for shard in sizes]
+        fullest = max(range(len(sizes)), key=totals.__getitem__)
+        emptiest = min(range(len(sizes)), key=totals.__getitem__)
+        gap = totals[fullest] - totals[emptiest]
+        candidates = sorted(
+            (
+                (submissions, exam_id)
+                for exam_id, submissions in sizes[fullest].items()
+                if submissions < gap and movable(exam_id)
+            ),
+            reverse=True,
+        )
+        if not candidates:
+            return moves
+        # Largest exam that still leaves the pair closer than before
+        submissions, exam_id = candidates[0]
+        del sizes[fullest][exam_id]
+        sizes[emptiest][exam_id] = submissions
+        moves.append((exam_id, fullest, emptiest))
@@ -0,0 +1,164 @@
+"""Exam archives for moving question papers between terms and instances.
+
+An archive is gzip compressed newline-delimited JSON: one ``exam`` record
+followed by one ``question`` record per question. Both directions stream in
+fixed-size chunks, so memory use does not grow with the size of the paper.
+Uncompressed NDJSON is accepted on import as well.
+"""
+
+import json
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.database.db import SessionLocal
+from . import models, schemas
+from .bulk import insert_questions
+
+FORMAT = "exam-archive"
+VERSION = 1
+CHUNK_SIZE = 64 * 1024
+MAX_LINE_SIZE = 1024 * 1024
+IMPORT_BATCH_SIZE = 1000
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+def _line(record: dict) -> bytes:
+    return json.dumps(record, separators=(",", ":"), default=str).encode() + b"\n"
+
+
+def export_exam(exam_id: int) -> Iterator[bytes]:
+    # Streams outlive the request's session, so this one opens its own
+    db = SessionLocal()
+    try:
+        exam = db.query(models.Exam).filter(models.Exam.id == exam_id).one()
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        out = bytearray(
+            compressor.compress(
+                _line(
+                    {
+                        "type": "exam",
+                        "format": FORMAT,
+                        "version": VERSION,
+                        "title": exam.title,
+                        "description": exam.description,
+                        "start_time": exam.start_time.isoformat(),
+                        "end_time": exam.end_time.isoformat(),
+                        "duration_minutes": exam.duration_minutes,
+                        "shuffle_questions": bool(exam.shuffle_questions),
+                        "shuffle_options": bool(exam.shuffle_options),
+                        "questions_per_student": exam.questions_per_student,
+                        "paper_seed": exam.paper_seed or 0,
+                    }
+                )
+            )
+        )
+        questions = (
+            db.query(models.Question)
+            .filter(models.in_paper(exam_id))
+            .order_by(models.Question.id)
+            .yield_per(IMPORT_BATCH_SIZE)
+        )
+        for question in questions:
+            out += compressor.compress(
+                _line(
+                    {
+                        "type": "question",
+                        "question_text": question.question_text,
+                        "marks": question.marks,
+                        "options": json.loads(question.options),
+                        "correct_answer": question.correct_answer,
+                    }
+                )
+            )
+            if len(out) >= CHUNK_SIZE:
+                yield bytes(out)
+                out.clear()
+        out += compressor.flush()
+        yield bytes(out)
+    finally:
+        db.close()
+
+
+def _inflate(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    chunks = iter(chunks)
+    decompressor: Optional[zlib.Decompress] = None
+    for chunk in chunks:
+        if decompressor is None:
+            if not chunk.startswith(b"\x1f\x8b"):
+                # Plain NDJSON
+                yield chunk
+                yield from chunks
+                return
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        data = decompressor.decompress(chunk, CHUNK_SIZE)
+        # Bounded output per step keeps a highly compressed upload from
+        # inflating into memory all at once
+        while True:
+            if data:
+                yield data
+            if not decompressor.unconsumed_tail and len(data) < CHUNK_SIZE:
+                break
+            data = decompressor.decompress(decompressor.unconsumed_tail, CHUNK_SIZE)
+    if decompressor is not None:
+        yield decompressor.flush()
+
+
+def read_records(chunks: Iterable[bytes]) -> Iterator[dict]:
+    pending = b""
+    for data in _inflate(chunks):
+        pending += data
+        *lines, pending = pending.split(b"\n")
+        if len(pending) > MAX_LINE_SIZE:
+            raise ArchiveError("Archive record exceeds the maximum line size")
+        for line in lines:
+            if line.strip():
+                yield _decode(line)
+    if pending.strip():
+        yield _decode(pending)
+
+
+def _decode(line: bytes) -> dict:
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ArchiveError(f"Malformed archive record: {e}") from None
+
+
+def import_exam(db: Session, chunks: Iterable[bytes], faculty_id: int):
+    """Create an exam owned by ``faculty_id`` from an archive stream."""
+    records = read_records(chunks)
+    header = next(records, None)
+    if not header or header.get("type") != "exam" or header.get("format") != FORMAT:
+        raise ArchiveError("Not an exam archive")
+    if header.get("version") != VERSION:
+        raise ArchiveError(f"Unsupported archive version {header.get('version')}")
+
+    try:
+        exam = schemas.ExamBase.model_validate(header)
+    except ValidationError as e:
+        raise ArchiveError(f"Invalid exam record: {e}") from None
+    db_exam = models.Exam(**exam.model_dump(), faculty_id=faculty_id)
+    db.add(db_exam)
+    db.flush()
+
+    count = 0
+    batch = []
+    for record in records:
+        if record.get("type") != "question":
+            raise ArchiveError(f"Unexpected record type {record.get('type')!r}")
+        try:
+            batch.append(schemas.QuestionCreate.model_validate(record))
+        except ValidationError as e:
+            raise ArchiveError(f"Invalid question record: {e}") from None
+        if len(batch) == IMPORT_BATCH_SIZE:
+            count += insert_questions(db, db_exam.id, batch)
+            batch.clear()
+    count += insert_questions(db, db_exam.id, batch)
+    db.commit()
+    return db_exam, count
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional
 from jose import JWTError, jwt
 
@@ -10,10 +10,9 @@ from app.users.models import User
 from app.auth.auth import (
     verify_password,
     get_password_hash,
-    create_access_token,
     get_current_user,
 )
-from app.config import settings
+from app.auth import refresh
 from . import schemas
 
 router = APIRouter()
@@ -67,12 +66,7 @@ def login_faculty(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Create access token
-    access_token = create_access_token(
-        data={"sub": faculty.email},
-        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return refresh.session_tokens(db, faculty)
 
 
 @router.post("/register-student", response_model=schemas.StudentCreate)
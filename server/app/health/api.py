@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Request, Response, status
+from sqlalchemy import text
+
+from app.database.db import engine
+
+router = APIRouter()
+
+
+@router.get("/live")
+def liveness():
+    """The process is up and serving requests"""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+def readiness(request: Request, response: Response):
+    """Startup has finished and the database answers"""
+    if not getattr(request.app.state, "ready", False):
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "starting"}
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "database unavailable"}
+    return {"status": "ok"}
@@ -0,0 +1,186 @@
+"""``Idempotency-Key`` support for POSTs that clients retry.
+
+A request carrying the header is fingerprinted (method, path, query, body)
+and claimed in ``idempotency_keys`` under the caller's token subject. The
+first request runs and its response is stored. Retries of the same key get
+that response back, marked ``Idempotent-Replayed: true``, without reaching
+the endpoint. A duplicate arriving while the first is still running waits
+for it: on an in-process event when both are in this worker, by polling the
+claim otherwise, and gets a 409 after ``IDEMPOTENCY_WAIT_SECONDS``. Reusing a
+key for a different request is a 422.
+
+5xx responses and requests that fail are not stored, so their retry runs
+again. Records expire after ``IDEMPOTENCY_TTL_SECONDS``.
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+from typing import Dict, Optional, Tuple
+
+import anyio
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from app.config import settings
+from . import store
+
+DEFAULT_PATHS = (r"/api/exams", r"/api/exams/\d+/submit")
+MAX_KEY_LENGTH = 255
+POLL_SECONDS = 0.1
+PURGE_SECONDS = 60
+# Recomputed on replay or specific to the original response
+NOT_STORED = {"content-length", "date", "server"}
+
+
+def subject(authorization: str) -> Optional[str]:
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app, paths=DEFAULT_PATHS):
+        self.app = app
+        self.paths = [re.compile(path) for path in paths]
+        self._running: Dict[Tuple[str, str], asyncio.Event] = {}
+        self._last_purge = time.monotonic()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not any(path.fullmatch(scope["path"]) for path in self.paths)
+        ):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        key = headers.get("idempotency-key")
+        # Unauthenticated requests are left to the endpoint to refuse
+        owner = subject(headers.get("authorization", "")) if key else None
+        if owner is None:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await self._error(scope, receive, send, 400, "Idempotency-Key is too long")
+            return
+
+        body = await self._read_body(receive)
+        digest = hashlib.sha256()
+        for part in (scope["method"], scope["path"], scope["query_string"], body):
+            digest.update(part if isinstance(part, bytes) else part.encode())
+            digest.update(b"\0")
+        fingerprint = digest.hexdigest()
+
+        ident = (owner, key)
+        while (running := self._running.get(ident)) is not None:
+            await running.wait()
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            state, stored = await anyio.to_thread.run_sync(
+                store.claim, owner, key, fingerprint
+            )
+            if state != store.BUSY or time.monotonic() >= deadline:
+                break
+            await anyio.sleep(POLL_SECONDS)
+
+        if state == store.DONE:
+            await self._replay(send, stored)
+        elif state == store.MISMATCH:
+            await self._error(
+                scope,
+                receive,
+                send,
+                422,
+                "Idempotency-Key was already used for a different request",
+            )
+        elif state == store.BUSY:
+            await self._error(
+                scope,
+                receive,
+                send,
+                409,
+                "A request with this Idempotency-Key is still in progress",
+                {"Retry-After": "1"},
+            )
+        else:
+            event = self._running[ident] = asyncio.Event()
+            try:
+                await self._run(scope, receive, send, body, owner, key)
+            finally:
+                self._running.pop(ident, None)
+                event.set()
+            await self._purge_if_due()
+
+    async def _read_body(self, receive) -> bytes:
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        return b"".join(chunks)
+
+    async def _run(self, scope, receive, send, body, owner, key):
+        replayed = False
+
+        async def receive_body():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code = 500
+        headers = []
+        chunks = []
+
+        async def capture(message):
+            nonlocal status_code, headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [
+                    (name.decode("latin-1"), value.decode("latin-1"))
+                    for name, value in message.get("headers", [])
+                    if name.decode("latin-1").lower() not in NOT_STORED
+                ]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, capture)
+        except BaseException:
+            await anyio.to_thread.run_sync(store.release, owner, key)
+            raise
+        if status_code >= 500:
+            await anyio.to_thread.run_sync(store.release, owner, key)
+        else:
+            await anyio.to_thread.run_sync(
+                store.complete, owner, key, (status_code, headers, b"".join(chunks))
+            )
+
+    async def _replay(self, send, stored):
+        status_code, headers, body = stored
+        raw = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+        raw.append((b"content-length", str(len(body)).encode()))
+        raw.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": status_code, "headers": raw})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _error(self, scope, receive, send, status_code, detail, headers=None):
+        response = JSONResponse({"detail": detail}, status_code, headers=headers)
+        await response(scope, receive, send)
+
+    async def _purge_if_due(self):
+        if time.monotonic() - self._last_purge < PURGE_SECONDS:
+            return
+        self._last_purge = time.monotonic()
+        await anyio.to_thread.run_sync(store.purge)
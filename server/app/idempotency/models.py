@@ -0,0 +1,30 @@
+from datetime import datetime
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    UniqueConstraint,
+)
+
+from app.database.db import Base
+
+
+class IdempotencyKey(Base):
+    """A request made with an ``Idempotency-Key`` and, once done, its response"""
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("scope", "key"),)
+
+    id = Column(Integer, primary_key=True)
+    scope = Column(String, nullable=False)  # who sent it: the token subject
+    key = Column(String, nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+    # Unset while the first request is still running
+    status_code = Column(Integer)
+    headers = Column(Text)  # JSON list of [name, value]
+    body = Column(LargeBinary)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
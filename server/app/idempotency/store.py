@@ -0,0 +1,131 @@
+"""Idempotency records shared by every worker process through the database."""
+
+import json
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database.db import SessionLocal
+from .models import IdempotencyKey
+
+NEW = "new"
+DONE = "done"
+BUSY = "busy"
+MISMATCH = "mismatch"
+
+# A claim this old belongs to a request whose worker died: take it over
+LEASE_SECONDS = 120
+
+Response = Tuple[int, List[Tuple[str, str]], bytes]
+
+
+def _lookup(db, scope: str, key: str) -> Optional[IdempotencyKey]:
+    return (
+        db.query(IdempotencyKey)
+        .filter(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        .first()
+    )
+
+
+def claim(scope: str, key: str, fingerprint: str) -> Tuple[str, Optional[Response]]:
+    """Start the request ``key`` of ``scope``, or find out how it went."""
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        row = _lookup(db, scope, key)
+        if row is not None and row.expires_at <= now:
+            db.delete(row)
+            db.commit()
+            row = None
+        if row is None:
+            db.add(
+                IdempotencyKey(
+                    scope=scope,
+                    key=key,
+                    fingerprint=fingerprint,
+                    created_at=now,
+                    expires_at=now
+                    + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+                )
+            )
+            try:
+                db.commit()
+                return NEW, None
+            except IntegrityError:
+                # Claimed by a concurrent duplicate in another process
+                db.rollback()
+                row = _lookup(db, scope, key)
+                if row is None:
+                    return BUSY, None
+
+        if row.fingerprint != fingerprint:
+            return MISMATCH, None
+        if row.status_code is not None:
+            return DONE, (
+                row.status_code,
+                [tuple(h) for h in json.loads(row.headers)],
+                row.body,
+            )
+        stale = now - timedelta(seconds=LEASE_SECONDS)
+        taken = (
+            db.query(IdempotencyKey)
+            .filter(
+                IdempotencyKey.id == row.id,
+                IdempotencyKey.status_code.is_(None),
+                IdempotencyKey.created_at < stale,
+            )
+            .update({"created_at": now}, synchronize_session=False)
+        )
+        db.commit()
+        return (NEW, None) if taken else (BUSY, None)
+    finally:
+        db.close()
+
+
+def complete(scope: str, key: str, response: Response):
+    status_code, headers, body = response
+    db = SessionLocal()
+    try:
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.scope == scope, IdempotencyKey.key == key
+        ).update(
+            {
+                "status_code": status_code,
+                "headers": json.dumps(headers),
+                "body": body,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def release(scope: str, key: str):
+    """Forget an unfinished request so that a retry runs it again."""
+    db = SessionLocal()
+    try:
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.key == key,
+            IdempotencyKey.status_code.is_(None),
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def purge() -> int:
+    db = SessionLocal()
+    try:
+        deleted = (
+            db.query(IdempotencyKey)
+            .filter(IdempotencyKey.expires_at < datetime.utcnow())
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return deleted
+    finally:
+        db.close()
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.database.db import get_db
+from app.auth.auth import get_current_user
+from app.users.models import User
+from . import models, schemas
+from .runner import FINISHED, runner
+
+router = APIRouter()
+
+
+def get_own_job(job_id: int, db: Session, current_user: User) -> models.Job:
+    job = db.query(models.Job).filter(models.Job.id == job_id).first()
+    if not job or job.created_by != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("", response_model=List[schemas.Job])
+def get_jobs(
+    skip: int = 0,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return (
+        db.query(models.Job)
+        .filter(models.Job.created_by == current_user.id)
+        .order_by(models.Job.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+
+@router.get("/{job_id}", response_model=schemas.Job)
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return get_own_job(job_id, db, current_user)
+
+
+@router.post("/{job_id}/cancel", response_model=schemas.Job)
+def cancel_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    job = get_own_job(job_id, db, current_user)
+    if job.status in FINISHED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job already {job.status}",
+        )
+    return runner.cancel(db, job)
@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text
+from app.database.db import Base
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, index=True)
+    status = Column(String, default="queued", index=True)
+    params = Column(Text)  # JSON string of handler parameters
+    result = Column(Text, nullable=True)  # JSON string of the handler result
+    error = Column(Text, nullable=True)
+    progress = Column(Integer, default=0)
+    total = Column(Integer, nullable=True)
+    cancel_requested = Column(Boolean, default=False)
+    # Set while queued or running, so one job per key is pending at a time
+    dedupe_key = Column(String, nullable=True, unique=True, index=True)
+    created_by = Column(Integer, ForeignKey("users.id"), index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,194 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database.db import SessionLocal
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# kind -> handler(ctx, params) returning a JSON serializable result
+HANDLERS: Dict[str, Callable] = {}
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+def job_handler(kind: str):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+
+    return register
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Handed to a running handler: its session, progress and cancellation."""
+
+    def __init__(self, db: Session, job: Job):
+        self.db = db
+        self.job = job
+
+    def progress(self, done: int, total: Optional[int] = None):
+        """Record progress and commit the work done so far.
+
+        Raises JobCancelled once cancellation has been requested, so handlers
+        should call this between units of work they can stop after.
+        """
+        self.job.progress = done
+        if total is not None:
+            self.job.total = total
+        self.db.commit()
+        # The commit expired the row, this reads a fresh cancel flag
+        if self.job.cancel_requested:
+            raise JobCancelled()
+
+
+class JobRunner:
+    """Runs jobs on a bounded pool of worker threads.
+
+    Jobs are persisted in the ``jobs`` table before they are queued, so their
+    status and progress can be read from any process.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        # Whether recover() fails jobs left running. A server forking several
+        # workers does that once in its master and turns it off for them
+        self.fail_interrupted = True
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _submit(self, job_id: int):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="job"
+                )
+            self._executor.submit(self._run, job_id)
+
+    def enqueue(
+        self,
+        db: Session,
+        kind: str,
+        params: dict,
+        user_id: int,
+        dedupe_key: Optional[str] = None,
+    ) -> Optional[Job]:
+        """Persist and queue a job.
+
+        With a ``dedupe_key``, nothing is queued and None is returned while
+        another job of that key is queued or running, in any process.
+        """
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown job kind {kind!r}")
+        job = Job(
+            kind=kind,
+            params=json.dumps(params),
+            created_by=user_id,
+            dedupe_key=dedupe_key,
+        )
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            if dedupe_key is None:
+                raise
+            db.rollback()
+            return None
+        db.refresh(job)
+        self._submit(job.id)
+        return job
+
+    def cancel(self, db: Session, job: Job) -> Job:
+        if job.status == "queued":
+            job.status = "cancelled"
+            job.finished_at = datetime.utcnow()
+            job.dedupe_key = None
+        elif job.status == "running":
+            job.cancel_requested = True
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def recover(self):
+        """Requeue jobs left queued by a previous process, fail running ones."""
+        db = SessionLocal()
+        try:
+            if self.fail_interrupted:
+                self.fail_running(db)
+            queued = [
+                job_id
+                for (job_id,) in db.query(Job.id).filter(Job.status == "queued")
+            ]
+            db.commit()
+        finally:
+            db.close()
+        for job_id in queued:
+            self._submit(job_id)
+
+    def fail_running(self, db: Session):
+        interrupted = db.query(Job).filter(Job.status == "running").all()
+        for job in interrupted:
+            job.status = "failed"
+            job.error = "Interrupted by a server restart"
+            job.finished_at = datetime.utcnow()
+            job.dedupe_key = None
+        db.commit()
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+    def _run(self, job_id: int):
+        db = SessionLocal()
+        try:
+            # Claim the job, other processes may have queued it as well
+            claimed = (
+                db.query(Job)
+                .filter(Job.id == job_id, Job.status == "queued")
+                .update(
+                    {"status": "running", "started_at": datetime.utcnow()},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if not claimed:
+                return
+            job = db.query(Job).filter(Job.id == job_id).first()
+
+            try:
+                result = HANDLERS[job.kind](JobContext(db, job), json.loads(job.params))
+            except JobCancelled:
+                db.rollback()
+                job.status = "cancelled"
+            except Exception as e:
+                logger.exception("Job %s (%s) failed", job_id, job.kind)
+                db.rollback()
+                job.status = "failed"
+                job.error = str(e) or type(e).__name__
+            else:
+                job.status = "succeeded"
+                job.result = json.dumps(result)
+                if job.total is not None:
+                    job.progress = job.total
+            job.finished_at = datetime.utcnow()
+            job.dedupe_key = None
+            db.commit()
+        finally:
+            db.close()
+
+
+runner = JobRunner(settings.JOB_WORKERS)
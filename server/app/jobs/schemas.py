@@ -0,0 +1,27 @@
+from pydantic import BaseModel, validator
+from typing import Any, Optional
+from datetime import datetime
+import json
+
+
+class Job(BaseModel):
+    id: int
+    kind: str
+    status: str
+    progress: int
+    total: Optional[int] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    cancel_requested: bool
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @validator("result", pre=True)
+    def parse_result(cls, v):
+        if isinstance(v, str):
+            return json.loads(v)
+        return v
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,234 @@
+import hashlib
+from datetime import UTC, datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.orm import Session
+
+from app.auth.auth import get_current_faculty, get_current_user
+from app.config import settings
+from app.database.db import get_db, get_read_db
+from app.exams import models as exam_models
+from app.jobs import schemas as job_schemas
+from app.jobs.runner import runner
+from app.users.models import User
+from . import schemas
+from .compaction import segments_dir
+from .ingest import Frame, ingest
+from .models import FrameBlob, ProctoringFrame
+from .segments import read_extent
+router = APIRouter()
+
+CONTENT_TYPES = ("image/jpeg", "image/png", "image/webp")
+
+
+def utc_naive(moment: datetime) -> datetime:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(UTC).replace(tzinfo=None)
+    return moment
+
+
+def busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Frame queue is full, retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+@router.post(
+    "/exams/{exam_id}/frames",
+    response_model=schemas.FrameReceipt,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def upload_frame(
+    exam_id: int,
+    request: Request,
+    captured_at: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Queue one webcam frame, sent as the raw image body, for storage"""
+    if current_user.is_faculty:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only students send proctoring frames",
+        )
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Frames must be one of {', '.join(CONTENT_TYPES)}",
+        )
+    exam = db.query(exam_models.Exam).filter(exam_models.Exam.id == exam_id).first()
+    if not exam:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    now = datetime.now(UTC)
+    if not (
+        exam.start_time.replace(tzinfo=UTC) <= now <= exam.end_time.replace(tzinfo=UTC)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Exam is not in progress"
+        )
+    # Refuse before reading the body when it could not be queued anyway
+    if ingest.full:
+        raise busy()
+
+    limit = settings.PROCTORING_MAX_FRAME_KB * 1024
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Frames are limited to {settings.PROCTORING_MAX_FRAME_KB} KB",
+    )
+    if int(request.headers.get("content-length") or 0) > limit:
+        raise too_large
+    digest = hashlib.sha256()
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise too_large
+        digest.update(chunk)
+        chunks.append(chunk)
+    if not size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Empty frame"
+        )
+
+    frame = Frame(
+        exam_id=exam_id,
+        student_id=current_user.id,
+        captured_at=utc_naive(captured_at or now),
+        digest=digest.hexdigest(),
+        content_type=content_type,
+        data=b"".join(chunks),
+    )
+    if not ingest.submit(frame):
+        raise busy()
+    return {"digest": frame.digest, "size": size, "captured_at": frame.captured_at}
+
+
+def own_exam(db: Session, exam_id: int, faculty: User) -> exam_models.Exam:
+    exam = (
+        db.query(exam_models.Exam)
+        .filter(exam_models.Exam.id == exam_id, exam_models.Exam.faculty_id == faculty.id)
+        .first()
+    )
+    if not exam:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    return exam
+
+
+@router.get(
+    "/exams/{exam_id}/students/{student_id}/frames",
+    response_model=List[schemas.FrameInfo],
+)
+def list_frames(
+    exam_id: int,
+    student_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    """Frames of a student's session captured in ``[start, end)``, oldest first.
+
+    Pass the last ``captured_at`` seen as ``start`` to page through a session.
+    """
+    own_exam(db, exam_id, current_user)
+    query = (
+        db.query(
+            ProctoringFrame.id,
+            ProctoringFrame.captured_at,
+            ProctoringFrame.digest,
+            FrameBlob.length,
+            FrameBlob.content_type,
+            FrameBlob.thumb_length,
+        )
+        .join(FrameBlob, FrameBlob.digest == ProctoringFrame.digest)
+        .filter(
+            ProctoringFrame.exam_id == exam_id,
+            ProctoringFrame.student_id == student_id,
+        )
+    )
+    if start is not None:
+        query = query.filter(ProctoringFrame.captured_at >= utc_naive(start))
+    if end is not None:
+        query = query.filter(ProctoringFrame.captured_at < utc_naive(end))
+    rows = query.order_by(ProctoringFrame.captured_at, ProctoringFrame.id).limit(limit)
+    return [
+        {
+            "id": frame_id,
+            "captured_at": captured,
+            "digest": digest,
+            "size": length,
+            "content_type": content_type,
+            "has_thumbnail": bool(thumb_length),
+        }
+        for frame_id, captured, digest, length, content_type, thumb_length in rows
+    ]
+
+
+@router.get("/exams/{exam_id}/frames/{frame_id}")
+def get_frame(
+    exam_id: int,
+    frame_id: int,
+    request: Request,
+    thumbnail: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    """The image of a frame, or its JPEG thumbnail when there is one"""
+    own_exam(db, exam_id, current_user)
+    blob = (
+        db.query(FrameBlob)
+        .join(ProctoringFrame, ProctoringFrame.digest == FrameBlob.digest)
+        .filter(ProctoringFrame.id == frame_id, ProctoringFrame.exam_id == exam_id)
+        .first()
+    )
+    if not blob:
+        raise HTTPException(status_code=404, detail="Frame not found")
+    small = thumbnail and bool(blob.thumb_length)
+    etag = f'"{blob.digest}{"-thumb" if small else ""}"'
+    # Content addressed: a digest always names the same bytes
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    for attempt in range(2):
+        try:
+            if small:
+                data = read_extent(
+                    segments_dir(), blob.thumb_segment, blob.thumb_offset, blob.thumb_length
+                )
+            else:
+                data = read_extent(segments_dir(), blob.segment, blob.offset, blob.length)
+            break
+        except FileNotFoundError:
+            # Compaction moved the frame since it was looked up
+            if attempt:
+                raise
+            db.refresh(blob)
+    return Response(
+        content=data,
+        media_type="image/jpeg" if small else blob.content_type,
+        headers=headers,
+    )
+
+
+@router.get("/ingest", response_model=schemas.IngestStats)
+def ingest_stats(current_user: User = Depends(get_current_faculty)):
+    """Frame queue occupancy and counters of this worker process"""
+    return ingest.stats()
+
+
+@router.post(
+    "/compact", response_model=job_schemas.Job, status_code=status.HTTP_202_ACCEPTED
+)
+def compact_frames(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    """Expire old frames, make thumbnails and rewrite sparse segments"""
+    return runner.enqueue(db, "compact_proctoring", {}, current_user.id)
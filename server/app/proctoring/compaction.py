@@ -0,0 +1,164 @@
+"""Background upkeep of the frame store, run as the ``compact_proctoring`` job.
+
+1. Frames older than ``PROCTORING_RETENTION_DAYS`` are dropped, and so are
+   the blobs no frame points to any more.
+2. Blobs get a JPEG thumbnail for review grids when Pillow is installed.
+3. Closed segments whose live bytes fell under
+   ``PROCTORING_COMPACT_LIVE_RATIO`` have their live extents copied into a new
+   segment and are deleted. Readers that still hold the old location retry
+   the lookup.
+"""
+
+import io
+import os
+from collections import defaultdict
+from datetime import UTC, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import exists, func
+
+from app.config import settings
+from app.database.db import SessionLocal
+from app.jobs.models import Job
+from app.jobs.runner import job_handler, runner
+from .models import FrameBlob, ProctoringFrame
+from .segments import SegmentWriter, is_open, list_segments, read_extent
+
+BATCH_SIZE = 500
+THUMBNAIL_SIZE = 160
+
+
+def segments_dir() -> str:
+    return settings.PROCTORING_DIR + "/segments"
+
+
+def thumbnail(data: bytes) -> Optional[bytes]:
+    """A small JPEG of the frame, None when it can't be decoded."""
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            out = io.BytesIO()
+            image.convert("RGB").save(out, "JPEG", quality=70)
+            return out.getvalue()
+    except Exception:
+        return None
+
+
+def expire(db) -> int:
+    days = settings.PROCTORING_RETENTION_DAYS
+    if days <= 0:
+        return 0
+    cutoff = datetime.now(UTC).replace(tzinfo=None) - timedelta(days=days)
+    removed = (
+        db.query(ProctoringFrame)
+        .filter(ProctoringFrame.captured_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+    db.query(FrameBlob).filter(
+        ~exists().where(ProctoringFrame.digest == FrameBlob.digest)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+
+def make_thumbnails(ctx, writer: SegmentWriter) -> int:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return 0
+    db = ctx.db
+    made = 0
+    while True:
+        blobs = (
+            db.query(FrameBlob)
+            .filter(FrameBlob.thumb_length.is_(None))
+            .limit(BATCH_SIZE)
+            .all()
+        )
+        if not blobs:
+            return made
+        for blob in blobs:
+            small = thumbnail(
+                read_extent(segments_dir(), blob.segment, blob.offset, blob.length)
+            )
+            if small is None:
+                blob.thumb_length = 0
+                continue
+            blob.thumb_segment, blob.thumb_offset = writer.append(small)
+            blob.thumb_length = len(small)
+            made += 1
+        writer.sync()
+        ctx.progress(made)
+        writer.seal()
+
+
+def live_bytes(db) -> dict:
+    live = defaultdict(int)
+    for column, length in (
+        (FrameBlob.segment, FrameBlob.length),
+        (FrameBlob.thumb_segment, FrameBlob.thumb_length),
+    ):
+        for segment, total in (
+            db.query(column, func.sum(length)).filter(column.isnot(None)).group_by(column)
+        ):
+            live[segment] += total or 0
+    return live
+
+
+def compact_segments(ctx, writer: SegmentWriter) -> dict:
+    db = ctx.db
+    live = live_bytes(db)
+    compacted = reclaimed = 0
+    for path in list_segments(segments_dir()):
+        if path.name == writer.current or is_open(path):
+            continue
+        size = path.stat().st_size
+        if size and live.get(path.name, 0) / size >= settings.PROCTORING_COMPACT_LIVE_RATIO:
+            continue
+        for blob in db.query(FrameBlob).filter(FrameBlob.segment == path.name):
+            data = read_extent(segments_dir(), blob.segment, blob.offset, blob.length)
+            blob.segment, blob.offset = writer.append(data)
+        for blob in db.query(FrameBlob).filter(FrameBlob.thumb_segment == path.name):
+            data = read_extent(
+                segments_dir(), blob.thumb_segment, blob.thumb_offset, blob.thumb_length
+            )
+            blob.thumb_segment, blob.thumb_offset = writer.append(data)
+        writer.sync()
+        db.commit()
+        writer.seal()
+        os.unlink(path)
+        compacted += 1
+        reclaimed += size - live.get(path.name, 0)
+        ctx.progress(compacted)
+    return {"segments_compacted": compacted, "bytes_reclaimed": reclaimed}
+
+
+@job_handler("compact_proctoring")
+def compact(ctx, params):
+    writer = SegmentWriter(segments_dir(), settings.PROCTORING_SEGMENT_MB * 2**20)
+    try:
+        expired = expire(ctx.db)
+        thumbnails = make_thumbnails(ctx, writer)
+        result = compact_segments(ctx, writer)
+    finally:
+        writer.close()
+    return {"frames_expired": expired, "thumbnails": thumbnails, **result}
+
+
+def enqueue_if_idle():
+    db = SessionLocal()
+    try:
+        pending = (
+            db.query(Job.id)
+            .filter(
+                Job.kind == "compact_proctoring",
+                Job.status.in_(("queued", "running")),
+            )
+            .first()
+        )
+        if pending is None:
+            runner.enqueue(db, "compact_proctoring", {}, None)
+    finally:
+        db.close()
@@ -0,0 +1,192 @@
+"""Frame ingestion: a bounded queue drained by one writer thread per process.
+
+Uploads hash the frame and queue it; they never touch the disk or the
+database. The writer takes frames in batches, appends the ones whose digest
+is not stored yet to its segment, fsyncs once and inserts the index rows in
+one transaction. When the queue is full uploads are refused (503 with
+``Retry-After``) instead of buffering, so memory stays under
+``PROCTORING_QUEUE_FRAMES`` x ``PROCTORING_MAX_FRAME_KB``.
+
+Frames still queued when the process dies are lost; clients send a new one
+every few seconds anyway.
+"""
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database.db import SessionLocal
+from . import compaction
+from .models import FrameBlob, ProctoringFrame
+from .segments import SegmentWriter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Frame:
+    exam_id: int
+    student_id: int
+    captured_at: datetime
+    digest: str
+    content_type: str
+    data: bytes
+
+
+class FrameIngest:
+    def __init__(self):
+        self.queue: Optional[queue.Queue] = None
+        self.accepted = 0
+        self.rejected = 0
+        self.stored = 0
+        self.deduplicated = 0
+        self._writer: Optional[SegmentWriter] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_compaction = time.monotonic()
+
+    def start(self):
+        if self._thread:
+            return
+        self.queue = queue.Queue(maxsize=settings.PROCTORING_QUEUE_FRAMES)
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="proctoring-ingest", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Write what is queued, then stop."""
+        if not self._thread:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def full(self) -> bool:
+        return self.queue is None or self.queue.full()
+
+    def submit(self, frame: Frame) -> bool:
+        """Queue ``frame``, False when there is no room for it."""
+        try:
+            self.queue.put_nowait(frame)
+        except (queue.Full, AttributeError):
+            self.rejected += 1
+            return False
+        self.accepted += 1
+        return True
+
+    def _loop(self):
+        while not (self._stop.is_set() and self.queue.empty()):
+            try:
+                batch = [self.queue.get(timeout=1)]
+            except queue.Empty:
+                self._compact_if_due()
+                continue
+            while len(batch) < settings.PROCTORING_BATCH_FRAMES:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write(batch)
+            except Exception:
+                logger.exception("Dropped a batch of %d proctoring frames", len(batch))
+            self._compact_if_due()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _compact_if_due(self):
+        interval = settings.PROCTORING_COMPACT_INTERVAL_MINUTES * 60
+        if interval <= 0 or time.monotonic() - self._last_compaction < interval:
+            return
+        self._last_compaction = time.monotonic()
+        try:
+            compaction.enqueue_if_idle()
+        except Exception:
+            logger.exception("Could not enqueue proctoring compaction")
+
+    def write(self, batch: List[Frame]):
+        if self._writer is None:
+            self._writer = SegmentWriter(
+                settings.PROCTORING_DIR + "/segments",
+                settings.PROCTORING_SEGMENT_MB * 2**20,
+            )
+        try:
+            self._write(batch)
+        except IntegrityError:
+            # Another process stored one of these frames first: the retry
+            # finds its row, the bytes written here are left for compaction
+            self._write(batch)
+        finally:
+            self._writer.seal()
+
+    def _write(self, batch: List[Frame]):
+        db = SessionLocal()
+        try:
+            digests = {frame.digest for frame in batch}
+            known = {
+                digest
+                for (digest,) in db.query(FrameBlob.digest).filter(
+                    FrameBlob.digest.in_(digests)
+                )
+            }
+            blobs = {}
+            for frame in batch:
+                if frame.digest in known or frame.digest in blobs:
+                    continue
+                segment, offset = self._writer.append(frame.data)
+                blobs[frame.digest] = {
+                    "digest": frame.digest,
+                    "content_type": frame.content_type,
+                    "segment": segment,
+                    "offset": offset,
+                    "length": len(frame.data),
+                    "created_at": datetime.now(UTC),
+                }
+            self._writer.sync()
+            if blobs:
+                db.execute(insert(FrameBlob), list(blobs.values()))
+            db.execute(
+                insert(ProctoringFrame),
+                [
+                    {
+                        "exam_id": frame.exam_id,
+                        "student_id": frame.student_id,
+                        "captured_at": frame.captured_at,
+                        "digest": frame.digest,
+                    }
+                    for frame in batch
+                ],
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        self.stored += len(blobs)
+        self.deduplicated += len(batch) - len(blobs)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize() if self.queue else 0,
+            "capacity": settings.PROCTORING_QUEUE_FRAMES,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+        }
+
+
+ingest = FrameIngest()
@@ -0,0 +1,39 @@
+from datetime import UTC, datetime
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, String
+
+from app.database.db import Base
+
+
+class FrameBlob(Base):
+    """Bytes of a distinct frame, stored once in a segment file"""
+
+    __tablename__ = "proctoring_blobs"
+
+    digest = Column(String(64), primary_key=True)  # sha256 of the bytes
+    content_type = Column(String, nullable=False)
+    segment = Column(String, nullable=False, index=True)
+    offset = Column(BigInteger, nullable=False)
+    length = Column(Integer, nullable=False)
+    # Set by compaction; length 0 when the frame could not be thumbnailed
+    thumb_segment = Column(String, index=True)
+    thumb_offset = Column(BigInteger)
+    thumb_length = Column(Integer)
+    created_at = Column(DateTime, default=lambda: datetime.now(UTC))
+
+
+class ProctoringFrame(Base):
+    __tablename__ = "proctoring_frames"
+    __table_args__ = (
+        Index(
+            "ix_proctoring_frames_exam_student_time",
+            "exam_id",
+            "student_id",
+            "captured_at",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    exam_id = Column(Integer, ForeignKey("exams.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    captured_at = Column(DateTime, nullable=False, index=True)
+    digest = Column(String(64), ForeignKey("proctoring_blobs.digest"), nullable=False)
@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class FrameReceipt(BaseModel):
+    digest: str
+    size: int
+    captured_at: datetime
+
+
+class FrameInfo(BaseModel):
+    id: int
+    captured_at: datetime
+    digest: str
+    size: int
+    content_type: str
+    has_thumbnail: bool
+
+
+class IngestStats(BaseModel):
+    queued: int
+    capacity: int
+    accepted: int
+    rejected: int
+    stored: int
+    deduplicated: int
@@ -0,0 +1,107 @@
+"""Append-only segment files holding frame bytes.
+
+A frame is addressed by the sha256 of its bytes and stored once, as an extent
+``(segment, offset, length)`` recorded in ``proctoring_blobs``. Each writer
+(the ingest thread of a worker process, a compaction job) appends to a
+segment of its own and holds an exclusive ``flock`` on it until the rows
+pointing into it are committed, so compaction can tell which segments are
+still being written.
+"""
+
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the modification time
+    fcntl = None
+
+SUFFIX = ".seg"
+# Without flock a segment counts as open while it was written to recently
+OPEN_GRACE_SECONDS = 3600
+
+
+def segment_path(root, segment: str) -> Path:
+    return Path(root) / segment
+
+
+def read_extent(root, segment: str, offset: int, length: int) -> bytes:
+    with open(segment_path(root, segment), "rb") as f:
+        return os.pread(f.fileno(), length, offset)
+
+
+def is_open(path: Path) -> bool:
+    """Whether a writer still holds ``path``."""
+    if fcntl is None:
+        return time.time() - path.stat().st_mtime < OPEN_GRACE_SECONDS
+    with open(path, "rb") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return False
+
+
+def list_segments(root) -> List[Path]:
+    return sorted(Path(root).glob(f"*{SUFFIX}"))
+
+
+class SegmentWriter:
+    """Appends to a segment of its own, starting a new one past ``max_bytes``.
+
+    Full segments stay locked until ``seal()``, which the caller runs after
+    committing the rows that point into them.
+    """
+
+    def __init__(self, root, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._file = None
+        self._name: Optional[str] = None
+        self._size = 0
+        self._full = []
+
+    def append(self, data: bytes) -> Tuple[str, int]:
+        if self._file is None or (self._size and self._size + len(data) > self.max_bytes):
+            self._start()
+        offset = self._size
+        self._file.write(data)
+        self._size += len(data)
+        return self._name, offset
+
+    def _start(self):
+        if self._file is not None:
+            self._full.append(self._file)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._name = uuid.uuid4().hex + SUFFIX
+        self._file = open(self.root / self._name, "ab")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        self._size = 0
+
+    def sync(self):
+        """Make everything appended so far durable."""
+        for f in self._full + ([self._file] if self._file else []):
+            f.flush()
+            os.fsync(f.fileno())
+
+    def seal(self):
+        """Release the segments that filled up."""
+        for f in self._full:
+            f.close()  # closing drops the flock
+        self._full = []
+
+    def close(self):
+        self.sync()
+        self.seal()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def current(self) -> Optional[str]:
+        return self._name
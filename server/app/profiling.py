@@ -0,0 +1,310 @@
+"""On-demand statistical profiler.
+
+A profiling session runs for at most ``PROFILE_MAX_SECONDS`` and covers every
+request, or a fraction of the requests to some routes. While it runs, a
+sampler thread reads the stack of every thread with ``sys._current_frames()``
+every ``interval_ms``. It counts the stacks of threads busy with a profiled
+request under that request's route. Nothing is traced. Requests pay for a
+route match and a context variable, and only while a session runs. The
+sampler's own CPU time is reported, so its cost can be checked.
+
+Stacks are attributed in two ways. On the event loop, the frame of
+``ProfilingMiddleware`` marks the request. In threadpool workers, the context
+copied from the request names the route, which covers sync endpoints and
+dependencies. Stacks are written in the collapsed format read by
+flamegraph.pl and speedscope, one line per stack, rooted at the route. Each
+worker process profiles itself.
+"""
+
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
+
+from starlette.routing import compile_path
+
+# Deeper stacks are not attributed
+MAX_DEPTH = 256
+# Distinct stacks kept per session, later ones are only counted
+MAX_STACKS = 20_000
+
+_request: ContextVar[Optional["_Request"]] = ContextVar(
+    "profiled_request", default=None
+)
+
+
+def _worker_codes() -> set:
+    """Code of the threadpool loop that runs requests' copied contexts."""
+    try:
+        from anyio._backends._asyncio import WorkerThread
+    except ImportError:
+        return set()
+    return {WorkerThread.run.__code__}
+
+
+WORKER_CODES = _worker_codes()
+IDLE_CODES = {queue.Queue.get.__code__}
+
+
+def _short(filename: str) -> str:
+    _, found, rest = filename.rpartition("site-packages" + os.sep)
+    if found:
+        return rest
+    cwd = os.getcwd() + os.sep
+    return filename[len(cwd) :] if filename.startswith(cwd) else filename
+
+
+def label(code) -> str:
+    return f"{code.co_qualname} ({_short(code.co_filename)}:{code.co_firstlineno})"
+
+
+def route_template(scope) -> Optional[str]:
+    """The path template of the route that served ``scope``, once routed."""
+    route = scope.get("route")
+    suffix = getattr(route, "path", None)
+    if suffix is None:
+        return None
+    # Routes of included routers only know their own part of the path
+    depth = suffix.count("/")
+    segments = scope["path"].split("/")
+    prefix = "/".join(segments[:-depth]) if depth else scope["path"]
+    return prefix + suffix
+
+
+class _Request:
+    """A profiled request; its route is known once the router has run."""
+
+    __slots__ = ("scope", "pattern", "route")
+
+    def __init__(self, scope, pattern: Optional[str]):
+        self.scope = scope
+        self.pattern = pattern
+        self.route: Optional[str] = None
+
+    def label(self) -> str:
+        if self.route is None:
+            template = route_template(self.scope)
+            if template is None:
+                return f"{self.scope['method']} {self.pattern or '(routing)'}"
+            self.route = f"{self.scope['method']} {template}"
+        return self.route
+
+
+class ProfileSession:
+    def __init__(
+        self, seconds: float, interval: float, routes: Iterable[str], sample_rate: float
+    ):
+        self.seconds = seconds
+        self.interval = interval
+        # Paths are matched with or without the /api prefix
+        self.routes = set(routes)
+        self._patterns = [(route, compile_path(route)[0]) for route in self.routes]
+        self.sample_rate = sample_rate
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.ticks = 0
+        self.truncated = 0
+        self.cpu_seconds = 0.0
+        self.requests: Counter = Counter()
+        self.stacks: Counter = Counter()
+        # Guards requests and stacks, which reports read while they grow
+        self._lock = threading.Lock()
+        # Middleware frames of the profiled requests on the event loop
+        self.frames: Dict = {}
+        self._started = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self.finished_at is None
+
+    def wants(self, path: str):
+        """The route pattern ``path`` matched, "" without patterns, None to skip."""
+        pattern = ""
+        if self._patterns:
+            bare = path[4:] if path.startswith("/api/") else path
+            pattern = next(
+                (
+                    route
+                    for route, regex in self._patterns
+                    if regex.match(path) or regex.match(bare)
+                ),
+                None,
+            )
+            if pattern is None:
+                return None
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return None
+        return pattern
+
+    def _add(self, request: _Request, stack: tuple):
+        key = (request.label(), stack)
+        with self._lock:
+            if key in self.stacks or len(self.stacks) < MAX_STACKS:
+                self.stacks[key] += 1
+            else:
+                self.truncated += 1
+
+    def count_request(self, route: str):
+        with self._lock:
+            self.requests[route] += 1
+
+    def _snapshot(self):
+        with self._lock:
+            return Counter(self.stacks), Counter(self.requests)
+
+    def _tick(self):
+        me = threading.get_ident()
+        frames = self.frames
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            request = None
+            callee = None
+            while frame is not None and len(stack) < MAX_DEPTH:
+                request = frames.get(frame)
+                if request is not None:
+                    break
+                code = frame.f_code
+                if code in WORKER_CODES:
+                    # Idle workers wait on their queue
+                    if callee is not None and callee not in IDLE_CODES:
+                        context = frame.f_locals.get("context")
+                        if context is not None:
+                            request = context.get(_request)
+                    break
+                stack.append(code)
+                callee = code
+                frame = frame.f_back
+            if request is not None and stack:
+                self._add(request, tuple(reversed(stack)))
+        self.ticks += 1
+
+    def _run(self):
+        started = time.thread_time()
+        deadline = self._started + self.seconds
+        try:
+            while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+                self._tick()
+        finally:
+            self.cpu_seconds = time.thread_time() - started
+            self.finished_at = time.time()
+
+    def collapsed(self, route: Optional[str] = None) -> str:
+        stacks, _ = self._snapshot()
+        lines = []
+        for (stack_route, stack), count in stacks.most_common():
+            if route is not None and route not in stack_route:
+                continue
+            frames = ";".join(label(code) for code in stack)
+            lines.append(f"{stack_route};{frames} {count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def report(self, top: int = 25) -> dict:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        stacks, requests = self._snapshot()
+        samples = sum(stacks.values())
+        per_route = defaultdict(int)
+        own = Counter()
+        for (route, stack), count in stacks.items():
+            per_route[route] += count
+            own[stack[-1]] += count
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "elapsed_seconds": round(elapsed, 3),
+            "seconds": self.seconds,
+            "interval_ms": self.interval * 1000,
+            "routes_filter": sorted(self.routes),
+            "sample_rate": self.sample_rate,
+            "ticks": self.ticks,
+            "samples": samples,
+            "truncated": self.truncated,
+            "sampler_cpu_seconds": round(self.cpu_seconds, 4),
+            "overhead": round(self.cpu_seconds / elapsed, 4) if elapsed else 0.0,
+            "routes": [
+                {
+                    "route": route,
+                    "requests": requests[route],
+                    "samples": count,
+                    "share": count / samples,
+                }
+                for route, count in sorted(per_route.items(), key=lambda r: -r[1])
+            ],
+            "top_frames": [
+                {"frame": label(code), "samples": count, "share": count / samples}
+                for code, count in own.most_common(top)
+            ],
+        }
+
+
+class Profiler:
+    """One profiling session at a time, and the last finished one."""
+
+    def __init__(self):
+        self.session: Optional[ProfileSession] = None
+        self._lock = threading.Lock()
+
+    def start(
+        self,
+        seconds: float,
+        interval: float,
+        routes: List[str],
+        sample_rate: float,
+    ) -> Optional[ProfileSession]:
+        """Start a session, None when one is already running."""
+        with self._lock:
+            if self.session is not None and self.session.running:
+                return None
+            session = self.session = ProfileSession(
+                seconds, interval, routes, sample_rate
+            )
+        session._thread = threading.Thread(
+            target=session._run, name="profiler", daemon=True
+        )
+        session._thread.start()
+        return session
+
+    def stop(self) -> Optional[ProfileSession]:
+        session = self.session
+        if session is not None and session.running:
+            session._stop.set()
+            session._thread.join(timeout=1)
+        return session
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """Marks the requests of the running profiling session with their route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        session = profiler.session
+        if scope["type"] != "http" or session is None or not session.running:
+            await self.app(scope, receive, send)
+            return
+        pattern = session.wants(scope["path"])
+        if pattern is None:
+            await self.app(scope, receive, send)
+            return
+        request = _Request(scope, pattern)
+        frame = sys._getframe()
+        session.frames[frame] = request
+        token = _request.set(request)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request.reset(token)
+            session.frames.pop(frame, None)
+            session.count_request(request.label())
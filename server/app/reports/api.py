@@ -0,0 +1,122 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import UTC, datetime
+
+from app.database.db import get_db
+from app.auth.auth import get_current_faculty
+from app.jobs import schemas as job_schemas
+from app.jobs.runner import runner
+from app.users.models import User
+from . import schemas
+from .snapshot import Snapshot, current_snapshot
+
+# Reports import ``queries`` (and with it NumPy) on first use
+
+router = APIRouter()
+
+
+def get_snapshot() -> Snapshot:
+    snapshot = current_snapshot()
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No report snapshot has been built yet",
+        )
+    return snapshot
+
+
+def epoch(when: Optional[datetime]) -> Optional[int]:
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=UTC)
+    return int(when.timestamp())
+
+
+@router.get("/snapshot", response_model=schemas.SnapshotInfo)
+def get_snapshot_info(
+    current_user: User = Depends(get_current_faculty),
+    snapshot: Snapshot = Depends(get_snapshot),
+):
+    return snapshot.meta
+
+
+@router.post(
+    "/snapshot",
+    response_model=job_schemas.Job,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def build_snapshot(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_faculty),
+):
+    """Rebuild the report snapshot in the background"""
+    return runner.enqueue(db, "build_report_snapshot", {}, current_user.id)
+
+
+@router.get(
+    "/students/{student_id}/progression", response_model=schemas.StudentProgression
+)
+def get_student_progression(
+    student_id: int,
+    current_user: User = Depends(get_current_faculty),
+    snapshot: Snapshot = Depends(get_snapshot),
+):
+    """A student's results across exams, oldest first"""
+    from . import queries
+
+    return {
+        "student_id": student_id,
+        "snapshot": snapshot.meta["built_at"],
+        "exams": queries.student_progression(snapshot, student_id),
+    }
+
+
+@router.get("/cohorts", response_model=schemas.CohortReport)
+def get_cohorts(
+    group_by: List[str] = Query(["branch", "semester"]),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(get_current_faculty),
+    snapshot: Snapshot = Depends(get_snapshot),
+):
+    """Average percentage per branch and/or semester"""
+    group_by = list(dict.fromkeys(group_by))
+    if not group_by or not set(group_by) <= {"branch", "semester"}:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="group_by must be branch and/or semester",
+        )
+    from . import queries
+
+    return {
+        "snapshot": snapshot.meta["built_at"],
+        "group_by": group_by,
+        "cohorts": queries.cohorts(snapshot, group_by, epoch(since), epoch(until)),
+    }
+
+
+@router.get("/questions/difficulty", response_model=schemas.DifficultyReport)
+def get_question_difficulty(
+    question_id: Optional[int] = None,
+    min_attempts: int = Query(1, ge=1),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=10000),
+    current_user: User = Depends(get_current_faculty),
+    snapshot: Snapshot = Depends(get_snapshot),
+):
+    """Correct answer rate per question and exam.
+
+    Without ``question_id`` the hardest questions come first; with it, the
+    question's exams are listed over time.
+    """
+    from . import queries
+
+    return {
+        "snapshot": snapshot.meta["built_at"],
+        "questions": queries.question_difficulty(
+            snapshot, question_id, min_attempts, epoch(since), epoch(until), limit
+        ),
+    }
@@ -0,0 +1,153 @@
+"""Vectorized reports over a ``Snapshot``.
+
+Submissions are grouped with ``np.unique(..., return_inverse=True)`` and
+``np.bincount``; answers are already sorted by question and exam, so they are
+grouped as runs with ``np.add.reduceat``. Either way a report is a handful of
+passes over the columns.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .snapshot import Snapshot
+
+
+def _percentages(snapshot: Snapshot) -> np.ndarray:
+    subs = snapshot.submissions
+    total = subs["total_marks"].astype(np.float64)
+    maximum = subs["max_marks"].astype(np.float64)
+    return np.divide(
+        total * 100, maximum, out=np.zeros_like(total), where=maximum > 0
+    )
+
+
+def _window(times: np.ndarray, since: Optional[int], until: Optional[int]):
+    mask = np.ones(len(times), dtype=bool)
+    if since is not None:
+        mask &= times >= since
+    if until is not None:
+        mask &= times < until
+    return mask
+
+
+def student_progression(snapshot: Snapshot, student_id: int) -> List[Dict]:
+    subs = snapshot.submissions
+    percentages = _percentages(snapshot)
+
+    # Cohort mean per exam, for context on each of the student's results
+    exams, inverse = np.unique(subs["exam_id"], return_inverse=True)
+    means = np.bincount(inverse, weights=percentages) / np.bincount(inverse)
+
+    rows = np.flatnonzero(subs["student_id"] == student_id)
+    rows = rows[np.argsort(subs["exam_time"][rows], kind="stable")]
+    return [
+        {
+            "exam_id": int(subs["exam_id"][i]),
+            "exam_time": int(subs["exam_time"][i]),
+            "total_marks": int(subs["total_marks"][i]),
+            "max_marks": int(subs["max_marks"][i]),
+            "percentage": round(float(percentages[i]), 2),
+            "exam_average": round(float(means[inverse[i]]), 2),
+        }
+        for i in rows
+    ]
+
+
+def cohorts(
+    snapshot: Snapshot,
+    group_by: List[str],
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+) -> List[Dict]:
+    subs = snapshot.submissions
+    mask = _window(subs["exam_time"], since, until)
+    percentages = _percentages(snapshot)[mask]
+    students = subs["student_id"][mask].astype(np.int64)
+
+    # One integer key per combination of the dictionary codes (-1 is unknown)
+    dictionaries = {"branch": snapshot.branches, "semester": snapshot.semesters}
+    key = np.zeros(len(percentages), dtype=np.int64)
+    for column in group_by:
+        key = key * (len(dictionaries[column]) + 1) + subs[column][mask] + 1
+    groups, inverse, counts = np.unique(key, return_inverse=True, return_counts=True)
+    if not len(groups):
+        return []
+
+    sums = np.bincount(inverse, weights=percentages)
+    squares = np.bincount(inverse, weights=percentages**2)
+    means = sums / counts
+    spread = np.sqrt(np.maximum(squares / counts - means**2, 0))
+    pairs = np.unique(inverse.astype(np.int64) * (students.max() + 1) + students)
+    distinct = np.bincount(pairs // (students.max() + 1), minlength=len(groups))
+
+    results = []
+    for g, group in enumerate(groups):
+        labels = {}
+        for column in reversed(group_by):
+            size = len(dictionaries[column]) + 1
+            code = int(group % size) - 1
+            group //= size
+            labels[column] = dictionaries[column][code] if code >= 0 else None
+        results.append(
+            {
+                **labels,
+                "submissions": int(counts[g]),
+                "students": int(distinct[g]),
+                "average_percentage": round(float(means[g]), 2),
+                "stddev_percentage": round(float(spread[g]), 2),
+            }
+        )
+    return results
+
+
+def question_difficulty(
+    snapshot: Snapshot,
+    question_id: Optional[int] = None,
+    min_attempts: int = 1,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    limit: int = 100,
+) -> List[Dict]:
+    """Share of correct answers per question and exam, hardest first.
+
+    A bank question used by several exams gets one row per exam, which is what
+    shows how its difficulty moves over time.
+    """
+    answers = snapshot.answers
+    rows = slice(None)
+    if question_id is not None:
+        lo, hi = np.searchsorted(answers["question_id"], [question_id, question_id + 1])
+        rows = slice(lo, hi)
+    mask = _window(answers["exam_time"][rows], since, until)
+    questions = answers["question_id"][rows][mask].astype(np.int64)
+    exams = answers["exam_id"][rows][mask].astype(np.int64)
+    correct = answers["marks"][rows][mask] > 0
+
+    # Sorted by (question_id, exam_id): each group is a run of equal keys
+    keys = (questions << 32) | exams
+    starts = np.flatnonzero(np.diff(keys, prepend=-1))
+    if not len(starts):
+        return []
+    keys = keys[starts]
+    attempts = np.diff(starts, append=len(correct))
+    right = np.add.reduceat(correct.astype(np.int64), starts)
+    times = answers["exam_time"][rows][mask][starts]
+    keep = np.flatnonzero(attempts >= min_attempts)
+    rates = right[keep] / attempts[keep]
+
+    if question_id is None:
+        order = keep[np.argsort(rates, kind="stable")][:limit]
+    else:
+        order = keep[np.argsort(times[keep], kind="stable")][:limit]
+    return [
+        {
+            "question_id": int(keys[k] >> 32),
+            "exam_id": int(keys[k] & 0xFFFFFFFF),
+            "exam_time": int(times[k]),
+            "attempts": int(attempts[k]),
+            "correct": int(right[k]),
+            "correct_rate": round(float(right[k] / attempts[k]), 4),
+        }
+        for k in order
+    ]
@@ -0,0 +1,54 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+
+class SnapshotInfo(BaseModel):
+    built_at: datetime
+    submissions: int
+    answers: int
+    build_seconds: float
+
+
+class ExamResult(BaseModel):
+    exam_id: int
+    exam_time: datetime
+    total_marks: int
+    max_marks: int
+    percentage: float
+    exam_average: float
+
+
+class StudentProgression(BaseModel):
+    student_id: int
+    snapshot: datetime
+    exams: List[ExamResult]
+
+
+class Cohort(BaseModel):
+    branch: Optional[str] = None
+    semester: Optional[str] = None
+    submissions: int
+    students: int
+    average_percentage: float
+    stddev_percentage: float
+
+
+class CohortReport(BaseModel):
+    snapshot: datetime
+    group_by: List[str]
+    cohorts: List[Cohort]
+
+
+class QuestionDifficulty(BaseModel):
+    question_id: int
+    exam_id: int
+    exam_time: datetime
+    attempts: int
+    correct: int
+    correct_rate: float
+
+
+class DifficultyReport(BaseModel):
+    snapshot: datetime
+    questions: List[QuestionDifficulty]
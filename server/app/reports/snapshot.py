@@ -0,0 +1,279 @@
+"""Columnar snapshot of submissions and answers for cross-exam reporting.
+
+A snapshot is a directory of ``.npy`` column files plus ``meta.json`` under
+``REPORTS_DIR``. The ``build_report_snapshot`` job writes a new one and then
+swaps it in by rewriting ``CURRENT``, so readers never see a half-written
+snapshot. Readers memory-map the columns, and reports are vectorized NumPy
+aggregations that never touch the ORM or the live tables.
+
+Strings (branch, semester) are dictionary encoded, and answers are sorted by
+``(question_id, exam_id)``. Answers are graded all or
+nothing, so ``correct`` is simply ``marks > 0``.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from array import array
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.bank.models import ExamBankQuestion
+from app.config import settings
+from app.database.db import SessionLocal
+from app.exams import models as exam_models
+from app.exams import shards
+from app.exams.archive import unpack_answers
+from app.jobs.models import Job
+from app.jobs.runner import JobContext, job_handler, runner
+from app.users.models import User
+
+# column -> array typecode
+SUBMISSION_COLUMNS = {
+    "submission_id": "i",
+    "exam_id": "i",
+    "student_id": "i",
+    "total_marks": "i",
+    "max_marks": "i",
+    "exam_time": "q",
+    "branch": "h",
+    "semester": "h",
+}
+ANSWER_COLUMNS = {
+    "exam_id": "i",
+    "question_id": "i",
+    "student_id": "i",
+    "marks": "i",
+    "exam_time": "q",
+}
+KEEP_SNAPSHOTS = 2
+
+
+class Snapshot:
+    def __init__(self, path: Path):
+        import numpy as np
+
+        self.path = path
+        self.meta = json.loads((path / "meta.json").read_text())
+        self.submissions = {
+            name: np.load(path / f"submissions.{name}.npy", mmap_mode="r")
+            for name in SUBMISSION_COLUMNS
+        }
+        self.answers = {
+            name: np.load(path / f"answers.{name}.npy", mmap_mode="r")
+            for name in ANSWER_COLUMNS
+        }
+        self.branches: List[Optional[str]] = self.meta["branches"]
+        self.semesters: List[Optional[str]] = self.meta["semesters"]
+
+
+def _epoch(when: Optional[datetime]) -> int:
+    return int(when.replace(tzinfo=UTC).timestamp()) if when else 0
+
+
+def _encode(value, dictionary: Dict) -> int:
+    return dictionary.setdefault(value, len(dictionary))
+
+
+def build_snapshot(db: Session, root: Optional[str] = None) -> Dict:
+    import numpy as np
+
+    root = Path(root or settings.REPORTS_DIR)
+    started = time.perf_counter()
+
+    exams = db.query(exam_models.Exam.id, exam_models.Exam.end_time)
+    exam_time = {exam_id: _epoch(end_time) for exam_id, end_time in exams}
+    max_marks = dict.fromkeys(exam_time, 0)
+    own = (
+        db.query(exam_models.Question.exam_id, func.sum(exam_models.Question.marks))
+        .filter(exam_models.Question.exam_id.isnot(None))
+        .group_by(exam_models.Question.exam_id)
+    )
+    attached = (
+        db.query(ExamBankQuestion.exam_id, func.sum(exam_models.Question.marks))
+        .join(exam_models.Question, exam_models.Question.id == ExamBankQuestion.question_id)
+        .group_by(ExamBankQuestion.exam_id)
+    )
+    for exam_id, marks in list(own) + list(attached):
+        max_marks[exam_id] = max_marks.get(exam_id, 0) + (marks or 0)
+
+    branches: Dict = {}
+    semesters: Dict = {}
+    students = {
+        user_id: (_encode(branch, branches), _encode(semester, semesters))
+        for user_id, branch, semester in db.query(User.id, User.branch, User.semester)
+    }
+
+    subs = {name: array(code) for name, code in SUBMISSION_COLUMNS.items()}
+
+    def add_submissions(source: Session, model):
+        rows = source.query(
+            model.id, model.exam_id, model.student_id, model.total_marks
+        ).yield_per(10000)
+        for submission_id, exam_id, student_id, total in rows:
+            branch, semester = students.get(student_id, (-1, -1))
+            subs["submission_id"].append(submission_id)
+            subs["exam_id"].append(exam_id)
+            subs["student_id"].append(student_id)
+            subs["total_marks"].append(total or 0)
+            subs["max_marks"].append(max_marks.get(exam_id, 0))
+            subs["exam_time"].append(exam_time.get(exam_id, 0))
+            subs["branch"].append(branch)
+            subs["semester"].append(semester)
+
+    for live in shards.submission_dbs(db):
+        add_submissions(live, exam_models.ExamSubmission)
+    add_submissions(db, exam_models.ArchivedSubmission)
+
+    answers = {name: array(code) for name, code in ANSWER_COLUMNS.items()}
+
+    def add_answer(exam_id, question_id, student_id, marks):
+        answers["exam_id"].append(exam_id)
+        answers["question_id"].append(question_id)
+        answers["student_id"].append(student_id)
+        answers["marks"].append(marks or 0)
+        answers["exam_time"].append(exam_time.get(exam_id, 0))
+
+    for live in shards.submission_dbs(db):
+        rows = (
+            live.query(
+                exam_models.ExamSubmission.exam_id,
+                exam_models.AnswerSubmission.question_id,
+                exam_models.ExamSubmission.student_id,
+                exam_models.AnswerSubmission.marks_obtained,
+            )
+            .join(exam_models.ExamSubmission)
+            .yield_per(10000)
+        )
+        for row in rows:
+            add_answer(*row)
+    archived = db.query(
+        exam_models.ArchivedSubmission.exam_id,
+        exam_models.ArchivedSubmission.student_id,
+        exam_models.ArchivedSubmission.answers,
+    ).yield_per(1000)
+    for exam_id, student_id, blob in archived:
+        for answer in unpack_answers(blob):
+            add_answer(
+                exam_id, answer["question_id"], student_id, answer["marks_obtained"]
+            )
+
+    built_at = datetime.now(UTC)
+    path = root / f"snapshot-{built_at.strftime('%Y%m%dT%H%M%S%f')}"
+    path.mkdir(parents=True)
+    for name, values in subs.items():
+        np.save(path / f"submissions.{name}.npy", np.frombuffer(values, values.typecode))
+    # Answers are stored sorted by question and exam, so per question
+    # reports group runs of equal keys instead of sorting millions of rows
+    columns = {name: np.frombuffer(v, v.typecode) for name, v in answers.items()}
+    order = np.lexsort((columns["exam_id"], columns["question_id"]))
+    for name, values in columns.items():
+        np.save(path / f"answers.{name}.npy", values[order])
+
+    meta = {
+        "built_at": built_at.isoformat(),
+        "submissions": len(subs["submission_id"]),
+        "answers": len(answers["question_id"]),
+        "branches": list(branches),
+        "semesters": list(semesters),
+        "build_seconds": round(time.perf_counter() - started, 3),
+    }
+    (path / "meta.json").write_text(json.dumps(meta))
+
+    current = root / "CURRENT"
+    tmp = root / "CURRENT.tmp"
+    tmp.write_text(path.name)
+    os.replace(tmp, current)
+
+    old = sorted(p for p in root.glob("snapshot-*") if p.is_dir())[:-KEEP_SNAPSHOTS]
+    for p in old:
+        shutil.rmtree(p, ignore_errors=True)
+    return meta
+
+
+_current: Optional[Snapshot] = None
+_current_lock = threading.Lock()
+
+
+def current_snapshot() -> Optional[Snapshot]:
+    """The newest snapshot, reloaded when another process has swapped it."""
+    global _current
+    pointer = Path(settings.REPORTS_DIR) / "CURRENT"
+    try:
+        name = pointer.read_text().strip()
+    except FileNotFoundError:
+        return None
+    with _current_lock:
+        if _current is None or _current.path.name != name:
+            _current = Snapshot(pointer.parent / name)
+        return _current
+
+
+@job_handler("build_report_snapshot")
+def build_report_snapshot(ctx: JobContext, params: dict):
+    return build_snapshot(ctx.db)
+
+
+def _snapshot_due() -> bool:
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return True
+    built_at = datetime.fromisoformat(snapshot.meta["built_at"])
+    age = (datetime.now(UTC) - built_at).total_seconds()
+    return age >= settings.REPORT_SNAPSHOT_INTERVAL_MINUTES * 60
+
+
+def enqueue_if_due():
+    db = SessionLocal()
+    try:
+        pending = (
+            db.query(Job.id)
+            .filter(
+                Job.kind == "build_report_snapshot",
+                Job.status.in_(("queued", "running")),
+            )
+            .first()
+        )
+        if pending is None and _snapshot_due():
+            runner.enqueue(db, "build_report_snapshot", {}, None)
+    finally:
+        db.close()
+
+
+class PeriodicSnapshots:
+    """Enqueues a snapshot job whenever the current one is older than the interval.
+
+    Every worker process runs one of these, but a job is only enqueued when
+    none is pending and the snapshot on disk is stale, so they don't pile up.
+    """
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if settings.REPORT_SNAPSHOT_INTERVAL_MINUTES <= 0 or self._thread:
+            return
+        self._thread = threading.Thread(
+            target=self._loop, name="report-snapshots", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(60):
+            try:
+                enqueue_if_due()
+            except Exception:
+                pass
+
+
+periodic = PeriodicSnapshots()
@@ -0,0 +1,159 @@
+"""Coalescing of concurrent identical loads.
+
+When many requests miss at once (every student opening the same exam at its
+start time), ``SingleFlight`` lets the first caller of a key run the load and
+hands its result, or its exception, to every caller that arrived while it
+was running. Nothing is cached past that: the next call after the load
+finished runs it again. A leader stopped by something other than an
+``Exception`` (its request cancelled, the process exiting) hands nothing
+over: its followers retry, and one of them runs the load.
+
+Threadpool handlers call ``do()``. Coroutines call ``do_async()``, which
+runs the load in a worker thread and waits without blocking the event loop.
+Both kinds of caller can share one load.
+
+ORM instances belong to the session that loaded them and must not be handed
+to other requests. Loads of rows return ``row_values()``, and each caller
+turns them into an instance of its own session with ``attach()``, which
+emits no SQL.
+"""
+
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import anyio
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+# Every SingleFlight by name, for the admin metrics endpoint
+FLIGHTS: Dict[str, "SingleFlight"] = {}
+
+
+def row_values(instance) -> Optional[dict]:
+    if instance is None:
+        return None
+    return {
+        attr.key: getattr(instance, attr.key)
+        for attr in inspect(type(instance)).column_attrs
+    }
+
+
+def attach(db: Session, model, values: dict):
+    """An instance of ``model`` with ``values`` in ``db``, as if ``db`` loaded it."""
+    instance = model(**values)
+    make_transient_to_detached(instance)
+    return db.merge(instance, load=False)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "abandoned", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[Exception] = None
+        # The leader was cancelled, followers load again
+        self.abandoned = False
+        # (loop, future) of coroutines waiting, None once finished
+        self.waiters: Optional[List] = []
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self.loads = 0
+        self.shared = 0
+        self.errors = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        FLIGHTS[name] = self
+
+    def _join(self, key):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.loads += 1
+            return call, True
+
+    def _finish(self, key, call: _Call, result, error):
+        with self._lock:
+            del self._calls[key]
+            if error is None or isinstance(error, Exception):
+                call.result, call.error = result, error
+            else:
+                # Cancellation belongs to the leader's caller, not to its followers
+                call.abandoned = True
+            waiters, call.waiters = call.waiters, None
+            if call.error is not None:
+                self.errors += 1
+            call.done.set()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def do(self, key: Hashable, fn: Callable, *args) -> Any:
+        """``fn(*args)``, or the result of the call of ``key`` already running."""
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                break
+            call.done.wait()
+            if not call.abandoned:
+                return call.outcome()
+        try:
+            result = fn(*args)
+        except BaseException as error:
+            self._finish(key, call, None, error)
+            raise
+        self._finish(key, call, result, None)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable, *args) -> Any:
+        """``do()`` for coroutines: ``fn`` runs in a worker thread."""
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                break
+            with self._lock:
+                future = None
+                if call.waiters is not None:
+                    loop = asyncio.get_running_loop()
+                    future = loop.create_future()
+                    call.waiters.append((loop, future))
+            if future is not None:
+                await future
+            if not call.abandoned:
+                return call.outcome()
+        try:
+            result = await anyio.to_thread.run_sync(fn, *args)
+        except BaseException as error:
+            self._finish(key, call, None, error)
+            raise
+        self._finish(key, call, result, None)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        calls = self.loads + self.shared
+        return {
+            "name": self.name,
+            "loads": self.loads,
+            "shared": self.shared,
+            "errors": self.errors,
+            "in_flight": in_flight,
+            "coalesced_ratio": self.shared / calls if calls else 0.0,
+        }
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.database.db import get_db
+from app.database.db import get_db, get_read_db
 from app.auth.auth import get_password_hash, get_current_user
 from . import models, schemas
 
@@ -43,7 +43,7 @@ def read_users_me(current_user: models.User = Depends(get_current_user)):
 def read_users(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user),
 ):
     users = (
@@ -0,0 +1,38 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+
+def use_database(url: str) -> None:
+    # Must run before anything under app/ is imported, settings are read once
+    os.environ["DATABASE_URL"] = url
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def baseline_path(suite: str, name: str) -> Path:
+    return BASELINE_DIR / f"{suite}-{name}.json"
+
+
+def save_baseline(suite: str, name: str, report: Dict) -> Path:
+    path = baseline_path(suite, name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    return path
+
+
+def load_baseline(suite: str, name: str) -> Optional[Dict]:
+    path = baseline_path(suite, name)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
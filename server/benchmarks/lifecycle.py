@@ -0,0 +1,401 @@
+"""End-to-end exam lifecycle benchmark.
+
+Seeds faculty, students and exams through the ORM models, then replays an
+exam sitting against the API and reports throughput, latency percentiles and
+query counts per phase:
+
+    python -m benchmarks.lifecycle --students 500 --exams 4
+    python -m benchmarks.lifecycle --target uvicorn --save-baseline main
+    python -m benchmarks.lifecycle --compare main
+
+``--target asgi`` drives the app in-process, ``--target uvicorn`` starts a
+local uvicorn server on loopback, ``--target url`` hits an already running
+server (seed it through the same ``--database-url``; query counts are not
+available in that mode).
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import threading
+import time
+from datetime import UTC, datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.common import load_baseline, percentile, save_baseline, use_database
+
+SUITE = "lifecycle"
+PASSWORD = "bench-password"
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "after_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+def seed(n_faculty: int, n_students: int, n_exams: int, n_questions: int) -> Dict:
+    from app.auth.auth import get_password_hash
+    from app.database.db import SessionLocal
+    from app.exams import models as exam_models
+    from app.users.models import User
+
+    # One hash for everyone: logins still pay a full bcrypt verify each
+    hashed = get_password_hash(PASSWORD)
+    stamp = int(time.time())
+    now = datetime.now(UTC).replace(tzinfo=None)
+
+    db = SessionLocal()
+    try:
+        faculty = [
+            User(
+                email=f"faculty{i}.{stamp}@bench.local",
+                name=f"Faculty {i}",
+                hashed_password=hashed,
+                is_faculty=True,
+            )
+            for i in range(n_faculty)
+        ]
+        students = [
+            User(
+                roll_number=f"B{stamp}{i:06d}",
+                email=f"student{i}.{stamp}@bench.local",
+                name=f"Student {i}",
+                branch="cse",
+                semester="6",
+                hashed_password=hashed,
+            )
+            for i in range(n_students)
+        ]
+        db.add_all(faculty + students)
+        db.flush()
+
+        exams = []
+        for i in range(n_exams):
+            exam = exam_models.Exam(
+                title=f"Bench exam {i}",
+                description="Seeded by benchmarks.lifecycle",
+                start_time=now - timedelta(hours=1),
+                end_time=now + timedelta(hours=3),
+                duration_minutes=180,
+                faculty_id=faculty[i % n_faculty].id,
+                status=exam_models.LIVE,
+            )
+            db.add(exam)
+            db.flush()
+            questions = [
+                exam_models.Question(
+                    exam_id=exam.id,
+                    question_text=f"Question {q} of bench exam {i}?",
+                    marks=1 + q % 4,
+                    options=json.dumps([f"option {o}" for o in range(4)]),
+                    correct_answer=f"option {q % 4}",
+                )
+                for q in range(n_questions)
+            ]
+            db.add_all(questions)
+            db.flush()
+            exams.append(
+                {
+                    "id": exam.id,
+                    "faculty": faculty[i % n_faculty].email,
+                    "questions": [(q.id, q.correct_answer) for q in questions],
+                }
+            )
+        db.commit()
+        return {
+            "faculty": [f.email for f in faculty],
+            "students": [s.roll_number for s in students],
+            "exams": exams,
+        }
+    finally:
+        db.close()
+
+
+# A job takes the shared client and returns the pending request
+Job = Callable[..., Awaitable]
+
+
+async def run_phase(
+    name: str,
+    client,
+    jobs: List[Job],
+    concurrency: int,
+    counter: Optional[QueryCounter],
+) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def run(job: Job):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await job(client)
+                key = str(response.status_code)
+            except Exception as e:
+                response, key = None, type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[key] = statuses.get(key, 0) + 1
+            return response
+
+    queries_before = counter.count if counter else 0
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(run(job) for job in jobs))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    queries = counter.count - queries_before if counter else None
+    return {
+        "phase": name,
+        "requests": len(jobs),
+        "errors": sum(v for k, v in statuses.items() if not k.startswith("2")),
+        "statuses": statuses,
+        "seconds": round(elapsed, 4),
+        "throughput_rps": round(len(jobs) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p90_ms": round(percentile(latencies, 90), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "queries": queries,
+        "queries_per_request": (
+            round(queries / len(jobs), 2) if queries is not None and jobs else None
+        ),
+        "_responses": responses,
+    }
+
+
+async def run_lifecycle(client, data: Dict, concurrency: int, counter) -> List[Dict]:
+    phases = []
+
+    def record(phase: Dict) -> List:
+        responses = phase.pop("_responses")
+        phases.append(phase)
+        return responses
+
+    def student_login(roll_number: str) -> Job:
+        return lambda c: c.post(
+            "/api/auth/token", data={"username": roll_number, "password": PASSWORD}
+        )
+
+    def faculty_login(email: str) -> Job:
+        return lambda c: c.post(
+            "/api/faculty/login", data={"username": email, "password": PASSWORD}
+        )
+
+    logins = [student_login(r) for r in data["students"]]
+    logins += [faculty_login(e) for e in data["faculty"]]
+    responses = record(await run_phase("login", client, logins, concurrency, counter))
+    tokens = [
+        r.json()["access_token"] if r is not None and r.status_code == 200 else None
+        for r in responses
+    ]
+    student_tokens = [t for t in tokens[: len(data["students"])] if t]
+    faculty_tokens = dict(zip(data["faculty"], tokens[len(data["students"]) :]))
+
+    def auth(token: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {token}"}
+
+    def get_exam(token: str, exam_id: int) -> Job:
+        return lambda c: c.get(f"/api/exams/{exam_id}", headers=auth(token))
+
+    def submit(token: str, exam_id: int, question_id: int, answer: str) -> Job:
+        body = {
+            "exam_id": exam_id,
+            "answers": {"question_id": question_id, "answer": answer},
+        }
+        return lambda c: c.post(
+            f"/api/exams/{exam_id}/submit", json=body, headers=auth(token)
+        )
+
+    fetches = [get_exam(t, e["id"]) for e in data["exams"] for t in student_tokens]
+    record(await run_phase("get_exam", client, fetches, concurrency, counter))
+
+    submits = []
+    for exam in data["exams"]:
+        for i, token in enumerate(student_tokens):
+            question_id, correct = exam["questions"][i % len(exam["questions"])]
+            # Roughly two thirds of the cohort answers correctly
+            answer = correct if i % 3 else "wrong"
+            submits.append(submit(token, exam["id"], question_id, answer))
+    record(await run_phase("submit", client, submits, concurrency, counter))
+
+    results = [
+        (lambda token: lambda c: c.get("/api/exams/results", headers=auth(token)))(t)
+        for t in faculty_tokens.values()
+        if t
+    ]
+    record(await run_phase("results", client, results, concurrency, counter))
+
+    analytics = [
+        (
+            lambda token, exam_id: lambda c: c.get(
+                f"/api/exams/{exam_id}/analytics", headers=auth(token)
+            )
+        )(faculty_tokens[e["faculty"]], e["id"])
+        for e in data["exams"]
+        if faculty_tokens.get(e["faculty"])
+    ]
+    record(await run_phase("analytics", client, analytics, concurrency, counter))
+    return phases
+
+
+def start_uvicorn(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def drive(args, data: Dict, counter) -> List[Dict]:
+    import httpx
+
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    if args.target == "asgi":
+        from main import app
+
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=timeout
+        ) as client:
+            return await run_lifecycle(client, data, args.concurrency, counter)
+
+    base_url = args.url or f"http://127.0.0.1:{args.port}"
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=timeout, limits=limits
+    ) as client:
+        return await run_lifecycle(client, data, args.concurrency, counter)
+
+
+def print_report(report: Dict, baseline: Optional[Dict]) -> None:
+    base_phases = {p["phase"]: p for p in (baseline or {}).get("phases", [])}
+    header = f"{'phase':<10} {'reqs':>6} {'err':>5} {'rps':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>7}"
+    print(header)
+    print("-" * len(header))
+    for p in report["phases"]:
+        qpr = "-" if p["queries_per_request"] is None else p["queries_per_request"]
+        print(
+            f"{p['phase']:<10} {p['requests']:>6} {p['errors']:>5} "
+            f"{p['throughput_rps']:>9} {p['p50_ms']:>8} {p['p95_ms']:>8} "
+            f"{p['p99_ms']:>8} {qpr:>7}"
+        )
+        base = base_phases.get(p["phase"])
+        if base:
+            print(
+                f"{'  vs base':<10} {'':>6} {'':>5} "
+                f"{_delta(p['throughput_rps'], base['throughput_rps']):>9} "
+                f"{_delta(p['p50_ms'], base['p50_ms']):>8} "
+                f"{_delta(p['p95_ms'], base['p95_ms']):>8} "
+                f"{_delta(p['p99_ms'], base['p99_ms']):>8}"
+            )
+    if baseline and baseline.get("config") != report["config"]:
+        print("\nwarning: baseline was recorded with a different configuration")
+
+
+def _delta(current: float, base: float) -> str:
+    if not base:
+        return "-"
+    return f"{(current - base) / base * 100:+.0f}%"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--faculty", type=int, default=2)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--exams", type=int, default=2)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--target", choices=["asgi", "uvicorn", "url"], default="asgi")
+    parser.add_argument("--url", help="base URL of a running server (--target url)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--database-url",
+        help="defaults to a fresh SQLite file in a temporary directory",
+    )
+    parser.add_argument("--echo", action="store_true", help="log SQL statements")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--json", action="store_true", help="print the raw report")
+    args = parser.parse_args(argv)
+
+    if args.target == "url" and not args.url:
+        parser.error("--target url requires --url")
+
+    database_url = args.database_url
+    if database_url is None:
+        database_url = f"sqlite:///{tempfile.mkdtemp(prefix='exam-bench-')}/bench.db"
+    use_database(database_url)
+
+    import main as app_main
+    from app.database import models  # noqa: F401
+    from app.database.db import Base, engine
+    from app.exams import shards
+
+    # Seeding runs before any lifespan, and ASGITransport never runs one
+    Base.metadata.create_all(bind=engine)
+    shards.create_tables()
+    engine.echo = args.echo
+    counter = QueryCounter(engine) if args.target != "url" else None
+
+    started = time.perf_counter()
+    data = seed(args.faculty, args.students, args.exams, args.questions)
+    seed_seconds = time.perf_counter() - started
+
+    server = None
+    if args.target == "uvicorn":
+        server, thread = start_uvicorn(app_main.app, args.port)
+    try:
+        phases = asyncio.run(drive(args, data, counter))
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join()
+
+    report = {
+        "suite": SUITE,
+        "config": {
+            "faculty": args.faculty,
+            "students": args.students,
+            "exams": args.exams,
+            "questions": args.questions,
+            "concurrency": args.concurrency,
+            "target": args.target,
+            "dialect": engine.dialect.name,
+        },
+        "seed_seconds": round(seed_seconds, 3),
+        "phases": phases,
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, load_baseline(SUITE, args.compare) if args.compare else None)
+    if args.compare and load_baseline(SUITE, args.compare) is None:
+        print(f"no baseline named {args.compare!r}", file=sys.stderr)
+        return 1
+    if args.save_baseline:
+        path = save_baseline(SUITE, args.save_baseline, report)
+        print(f"baseline written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
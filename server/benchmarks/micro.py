@@ -0,0 +1,241 @@
+"""Micro-benchmarks for request hot paths with a regression gate.
+
+    python -m benchmarks.micro run
+    python -m benchmarks.micro run --save main
+    python -m benchmarks.micro compare main --max-slowdown 0.25
+
+``compare`` re-runs the suite and exits non-zero when any benchmark's median
+is more than ``--max-slowdown`` (a fraction) slower than the stored baseline.
+Baselines are machine specific; record them on the machine that gates deploys.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.common import load_baseline, save_baseline
+
+SUITE = "micro"
+
+# name -> factory returning the zero-argument callable to time
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def bench(name: str):
+    def register(factory):
+        BENCHMARKS[name] = factory
+        return factory
+
+    return register
+
+
+def _question(i: int, exam_id: int = 1) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=i,
+        exam_id=exam_id,
+        question_text=f"Which of the following statements about topic {i} holds?",
+        marks=1 + i % 4,
+        options=json.dumps([f"Option {o} for question {i}" for o in range(4)]),
+        correct_answer=f"Option {i % 4} for question {i}",
+    )
+
+
+def _exam(n_questions: int) -> SimpleNamespace:
+    now = datetime(2025, 1, 1, 9, 0)
+    return SimpleNamespace(
+        id=1,
+        title="End semester examination",
+        description="Large paper used by the serialization benchmarks",
+        start_time=now,
+        end_time=now + timedelta(hours=3),
+        duration_minutes=180,
+        faculty_id=1,
+        is_active=True,
+        status="live",
+        questions=[_question(i) for i in range(n_questions)],
+    )
+
+
+@bench("auth.create_access_token")
+def bench_create_access_token():
+    from app.auth.auth import create_access_token
+
+    return lambda: create_access_token(
+        data={"sub": "CS2021001"}, expires_delta=timedelta(minutes=30)
+    )
+
+
+@bench("auth.jwt_decode")
+def bench_jwt_decode():
+    from jose import jwt
+
+    from app.auth.auth import create_access_token
+    from app.config import settings
+
+    token = create_access_token(data={"sub": "CS2021001"})
+    return lambda: jwt.decode(
+        token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+    )
+
+
+@bench("auth.verify_password")
+def bench_verify_password():
+    from app.auth.auth import get_password_hash, verify_password
+
+    hashed = get_password_hash("correct horse battery staple")
+    return lambda: verify_password("correct horse battery staple", hashed)
+
+
+@bench("schemas.QuestionResponse.parse_options")
+def bench_parse_options():
+    from app.exams.schemas import QuestionResponse
+
+    question = _question(7)
+    return lambda: QuestionResponse.model_validate(question)
+
+
+@bench("schemas.Exam.serialize_200")
+def bench_exam_serialize_200():
+    from app.exams.schemas import Exam
+
+    exam = _exam(200)
+    return lambda: Exam.model_validate(exam).model_dump_json()
+
+
+@bench("schemas.Exam.serialize_1000")
+def bench_exam_serialize_1000():
+    from app.exams.schemas import Exam
+
+    exam = _exam(1000)
+    return lambda: Exam.model_validate(exam).model_dump_json()
+
+
+@bench("grading.grade_answer")
+def bench_grade_answer():
+    from app.exams.grading import grade_answer
+
+    questions = [_question(i) for i in range(100)]
+    answers = [q.correct_answer if q.id % 3 else "wrong" for q in questions]
+    pairs = list(zip(questions, answers))
+
+    def grade_paper():
+        return sum(grade_answer(q, a) for q, a in pairs)
+
+    return grade_paper
+
+
+def measure(fn: Callable[[], object], min_time: float, repeats: int) -> Dict:
+    # Calibrate the loop count so each repeat runs for at least min_time
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - started) / loops * 1e6)
+    return {
+        "loops": loops,
+        "min_us": round(min(samples), 3),
+        "median_us": round(statistics.median(samples), 3),
+        "mean_us": round(statistics.fmean(samples), 3),
+        "stdev_us": round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+    }
+
+
+def run_suite(selected: Optional[List[str]], min_time: float, repeats: int) -> Dict:
+    results = {}
+    for name, factory in BENCHMARKS.items():
+        if selected and not any(s in name for s in selected):
+            continue
+        results[name] = measure(factory(), min_time, repeats)
+    return {"suite": SUITE, "python": sys.version.split()[0], "results": results}
+
+
+def compare(report: Dict, baseline: Dict, max_slowdown: float) -> List[str]:
+    regressions = []
+    print(f"{'benchmark':<42} {'base us':>11} {'now us':>11} {'change':>8}")
+    for name, result in report["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<42} {'-':>11} {result['median_us']:>11} {'new':>8}")
+            continue
+        change = (result["median_us"] - base["median_us"]) / base["median_us"]
+        flag = ""
+        if change > max_slowdown:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<42} {base['median_us']:>11} {result['median_us']:>11} "
+            f"{change * 100:>+7.1f}%{flag}"
+        )
+    return regressions
+
+
+def print_report(report: Dict) -> None:
+    print(f"{'benchmark':<42} {'median us':>11} {'min us':>11} {'loops':>8}")
+    for name, result in report["results"].items():
+        print(
+            f"{name:<42} {result['median_us']:>11} {result['min_us']:>11} "
+            f"{result['loops']:>8}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command in ("run", "compare"):
+        p = sub.add_parser(command)
+        p.add_argument("-k", dest="selected", action="append", help="name filter")
+        p.add_argument("--min-time", type=float, default=0.05)
+        p.add_argument("--repeats", type=int, default=7)
+    sub.choices["run"].add_argument("--save", metavar="NAME")
+    sub.choices["compare"].add_argument("baseline")
+    sub.choices["compare"].add_argument(
+        "--max-slowdown",
+        type=float,
+        default=0.25,
+        help="allowed fractional slowdown of the median (default: 0.25)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        baseline = load_baseline(SUITE, args.baseline)
+        if baseline is None:
+            print(f"no baseline named {args.baseline!r}", file=sys.stderr)
+            return 2
+
+    report = run_suite(args.selected, args.min_time, args.repeats)
+
+    if args.command == "run":
+        print_report(report)
+        if args.save:
+            print(f"baseline written to {save_baseline(SUITE, args.save, report)}")
+        return 0
+
+    regressions = compare(report, baseline, args.max_slowdown)
+    if regressions:
+        print(
+            f"\n{len(regressions)} benchmark(s) slower than "
+            f"{args.max_slowdown:.0%} over baseline: {', '.join(regressions)}",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""Management commands.
+
+    python cli.py init-db           create any missing tables
+    python cli.py import-profile    where startup import time goes
+    python cli.py purge-tokens      delete expired refresh tokens
+    python cli.py purge-changes     delete change log entries past retention
+    python cli.py rebalance         even out submissions across shards
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def init_db(args):
+    from app.database.db import Base, engine, shard_engines
+    from app.database import models  # noqa: F401
+
+    from app.bank import search
+    from app.exams import shards
+
+    Base.metadata.create_all(bind=engine)
+    search.create_index(engine)
+    print(f"Created missing tables on {engine.url.render_as_string()}")
+    shards.create_tables()
+    for number, shard_engine in enumerate(shard_engines, 1):
+        print(f"Created missing tables on shard {number}: {shard_engine.url}")
+
+
+def import_profile(args):
+    """Import ``args.module`` in a fresh interpreter under ``-X importtime``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        sys.stderr.write(result.stderr)
+        sys.exit(result.returncode)
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append((name, int(own), int(cumulative), len(indent)))
+    if not modules:
+        sys.exit("No import timings found")
+
+    total = sum(own for _, own, _, _ in modules)
+    packages = defaultdict(int)
+    for name, own, _, _ in modules:
+        packages[name.split(".")[0]] += own
+
+    print(f"{args.module}: {total / 1000:.1f} ms over {len(modules)} modules\n")
+    print(f"{'package':<32} {'ms':>9} {'share':>7}")
+    for package, own in sorted(packages.items(), key=lambda p: -p[1])[: args.top]:
+        print(f"{package:<32} {own / 1000:>9.1f} {own / total:>7.1%}")
+
+    print(f"\n{'slowest modules (self)':<48} {'ms':>9}")
+    for name, own, _, _ in sorted(modules, key=lambda m: -m[1])[: args.top]:
+        print(f"{name:<48} {own / 1000:>9.1f}")
+
+
+def purge_tokens(args):
+    from app.auth.refresh import purge
+    from app.database.db import SessionLocal
+    from app.database import models  # noqa: F401
+
+    db = SessionLocal()
+    try:
+        print(f"Deleted {purge(db)} expired refresh tokens")
+    finally:
+        db.close()
+
+
+def purge_changes(args):
+    from datetime import UTC, datetime, timedelta
+
+    from app.changes.log import purge
+    from app.config import settings
+    from app.database.db import SessionLocal
+    from app.database import models  # noqa: F401
+    from app.exams import shards
+
+    retention = timedelta(days=settings.CHANGE_LOG_RETENTION_DAYS)
+    before = datetime.now(UTC).replace(tzinfo=None) - retention
+    db = SessionLocal()
+    try:
+        for number, source in enumerate(shards.submission_dbs(db)):
+            print(f"Deleted {purge(source, before)} change log entries on shard {number}")
+    finally:
+        db.close()
+
+
+def rebalance(args):
+    """Move exams between submission shards, by hand or evening them out."""
+    from datetime import UTC, datetime
+
+    from app.database.db import SessionLocal
+    from app.database import models  # noqa: F401
+    from app.exams import shards
+    from app.exams.models import Exam
+
+    if not shards.enabled():
+        sys.exit("No submission shards configured (SUBMISSION_SHARD_URLS)")
+    db = SessionLocal()
+    try:
+        now = datetime.now(UTC).replace(tzinfo=None)
+        running = {
+            exam_id
+            for (exam_id,) in db.query(Exam.id).filter(Exam.end_time >= now)
+        }
+        sizes = shards.shard_sizes(db)
+    finally:
+        db.close()
+
+    if args.exam is not None:
+        if args.to is None or not 0 <= args.to < shards.count():
+            sys.exit(f"--to must be a shard between 0 and {shards.count() - 1}")
+        if args.exam in running and not args.force:
+            sys.exit(f"Exam {args.exam} is still open, pass --force to move it anyway")
+        source = shards.shard_map.shard_of(args.exam)
+        moves = [(args.exam, source, args.to)]
+    else:
+        moves = shards.plan_rebalance(
+            sizes, lambda exam_id: args.force or exam_id not in running
+        )
+
+    for number, shard in enumerate(sizes):
+        print(
+            f"shard {number}: {len(shard)} exams, {sum(shard.values())} submissions"
+        )
+    if not moves:
+        print("Nothing to move")
+        return
+    for exam_id, source, target in moves:
+        submissions = sizes[source].get(exam_id, 0)
+        print(f"exam {exam_id}: shard {source} -> {target} ({submissions} submissions)")
+        if not args.dry_run:
+            shards.move_exam(exam_id, target, args.grace)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("init-db", help="create any missing tables").set_defaults(
+        func=init_db
+    )
+
+    profile = commands.add_parser(
+        "import-profile", help="report where import time goes"
+    )
+    profile.add_argument("--module", default="main")
+    profile.add_argument("--top", type=int, default=15)
+    profile.set_defaults(func=import_profile)
+
+    commands.add_parser(
+        "purge-tokens", help="delete expired refresh tokens"
+    ).set_defaults(func=purge_tokens)
+
+    commands.add_parser(
+        "purge-changes", help="delete change log entries past retention"
+    ).set_defaults(func=purge_changes)
+
+    balance = commands.add_parser(
+        "rebalance", help="even out submissions across shards"
+    )
+    balance.add_argument("--exam", type=int, help="move only this exam")
+    balance.add_argument("--to", type=int, help="shard to move --exam to")
+    balance.add_argument(
+        "--force", action="store_true", help="also move exams still open"
+    )
+    balance.add_argument("--dry-run", action="store_true")
+    balance.add_argument(
+        "--grace",
+        type=float,
+        default=None,
+        help="seconds between switching an exam and deleting its old rows "
+        "(default SUBMISSION_SHARD_MAP_SECONDS)",
+    )
+    balance.set_defaults(func=rebalance)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
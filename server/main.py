@@ -1,21 +1,60 @@
+import threading
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
+from app.compression import CompressionMiddleware
+from app.idempotency.middleware import IdempotencyMiddleware
+from app.profiling import ProfilingMiddleware
 
 from app.database.db import engine
 
 from app.database.db import Base
 
 from app.api import router as api_router
+from app.health.api import router as health_router
+from app.bank import search
+from app.exams import shards
+from app.exams.lifecycle import scheduler as exam_lifecycle
+from app.exams.leaderboard import leaderboards
+from app.jobs.runner import runner as job_runner
+from app.reports.snapshot import periodic as report_snapshots
+from app.proctoring.ingest import ingest as proctoring_ingest
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.DB_CREATE_ALL:
+        # Create database tables
+        Base.metadata.create_all(bind=engine)
+        search.create_index(engine)
+        shards.create_tables()
+    job_runner.recover()
+    if not leaderboards.built:
+        # Already built when a preloading server warmed up before forking
+        threading.Thread(
+            target=leaderboards.rebuild, name="leaderboards", daemon=True
+        ).start()
+    report_snapshots.start()
+    exam_lifecycle.start()
+    proctoring_ingest.start()
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    report_snapshots.stop()
+    exam_lifecycle.stop()
+    # Write the frames already accepted
+    proctoring_ingest.stop(timeout=settings.GRACEFUL_TIMEOUT)
+    job_runner.shutdown(wait=False)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Examination System API",
     description="API for Comprehensive Examination System",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -26,9 +65,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Inside compression: stored responses are the uncompressed ones
+app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
+# Outermost, so profiles include the time spent in the other middleware
+app.add_middleware(ProfilingMiddleware)
 
 # Include routers
 app.include_router(api_router, prefix="/api")
+app.include_router(health_router, prefix="/health", tags=["health"])
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,41 @@
+"""add change log exam
+
+Revision ID: add_change_log_exam
+Revises: create_bank_search_index
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "add_change_log_exam"
+down_revision = "create_bank_search_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("change_log", sa.Column("exam_id", sa.Integer(), nullable=True))
+    # Feeds are scoped by exam and owner: fill both in for the logged rows
+    # that still exist
+    op.execute(
+        "UPDATE change_log SET exam_id = entity_id, user_id = "
+        "(SELECT faculty_id FROM exams WHERE exams.id = change_log.entity_id) "
+        "WHERE entity = 'exam'"
+    )
+    for entity, table in (
+        ("question", "questions"),
+        ("submission", "exam_submissions"),
+    ):
+        op.execute(
+            f"UPDATE change_log SET exam_id = (SELECT exam_id FROM {table} "
+            f"WHERE {table}.id = change_log.entity_id) WHERE entity = '{entity}'"
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("change_log") as batch_op:
+        batch_op.drop_column("exam_id")
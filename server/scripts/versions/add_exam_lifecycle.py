@@ -0,0 +1,46 @@
+"""add exam lifecycle
+
+Revision ID: add_exam_lifecycle
+Revises: add_submission_student_index
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from datetime import UTC, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "add_exam_lifecycle"
+down_revision = "add_submission_student_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_exams_status", "exams", ["status"])
+    # Former statuses ("pending", "upcoming", "completed") said nothing about
+    # the exam's times. Exams that ended are marked graded: their ranks and
+    # statistics are computed on demand, as before
+    exams = sa.table(
+        "exams",
+        sa.column("status", sa.String),
+        sa.column("start_time", sa.DateTime),
+        sa.column("end_time", sa.DateTime),
+    )
+    now = datetime.now(UTC).replace(tzinfo=None)
+    op.execute(
+        exams.update().where(exams.c.start_time > now).values(status="scheduled")
+    )
+    op.execute(
+        exams.update()
+        .where(exams.c.start_time <= now, exams.c.end_time >= now)
+        .values(status="live")
+    )
+    op.execute(exams.update().where(exams.c.end_time < now).values(status="graded"))
+
+
+def downgrade() -> None:
+    op.drop_index("ix_exams_status", table_name="exams")
@@ -0,0 +1,48 @@
+"""add exam randomization
+
+Revision ID: add_exam_randomization
+Revises: create_question_bank
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "add_exam_randomization"
+down_revision = "create_question_bank"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("exams") as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "shuffle_questions",
+                sa.Boolean(),
+                nullable=False,
+                server_default="false",
+            )
+        )
+        batch_op.add_column(
+            sa.Column(
+                "shuffle_options", sa.Boolean(), nullable=False, server_default="false"
+            )
+        )
+        batch_op.add_column(
+            sa.Column("questions_per_student", sa.Integer(), nullable=True)
+        )
+        batch_op.add_column(
+            sa.Column("paper_seed", sa.Integer(), nullable=False, server_default="0")
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("exams") as batch_op:
+        batch_op.drop_column("paper_seed")
+        batch_op.drop_column("questions_per_student")
+        batch_op.drop_column("shuffle_options")
+        batch_op.drop_column("shuffle_questions")
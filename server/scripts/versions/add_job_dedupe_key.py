@@ -0,0 +1,28 @@
+"""add job dedupe key
+
+Revision ID: add_job_dedupe_key
+Revises: add_change_log_exam
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "add_job_dedupe_key"
+down_revision = "add_change_log_exam"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("dedupe_key", sa.String(), nullable=True))
+    op.create_index("ix_jobs_dedupe_key", "jobs", ["dedupe_key"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_dedupe_key", table_name="jobs")
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.drop_column("dedupe_key")
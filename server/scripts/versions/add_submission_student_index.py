@@ -0,0 +1,28 @@
+"""add submission student index
+
+Revision ID: add_submission_student_index
+Revises: create_submission_shards
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "add_submission_student_index"
+down_revision = "create_submission_shards"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_exam_submissions_student_exam",
+        "exam_submissions",
+        ["student_id", "exam_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_exam_submissions_student_exam", table_name="exam_submissions")
@@ -0,0 +1,66 @@
+"""create archived submissions
+
+Revision ID: create_archived_submissions
+Revises: add_exam_randomization
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "create_archived_submissions"
+down_revision = "add_exam_randomization"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        # Archived submissions keep their ids, so ids must never be reused
+        with op.batch_alter_table(
+            "exam_submissions",
+            recreate="always",
+            table_kwargs={"sqlite_autoincrement": True},
+        ):
+            pass
+
+    op.create_table(
+        "archived_submissions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("exam_id", sa.Integer(), nullable=False),
+        sa.Column("student_id", sa.Integer(), nullable=False),
+        sa.Column("submission_time", sa.DateTime(), nullable=True),
+        sa.Column("total_marks", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("is_submitted", sa.Boolean(), nullable=False, server_default="true"),
+        sa.Column("term", sa.String(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=True),
+        sa.Column("answers", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["exam_id"],
+            ["exams.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["student_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_archived_submissions_exam_id", "archived_submissions", ["exam_id"]
+    )
+    op.create_index(
+        "ix_archived_submissions_student_id", "archived_submissions", ["student_id"]
+    )
+    op.create_index("ix_archived_submissions_term", "archived_submissions", ["term"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_archived_submissions_term", table_name="archived_submissions")
+    op.drop_index(
+        "ix_archived_submissions_student_id", table_name="archived_submissions"
+    )
+    op.drop_index("ix_archived_submissions_exam_id", table_name="archived_submissions")
+    op.drop_table("archived_submissions")
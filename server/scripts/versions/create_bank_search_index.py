@@ -0,0 +1,51 @@
+"""create bank search index
+
+Revision ID: create_bank_search_index
+Revises: create_change_log
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "create_bank_search_index"
+down_revision = "create_change_log"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_questions_bank_search ON questions "
+            "USING GIN ((to_tsvector('simple', coalesce(question_text, '') || ' ' "
+            "|| coalesce(tags, '')))) WHERE exam_id IS NULL"
+        )
+    elif dialect == "sqlite":
+        try:
+            op.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS question_bank_fts "
+                "USING fts5(question_text, tags, tokenize='unicode61')"
+            )
+        except sa.exc.OperationalError:
+            # SQLite compiled without FTS5: searches use the inverted index
+            return
+        # Bank questions added before this revision, or without the table
+        op.execute(
+            "INSERT INTO question_bank_fts (rowid, question_text, tags) "
+            "SELECT id, question_text, coalesce(tags, '') FROM questions "
+            "WHERE exam_id IS NULL "
+            "AND id NOT IN (SELECT rowid FROM question_bank_fts)"
+        )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_questions_bank_search")
+    elif dialect == "sqlite":
+        op.execute("DROP TABLE IF EXISTS question_bank_fts")
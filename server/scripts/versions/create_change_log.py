@@ -0,0 +1,40 @@
+"""create change log
+
+Revision ID: create_change_log
+Revises: add_exam_lifecycle
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "create_change_log"
+down_revision = "add_exam_lifecycle"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "change_log",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("entity", sa.String(), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("op", sa.String(), nullable=False),
+        sa.Column("data", sa.Text(), nullable=True),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("changed_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sqlite_autoincrement=True,
+    )
+    op.create_index("ix_change_log_user_id", "change_log", ["user_id"])
+    op.create_index("ix_change_log_changed_at", "change_log", ["changed_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_change_log_changed_at", table_name="change_log")
+    op.drop_index("ix_change_log_user_id", table_name="change_log")
+    op.drop_table("change_log")
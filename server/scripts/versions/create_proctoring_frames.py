@@ -0,0 +1,77 @@
+"""create proctoring frames
+
+Revision ID: create_proctoring_frames
+Revises: create_archived_submissions
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "create_proctoring_frames"
+down_revision = "create_archived_submissions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "proctoring_blobs",
+        sa.Column("digest", sa.String(length=64), nullable=False),
+        sa.Column("content_type", sa.String(), nullable=False),
+        sa.Column("segment", sa.String(), nullable=False),
+        sa.Column("offset", sa.BigInteger(), nullable=False),
+        sa.Column("length", sa.Integer(), nullable=False),
+        sa.Column("thumb_segment", sa.String(), nullable=True),
+        sa.Column("thumb_offset", sa.BigInteger(), nullable=True),
+        sa.Column("thumb_length", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("digest"),
+    )
+    op.create_index("ix_proctoring_blobs_segment", "proctoring_blobs", ["segment"])
+    op.create_index(
+        "ix_proctoring_blobs_thumb_segment", "proctoring_blobs", ["thumb_segment"]
+    )
+    op.create_table(
+        "proctoring_frames",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("exam_id", sa.Integer(), nullable=False),
+        sa.Column("student_id", sa.Integer(), nullable=False),
+        sa.Column("captured_at", sa.DateTime(), nullable=False),
+        sa.Column("digest", sa.String(length=64), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["exam_id"],
+            ["exams.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["student_id"],
+            ["users.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["digest"],
+            ["proctoring_blobs.digest"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_proctoring_frames_exam_student_time",
+        "proctoring_frames",
+        ["exam_id", "student_id", "captured_at"],
+    )
+    op.create_index(
+        "ix_proctoring_frames_captured_at", "proctoring_frames", ["captured_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_proctoring_frames_captured_at", table_name="proctoring_frames")
+    op.drop_index(
+        "ix_proctoring_frames_exam_student_time", table_name="proctoring_frames"
+    )
+    op.drop_table("proctoring_frames")
+    op.drop_index("ix_proctoring_blobs_thumb_segment", table_name="proctoring_blobs")
+    op.drop_index("ix_proctoring_blobs_segment", table_name="proctoring_blobs")
+    op.drop_table("proctoring_blobs")
@@ -0,0 +1,61 @@
+"""create question bank
+
+Revision ID: create_question_bank
+Revises: create_jobs_table
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "create_question_bank"
+down_revision = "create_jobs_table"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Bank questions live in questions with exam_id NULL
+    with op.batch_alter_table("questions") as batch_op:
+        batch_op.alter_column("exam_id", existing_type=sa.Integer(), nullable=True)
+        batch_op.add_column(sa.Column("faculty_id", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("tags", sa.Text(), nullable=True))
+        batch_op.create_foreign_key(
+            "fk_questions_faculty_id_users", "users", ["faculty_id"], ["id"]
+        )
+
+    op.create_table(
+        "exam_bank_questions",
+        sa.Column("exam_id", sa.Integer(), nullable=False),
+        sa.Column("question_id", sa.Integer(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["exam_id"],
+            ["exams.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["question_id"],
+            ["questions.id"],
+        ),
+        sa.PrimaryKeyConstraint("exam_id", "question_id"),
+    )
+    op.create_index(
+        "ix_exam_bank_questions_question_id", "exam_bank_questions", ["question_id"]
+    )
+
+    # The search index (FTS5 table or GIN index) is created by
+    # create_bank_search_index
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_exam_bank_questions_question_id", table_name="exam_bank_questions"
+    )
+    op.drop_table("exam_bank_questions")
+    with op.batch_alter_table("questions") as batch_op:
+        batch_op.drop_constraint("fk_questions_faculty_id_users", type_="foreignkey")
+        batch_op.drop_column("tags")
+        batch_op.drop_column("faculty_id")
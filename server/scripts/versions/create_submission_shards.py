@@ -0,0 +1,43 @@
+"""create submission shards
+
+Revision ID: create_submission_shards
+Revises: create_idempotency_keys
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "create_submission_shards"
+down_revision = "create_idempotency_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "submission_shards",
+        sa.Column("exam_id", sa.Integer(), nullable=False),
+        sa.Column("shard", sa.Integer(), nullable=False),
+        sa.Column("assigned_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["exam_id"], ["exams.id"]),
+        sa.PrimaryKeyConstraint("exam_id"),
+    )
+    op.create_index(
+        "ix_submission_shards_shard", "submission_shards", ["shard"]
+    )
+    op.create_table(
+        "submission_id_blocks",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("next_id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("submission_id_blocks")
+    op.drop_index("ix_submission_shards_shard", table_name="submission_shards")
+    op.drop_table("submission_shards")
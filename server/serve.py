@@ -0,0 +1,170 @@
+"""Production server: gunicorn managing uvicorn workers.
+
+    python serve.py
+
+The app is imported and warmed up once in the master (mappers configured,
+OpenAPI schema, password hashing and JWT backends loaded, leaderboards
+built, papers of upcoming exams serialized and compressed), then forked
+into ``WEB_CONCURRENCY`` workers, one per available core by default.
+Workers are recycled after ``MAX_REQUESTS`` requests (with jitter) or once
+their memory passes ``WORKER_MAX_MEMORY_MB``, and on SIGTERM or SIGHUP they
+stop accepting connections and finish in-flight requests within
+``GRACEFUL_TIMEOUT`` seconds.
+"""
+
+import logging
+import os
+import signal
+import threading
+import time
+
+from gunicorn.app.base import BaseApplication
+
+from app.config import settings
+
+logger = logging.getLogger("gunicorn.error")
+
+MEMORY_CHECK_SECONDS = 10
+
+
+def worker_class() -> str:
+    try:
+        import uvicorn_worker  # noqa: F401
+
+        return "uvicorn_worker.UvicornWorker"
+    except ImportError:
+        return "uvicorn.workers.UvicornWorker"
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def rss_mb() -> float:
+    """Resident memory of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+
+        # Peak rather than current on platforms without /proc (KiB on Linux,
+        # bytes on macOS), still good enough to catch a worker that grew
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if peak > 2**32 else peak / 2**10
+
+
+def warm_up(app):
+    """Do in the master what every worker would otherwise do on its first request."""
+    from jose import jwt
+    from sqlalchemy.orm import configure_mappers
+
+    from app.auth.auth import pwd_context
+    from app.bank import search
+    from app.database.db import Base, SessionLocal, engine, replicas, shard_engines
+    from app.exams import payloads, shards
+    from app.exams.leaderboard import leaderboards
+    from app.jobs.runner import runner as job_runner
+
+    configure_mappers()
+    app.openapi()
+    pwd_context.verify("warm-up", pwd_context.hash("warm-up"))
+    token = jwt.encode({"sub": "warm-up"}, settings.SECRET_KEY, settings.ALGORITHM)
+    jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+    if settings.DB_CREATE_ALL:
+        Base.metadata.create_all(bind=engine)
+        search.create_index(engine)
+        shards.create_tables()
+    # Jobs left running belong to the previous server: fail them once here
+    # rather than in each worker, which would hit jobs of its live siblings
+    db = SessionLocal()
+    try:
+        job_runner.fail_running(db)
+        # Papers about to be downloaded by every student, compressed once
+        # here and shared with the workers
+        payloads.warm(db)
+    finally:
+        db.close()
+    job_runner.fail_interrupted = False
+    leaderboards.rebuild()
+
+    # Workers must not share the master's connections
+    engine.dispose()
+    for other in replicas.engines + shard_engines:
+        other.dispose()
+
+
+def post_fork(server, worker):
+    from app.database.db import engine, replicas, shard_engines
+
+    engine.dispose(close=False)
+    for other in replicas.engines + shard_engines:
+        other.dispose(close=False)
+
+
+def post_worker_init(worker):
+    if settings.WORKER_MAX_MEMORY_MB <= 0:
+        return
+
+    def watch():
+        while True:
+            time.sleep(MEMORY_CHECK_SECONDS)
+            used = rss_mb()
+            if used > settings.WORKER_MAX_MEMORY_MB:
+                logger.info(
+                    "Worker %s uses %.0f MB (limit %s MB), recycling",
+                    worker.pid,
+                    used,
+                    settings.WORKER_MAX_MEMORY_MB,
+                )
+                # Graceful shutdown, the master starts a replacement
+                os.kill(worker.pid, signal.SIGTERM)
+                return
+
+    threading.Thread(target=watch, name="memory-watch", daemon=True).start()
+
+
+class Server(BaseApplication):
+    def __init__(self, app, options: dict):
+        self.application = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def options() -> dict:
+    return {
+        "bind": settings.BIND,
+        "workers": settings.WEB_CONCURRENCY or available_cores(),
+        "worker_class": worker_class(),
+        "preload_app": True,
+        "timeout": settings.WORKER_TIMEOUT,
+        "graceful_timeout": settings.GRACEFUL_TIMEOUT,
+        "keepalive": settings.KEEPALIVE_SECONDS,
+        "max_requests": settings.MAX_REQUESTS,
+        "max_requests_jitter": settings.MAX_REQUESTS_JITTER,
+        "post_fork": post_fork,
+        "post_worker_init": post_worker_init,
+    }
+
+
+def main():
+    from main import app
+
+    warm_up(app)
+    Server(app, options()).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Shared fixtures.
+
+Settings are read once, on import, so the databases are chosen here before
+anything under app/ is imported: a fresh SQLite primary and two submission
+shards per run. Every test therefore goes through shard routing, and exams
+land on shard 1 or 2 (``1 + exam_id % 2``).
+"""
+
+import itertools
+import json
+import os
+import tempfile
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+TMP = tempfile.mkdtemp(prefix="exam-tests-")
+os.environ.update(
+    {
+        "DATABASE_URL": f"sqlite:///{TMP}/primary.db",
+        "SUBMISSION_SHARD_URLS": json.dumps(
+            [f"sqlite:///{TMP}/shard1.db", f"sqlite:///{TMP}/shard2.db"]
+        ),
+        "REPORTS_DIR": f"{TMP}/reports",
+        "REPORT_SNAPSHOT_INTERVAL_MINUTES": "0",
+        "PROCTORING_DIR": f"{TMP}/proctoring",
+        "PROCTORING_COMPACT_INTERVAL_MINUTES": "0",
+        "CHANGE_FEED_LAG_SECONDS": "0",
+    }
+)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database.db import SessionLocal  # noqa: E402
+from main import app  # noqa: E402
+
+_ids = itertools.count(1)
+
+
+def utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def bearer(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def faculty(client):
+    """Sign up a new faculty member: their auth headers."""
+
+    def signup():
+        email = f"faculty{next(_ids)}@exam.io"
+        client.post(
+            "/api/faculty/signup",
+            json={"email": email, "name": "Faculty", "password": "secret"},
+        )
+        tokens = client.post(
+            "/api/faculty/login", data={"username": email, "password": "secret"}
+        ).json()
+        return bearer(tokens)
+
+    return signup
+
+
+@pytest.fixture
+def student(client):
+    """Register a new student: their id, roll number and tokens."""
+
+    def register():
+        roll_number = f"R{next(_ids)}"
+        user = client.post(
+            "/api/users/register",
+            json={
+                "roll_number": roll_number,
+                "name": "Student",
+                "email": f"{roll_number.lower()}@exam.io",
+                "password": "secret",
+                "branch": "CSE",
+                "semester": 1,
+            },
+        ).json()
+        tokens = client.post(
+            "/api/auth/token", data={"username": roll_number, "password": "secret"}
+        ).json()
+        return {"id": user["id"], "roll_number": roll_number, "tokens": tokens}
+
+    return register
+
+
+@pytest.fixture
+def exam(client):
+    """Create an exam as ``headers``, live by default: the created exam."""
+
+    def create(headers, questions=3, start=None, end=None, **options):
+        now = utcnow()
+        body = {
+            "title": "Exam",
+            "description": "Test exam",
+            "start_time": (start or now - timedelta(hours=1)).isoformat(),
+            "end_time": (end or now + timedelta(hours=1)).isoformat(),
+            "duration_minutes": 60,
+            "questions": [
+                {
+                    "question_text": f"Question {i}",
+                    "marks": 2,
+                    "options": ["a", "b", "c"],
+                    "correct_answer": "a",
+                }
+                for i in range(questions)
+            ],
+            **options,
+        }
+        response = client.post("/api/exams", headers=headers, json=body)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return create
+
+
+@pytest.fixture
+def submit(client):
+    """Submit one answer as ``student``: the response."""
+
+    def post(student, exam, answer="a", question=0):
+        question_id = exam["questions"][question]["id"]
+        return client.post(
+            f"/api/exams/{exam['id']}/submit",
+            headers=bearer(student["tokens"]),
+            json={
+                "exam_id": exam["id"],
+                "answers": {"question_id": question_id, "answer": answer},
+            },
+        )
+
+    return post
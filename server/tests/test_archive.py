@@ -0,0 +1,96 @@
+import time
+
+from app.exams import archive, models, shards
+
+
+def archived_exam(client, db, faculty, student, exam, submit):
+    """An exam answered right by one student and wrong by another, archived."""
+    headers = faculty()
+    created = exam(headers)
+    right, wrong = student(), student()
+    assert submit(right, created, answer="a").status_code == 200
+    assert submit(wrong, created, answer="b").status_code == 200
+    assert archive.archive_exam(db, db.get(models.Exam, created["id"])) == 2
+    return headers, created, right, wrong
+
+
+def wait_for_job(client, headers, job):
+    for _ in range(200):
+        job = client.get(f"/api/jobs/{job['id']}", headers=headers).json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.05)
+    return job
+
+
+def test_archived_submissions_leave_the_shard(client, db, faculty, student, exam, submit):
+    _, created, _, _ = archived_exam(client, db, faculty, student, exam, submit)
+    with shards.submission_db(db, created["id"]) as live:
+        assert (
+            live.query(models.ExamSubmission)
+            .filter(models.ExamSubmission.exam_id == created["id"])
+            .count()
+            == 0
+        )
+    archived = db.query(models.ArchivedSubmission).filter(
+        models.ArchivedSubmission.exam_id == created["id"]
+    )
+    assert sorted(row.total_marks for row in archived) == [0, 2]
+
+
+def test_results_read_through_the_archive(client, db, faculty, student, exam, submit):
+    headers, created, right, wrong = archived_exam(
+        client, db, faculty, student, exam, submit
+    )
+    results = client.get("/api/exams/results", headers=headers).json()
+    (result,) = [r for r in results if r["id"] == created["id"]]
+    marks = {s["student_id"]: s["total_marks"] for s in result["submissions"]}
+    assert marks == {right["id"]: 2, wrong["id"]: 0}
+
+    submissions = client.get(
+        f"/api/exams/{created['id']}/submissions", headers=headers
+    ).json()
+    assert len(submissions) == 2
+    for submission in submissions:
+        details = client.get(
+            f"/api/exams/{created['id']}/submissions/{submission['id']}",
+            headers=headers,
+        ).json()
+        (answer,) = details["answers"]
+        assert answer["question_id"] == created["questions"][0]["id"]
+        assert answer["marks_obtained"] == submission["total_marks"]
+
+
+def test_archived_students_cannot_submit_again(client, db, faculty, student, exam, submit):
+    _, created, right, _ = archived_exam(client, db, faculty, student, exam, submit)
+    response = submit(right, created)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Exam already submitted"
+
+
+def test_regrade_reaches_archived_answers(client, db, faculty, student, exam, submit):
+    headers, created, right, wrong = archived_exam(
+        client, db, faculty, student, exam, submit
+    )
+    # One live submission besides the archived ones
+    late = student()
+    assert submit(late, created, answer="b").status_code == 200
+    question = db.get(models.Question, created["questions"][0]["id"])
+    question.correct_answer = "b"
+    db.commit()
+
+    job = client.post(f"/api/exams/{created['id']}/regrade", headers=headers).json()
+    job = wait_for_job(client, headers, job)
+    assert job["status"] == "succeeded"
+    assert job["progress"] == job["total"] == 3
+
+    results = client.get("/api/exams/results", headers=headers).json()
+    (result,) = [r for r in results if r["id"] == created["id"]]
+    marks = {s["student_id"]: s["total_marks"] for s in result["submissions"]}
+    assert marks == {right["id"]: 0, wrong["id"]: 2, late["id"]: 2}
+    rank = client.get(
+        f"/api/exams/{created['id']}/rank",
+        headers=headers,
+        params={"student_id": wrong["id"]},
+    ).json()
+    assert (rank["total_marks"], rank["rank"]) == (2, 1)
@@ -0,0 +1,80 @@
+def bank_question(text, tags=()):
+    return {
+        "question_text": text,
+        "marks": 1,
+        "options": ["yes", "no"],
+        "correct_answer": "yes",
+        "tags": list(tags),
+    }
+
+
+def add(client, headers, questions):
+    response = client.post("/api/bank/questions", headers=headers, json=questions)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_bulk_insert_keeps_request_order(client, faculty):
+    texts = [f"Ordering question {i}" for i in (3, 1, 4, 1, 5, 9, 2, 6)]
+    added = add(client, faculty(), [bank_question(text) for text in texts])
+    assert [q["question_text"] for q in added] == texts
+    ids = [q["id"] for q in added]
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+
+
+def test_ids_match_their_questions(client, faculty):
+    headers = faculty()
+    added = add(
+        client,
+        headers,
+        [bank_question(f"Paired question {i}", [f"tag{i}"]) for i in range(5)],
+    )
+    for question in added:
+        fetched = client.get(f"/api/bank/questions/{question['id']}", headers=headers)
+        assert fetched.json() == question
+        number = question["question_text"].rsplit(" ", 1)[1]
+        assert question["tags"] == [f"tag{number}"]
+
+
+def test_search_by_text_and_tags(client, faculty):
+    headers = faculty()
+    added = add(
+        client,
+        headers,
+        [
+            bank_question("Photosynthesis happens in chloroplasts", ["biology"]),
+            bank_question("Mitochondria make energy", ["biology", "cells"]),
+            bank_question("Newton's second law", ["physics"]),
+        ],
+    )
+    found = client.get(
+        "/api/bank/questions/search", headers=headers, params={"q": "chloroplasts"}
+    ).json()
+    assert [q["id"] for q in found["results"]] == [added[0]["id"]]
+    tagged = client.get(
+        "/api/bank/questions/search",
+        headers=headers,
+        params={"tags": ["biology", "cells"]},
+    ).json()
+    assert [q["id"] for q in tagged["results"]] == [added[1]["id"]]
+
+
+def test_attached_questions_keep_their_order(client, faculty, exam):
+    headers = faculty()
+    created = exam(headers, questions=1)
+    added = add(client, headers, [bank_question(f"Attached {i}") for i in range(4)])
+    first, second = [added[2]["id"], added[0]["id"]], [added[3]["id"], added[2]["id"]]
+    url = f"/api/bank/exams/{created['id']}/questions"
+
+    client.post(url, headers=headers, json={"question_ids": first})
+    paper = client.post(url, headers=headers, json={"question_ids": second}).json()
+    bank_ids = [q["id"] for q in paper["questions"] if q["exam_id"] is None]
+    assert bank_ids == [added[2]["id"], added[0]["id"], added[3]["id"]]
+
+    missing = client.post(url, headers=headers, json={"question_ids": [10**9]})
+    assert missing.status_code == 400
+    paper = client.delete(f"{url}/{added[0]['id']}", headers=headers).json()
+    assert [q["id"] for q in paper["questions"] if q["exam_id"] is None] == [
+        added[2]["id"],
+        added[3]["id"],
+    ]
@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+from app.changes import log
+from app.exams import shards
+
+from conftest import bearer, utcnow
+
+
+def changes(client, headers, since):
+    response = client.get("/api/changes", headers=headers, params={"since": since})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def cursor(client, headers):
+    return client.get("/api/changes", headers=headers).json()["cursor"]
+
+
+def test_cursor_has_a_position_per_database(client, faculty):
+    positions = cursor(client, faculty()).split(".")
+    assert len(positions) == shards.count() == 3
+
+
+def test_changes_follow_the_cursor_across_shards(client, faculty, student, exam, submit):
+    headers = faculty()
+    me = student()
+    since = cursor(client, headers)
+    created = exam(headers)
+    assert submit(me, created).status_code == 200
+
+    feed = changes(client, headers, since)
+    seen = {(change["entity"], change["entity_id"]) for change in feed["changes"]}
+    assert ("exam", created["id"]) in seen
+    assert {("question", question["id"]) for question in created["questions"]} <= seen
+    assert any(entity == "submission" for entity, _ in seen)
+    # The submission came from the exam's shard, so its position moved
+    before, after = since.split("."), feed["cursor"].split(".")
+    shard = 1 + created["id"] % (shards.count() - 1)
+    assert int(after[shard]) > int(before[shard])
+    assert int(after[0]) > int(before[0])
+
+    assert changes(client, headers, feed["cursor"])["changes"] == []
+
+
+def test_changes_page_with_has_more(client, faculty, exam):
+    headers = faculty()
+    since = cursor(client, headers)
+    exam(headers, questions=4)
+
+    first = changes(client, headers, since)
+    page = client.get(
+        "/api/changes", headers=headers, params={"since": since, "limit": 2}
+    ).json()
+    assert len(page["changes"]) == 2 and page["has_more"]
+    rest = changes(client, headers, page["cursor"])
+    assert page["changes"] + rest["changes"] == first["changes"]
+
+
+def test_a_shorter_cursor_reads_new_shards_from_the_start(client, faculty):
+    headers = faculty()
+    assert changes(client, headers, "0")["cursor"].count(".") == 2
+
+
+def test_invalid_cursor(client, faculty):
+    headers = faculty()
+    for since in ("x", "1.-2", "1..2"):
+        response = client.get("/api/changes", headers=headers, params={"since": since})
+        assert response.status_code == 400
+
+
+def test_faculty_see_only_their_exams(client, faculty, student, exam, submit):
+    mine, theirs = faculty(), faculty()
+    me = student()
+    since = cursor(client, mine)
+    other = exam(theirs)
+    submit(me, other)
+
+    entities = {change["entity"] for change in changes(client, mine, since)["changes"]}
+    assert entities <= {"user"}
+
+
+def test_students_see_exams_and_their_own_rows(client, faculty, student, exam, submit):
+    headers = faculty()
+    me, other = student(), student()
+    since = cursor(client, bearer(me["tokens"]))
+    created = exam(headers)
+    submit(me, created)
+    submit(other, created)
+
+    feed = changes(client, bearer(me["tokens"]), since)["changes"]
+    assert {change["entity"] for change in feed} == {"exam", "submission"}
+    # Updates carry only the changed columns, the insert names the student
+    inserts = [
+        change
+        for change in feed
+        if change["entity"] == "submission" and change["op"] == "insert"
+    ]
+    assert [change["data"]["student_id"] for change in inserts] == [me["id"]]
+    assert len({c["entity_id"] for c in feed if c["entity"] == "submission"}) == 1
+
+
+def test_expired_cursor_is_gone(client, db, faculty, exam):
+    headers = faculty()
+    since = cursor(client, headers)
+    exam(headers)
+    later = cursor(client, headers)
+
+    # Purge everything: the cursors older than the log are told apart
+    for source in shards.submission_dbs(db):
+        log.purge(source, utcnow() + timedelta(minutes=1))
+    for stale in (since, "0.0.0"):
+        response = client.get("/api/changes", headers=headers, params={"since": stale})
+        assert response.status_code == 410
+    assert changes(client, headers, later)["changes"] == []
+    assert changes(client, headers, cursor(client, headers))["changes"] == []
@@ -0,0 +1,26 @@
+import argparse
+from datetime import timedelta
+
+import cli
+from app.changes import log
+from app.changes.models import Change
+from app.config import settings
+
+from conftest import utcnow
+
+
+def test_purge_changes_deletes_entries_past_retention(client, db, capsys):
+    old = utcnow() - timedelta(days=settings.CHANGE_LOG_RETENTION_DAYS + 1)
+    expired = Change(entity="exam", entity_id=1, op="delete", changed_at=old)
+    recent = Change(entity="exam", entity_id=2, op="delete", changed_at=utcnow())
+    db.add_all([expired, recent])
+    db.commit()
+
+    cli.purge_changes(argparse.Namespace())
+
+    db.expire_all()
+    # The newest purged entry stays behind, emptied, to expire older cursors
+    assert db.get(Change, expired.id).op == log.PURGED
+    assert db.query(Change).filter(Change.id < expired.id).count() == 0
+    assert db.get(Change, recent.id).op == "delete"
+    assert "change log entries on shard 0" in capsys.readouterr().out
@@ -0,0 +1,112 @@
+import hashlib
+import json
+
+from app.config import settings
+from app.exams import models
+from app.idempotency import store
+from app.idempotency.middleware import subject
+
+from conftest import bearer
+
+
+def exam_body(title="Exam"):
+    return {
+        "title": title,
+        "description": "Test exam",
+        "start_time": "2030-01-01T00:00:00",
+        "end_time": "2030-01-01T01:00:00",
+        "duration_minutes": 60,
+        "questions": [
+            {
+                "question_text": "Question",
+                "marks": 2,
+                "options": ["a", "b"],
+                "correct_answer": "a",
+            }
+        ],
+    }
+
+
+def test_retried_exam_creation_is_replayed(client, db, faculty):
+    headers = faculty() | {"Idempotency-Key": "create-1"}
+    first = client.post("/api/exams", headers=headers, json=exam_body())
+    again = client.post("/api/exams", headers=headers, json=exam_body())
+    assert first.status_code == again.status_code == 200
+    assert again.json() == first.json()
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    created = db.query(models.Exam).filter(
+        models.Exam.faculty_id == first.json()["faculty_id"]
+    )
+    assert created.count() == 1
+
+
+def test_reusing_a_key_for_another_request(client, faculty):
+    headers = faculty() | {"Idempotency-Key": "create-2"}
+    client.post("/api/exams", headers=headers, json=exam_body())
+    response = client.post("/api/exams", headers=headers, json=exam_body("Other"))
+    assert response.status_code == 422
+
+
+def test_replayed_submission(client, faculty, student, exam, submit):
+    created = exam(faculty())
+    me = student()
+    headers = bearer(me["tokens"]) | {"Idempotency-Key": "submit-1"}
+    body = {
+        "exam_id": created["id"],
+        "answers": {"question_id": created["questions"][0]["id"], "answer": "a"},
+    }
+    url = f"/api/exams/{created['id']}/submit"
+    first = client.post(url, headers=headers, json=body)
+    again = client.post(url, headers=headers, json=body)
+    assert first.status_code == again.status_code == 200
+    assert again.json() == first.json()
+    # Without the key the duplicate reaches the endpoint
+    assert submit(me, created).status_code == 400
+
+
+def test_keys_are_scoped_to_their_user(client, faculty):
+    mine = client.post(
+        "/api/exams", headers=faculty() | {"Idempotency-Key": "same"}, json=exam_body()
+    )
+    theirs = client.post(
+        "/api/exams", headers=faculty() | {"Idempotency-Key": "same"}, json=exam_body()
+    )
+    assert mine.status_code == theirs.status_code == 200
+    assert mine.json()["id"] != theirs.json()["id"]
+
+
+def test_client_errors_are_replayed(client, faculty):
+    headers = faculty() | {"Idempotency-Key": "missing"}
+    first = client.post("/api/exams/999999/submit", headers=headers, json={})
+    again = client.post("/api/exams/999999/submit", headers=headers, json={})
+    assert 400 <= first.status_code < 500
+    assert again.status_code == first.status_code
+    assert again.headers["Idempotent-Replayed"] == "true"
+
+
+def test_duplicate_of_a_running_request_gets_409(client, faculty, monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 0)
+    headers = faculty()
+    body = json.dumps(exam_body()).encode()
+    digest = hashlib.sha256()
+    for part in (b"POST", b"/api/exams", b"", body):
+        digest.update(part + b"\0")
+    # Claimed by the same request, still running in another worker
+    owner = subject(headers["Authorization"])
+    assert store.claim(owner, "running", digest.hexdigest())[0] == store.NEW
+
+    response = client.post(
+        "/api/exams",
+        headers=headers
+        | {"Idempotency-Key": "running", "Content-Type": "application/json"},
+        content=body,
+    )
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_overlong_key(client, faculty):
+    headers = faculty() | {"Idempotency-Key": "k" * 256}
+    response = client.post("/api/exams", headers=headers, json=exam_body())
+    assert response.status_code == 400
@@ -0,0 +1,75 @@
+from app.exams.leaderboard import ExamRanking
+
+from conftest import bearer
+
+SCORES = {1: 10, 2: 8, 3: 8, 4: 5}
+
+
+def test_ties_share_a_rank():
+    ranking = ExamRanking(SCORES)
+    assert [ranking.rank(score) for score in (10, 8, 5)] == [1, 2, 4]
+    assert ranking.top(10) == [(1, 1, 10), (2, 2, 8), (2, 3, 8), (4, 4, 5)]
+    assert ranking.top(2) == [(1, 1, 10), (2, 2, 8)]
+
+
+def test_percentile_counts_ties_as_half():
+    ranking = ExamRanking(SCORES)
+    assert ranking.percentile(10) == 100.0
+    assert ranking.percentile(8) == 50.0
+    assert ranking.percentile(5) == 0.0
+    assert ExamRanking({1: 3}).percentile(3) == 100.0
+
+
+def test_cutoff():
+    ranking = ExamRanking(SCORES)
+    assert ranking.cutoff(100) == 10
+    assert ranking.cutoff(50) == 8
+    assert ranking.cutoff(0) == 5
+    assert ExamRanking({}).cutoff(50) is None
+
+
+def test_record_moves_a_student():
+    ranking = ExamRanking(SCORES)
+    keys = ranking.keys
+    ranking.record(4, 9)
+    ranking.record(5, 1)
+    assert ranking.top(10) == [(1, 1, 10), (2, 4, 9), (3, 2, 8), (3, 3, 8), (5, 5, 1)]
+    # Readers holding the old list are not disturbed
+    assert len(keys) == 4
+
+
+def test_leaderboard_endpoints(client, faculty, student, exam, submit):
+    headers = faculty()
+    created = exam(headers)
+    first, second, third = student(), student(), student()
+    for who, answer in ((first, "a"), (second, "a"), (third, "b")):
+        assert submit(who, created, answer=answer).status_code == 200
+    url = f"/api/exams/{created['id']}"
+
+    board = client.get(f"{url}/leaderboard", headers=headers).json()
+    assert board["participants"] == 3
+    assert [(e["rank"], e["total_marks"]) for e in board["entries"]] == [
+        (1, 2),
+        (1, 2),
+        (3, 0),
+    ]
+    assert board["entries"][2]["student_id"] == third["id"]
+
+    rank = client.get(
+        f"{url}/rank", headers=headers, params={"student_id": second["id"]}
+    ).json()
+    assert (rank["rank"], rank["percentile"]) == (1, 75.0)
+    cutoff = client.get(
+        f"{url}/percentile", headers=headers, params={"percentile": 50}
+    ).json()
+    assert cutoff["total_marks"] == 2
+
+    # Students wait for the end of the exam, and see only their own rank
+    assert client.get(f"{url}/rank", headers=bearer(third["tokens"])).status_code == 400
+    other = client.get(
+        f"{url}/rank",
+        headers=bearer(third["tokens"]),
+        params={"student_id": first["id"]},
+    )
+    assert other.status_code == 403
+    assert client.get(f"{url}/leaderboard", headers=faculty()).status_code == 404
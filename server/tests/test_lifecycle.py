@@ -0,0 +1,127 @@
+import json
+import time
+from datetime import timedelta
+
+from app.config import settings
+from app.exams import lifecycle, models
+from app.jobs.models import Job
+from app.jobs.runner import runner
+
+from conftest import utcnow
+
+
+def status(db, exam_id):
+    db.expire_all()
+    return db.get(models.Exam, exam_id).status
+
+
+def wait_for(db, exam_id, expected, seconds=10):
+    deadline = time.monotonic() + seconds
+    while status(db, exam_id) != expected and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return status(db, exam_id)
+
+
+def finalize_jobs(db, exam_id, *statuses):
+    db.expire_all()
+    query = db.query(Job).filter(
+        Job.kind == "finalize_exam", Job.params == json.dumps({"exam_id": exam_id})
+    )
+    if statuses:
+        query = query.filter(Job.status.in_(statuses))
+    return query.all()
+
+
+def test_exam_moves_through_its_statuses(db, faculty, student, exam, submit):
+    headers, me = faculty(), student()
+    now = utcnow()
+    created = exam(
+        headers, start=now + timedelta(seconds=1), end=now + timedelta(seconds=2)
+    )
+    assert created["status"] == models.SCHEDULED
+    assert wait_for(db, created["id"], models.LIVE) == models.LIVE
+    assert submit(me, created).status_code == 200
+    assert wait_for(db, created["id"], models.GRADED) == models.GRADED
+    assert len(finalize_jobs(db, created["id"])) == 1
+
+
+def test_exams_created_in_the_past_are_graded(db, faculty, exam):
+    now = utcnow()
+    created = exam(
+        faculty(), start=now - timedelta(hours=2), end=now - timedelta(hours=1)
+    )
+    assert created["status"] == models.CLOSED
+    assert wait_for(db, created["id"], models.GRADED) == models.GRADED
+
+
+def add_failures(db, exam_id, count, finished_at):
+    db.add_all(
+        Job(
+            kind="finalize_exam",
+            status="failed",
+            params=json.dumps({"exam_id": exam_id}),
+            finished_at=finished_at,
+        )
+        for _ in range(count)
+    )
+    db.commit()
+
+
+def test_failed_finalizations_back_off(db, monkeypatch):
+    monkeypatch.setattr(settings, "FINALIZE_RETRY_SECONDS", 60)
+    exam_id = 1_000_001
+    add_failures(db, exam_id, 2, utcnow() - timedelta(seconds=90))
+
+    # Two failures: the next try waits 120 seconds after the last one
+    lifecycle._finalize(db, [exam_id])
+    assert finalize_jobs(db, exam_id, "queued", "running", "succeeded") == []
+
+    db.query(Job).filter(Job.params == json.dumps({"exam_id": exam_id})).update(
+        {"finished_at": utcnow() - timedelta(seconds=150)}
+    )
+    db.commit()
+    lifecycle._finalize(db, [exam_id])
+    assert len(finalize_jobs(db, exam_id)) == 3
+
+
+def test_finalization_gives_up_after_max_attempts(db):
+    exam_id = 1_000_002
+    add_failures(
+        db,
+        exam_id,
+        settings.FINALIZE_MAX_ATTEMPTS,
+        utcnow() - timedelta(days=365),
+    )
+    lifecycle._finalize(db, [exam_id])
+    assert len(finalize_jobs(db, exam_id)) == settings.FINALIZE_MAX_ATTEMPTS
+
+
+def test_one_finalization_pending_per_exam(db):
+    exam_id = 1_000_003
+    pending = Job(
+        kind="finalize_exam",
+        status="running",
+        params=json.dumps({"exam_id": exam_id}),
+        dedupe_key=f"finalize_exam:{exam_id}",
+    )
+    db.add(pending)
+    db.commit()
+
+    # As another process would, racing this one
+    assert (
+        runner.enqueue(
+            db,
+            "finalize_exam",
+            {"exam_id": exam_id},
+            None,
+            dedupe_key=f"finalize_exam:{exam_id}",
+        )
+        is None
+    )
+    lifecycle._finalize(db, [exam_id, exam_id])
+    assert finalize_jobs(db, exam_id) == [pending]
+
+    pending.status, pending.dedupe_key = "succeeded", None
+    db.commit()
+    lifecycle._finalize(db, [exam_id])
+    assert len(finalize_jobs(db, exam_id)) == 2
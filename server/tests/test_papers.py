@@ -0,0 +1,101 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.exams import papers
+from app.exams.schemas import QuestionResponse
+
+from conftest import bearer
+
+
+def paper_exam(**options):
+    values = {
+        "id": 1,
+        "updated_at": datetime(2026, 1, 1),
+        "paper_seed": 0,
+        "shuffle_questions": False,
+        "shuffle_options": False,
+        "questions_per_student": None,
+    }
+    return SimpleNamespace(**(values | options))
+
+
+def pool(size, options=4):
+    return [
+        QuestionResponse(
+            id=id,
+            question_text=f"Question {id}",
+            marks=1,
+            correct_answer="0",
+            options=[str(i) for i in range(options)],
+        )
+        for id in range(1, size + 1)
+    ]
+
+
+def test_papers_are_deterministic_per_student():
+    exam = paper_exam(shuffle_questions=True, shuffle_options=True)
+    questions = pool(20)
+    first = papers.student_questions(exam, 7, questions)
+    papers._orders.clear()
+    papers._options.clear()
+    assert papers.student_questions(exam, 7, questions) == first
+    assert papers.student_questions(exam, 8, questions) != first
+    assert sorted(q.id for q in first) == list(range(1, 21))
+
+
+def test_seed_changes_the_paper():
+    questions = pool(20)
+    first = papers.student_questions(paper_exam(shuffle_questions=True), 7, questions)
+    reseeded = paper_exam(shuffle_questions=True, paper_seed=1)
+    assert papers.student_questions(reseeded, 7, questions) != first
+
+
+def test_sampled_papers_keep_pool_order():
+    exam = paper_exam(questions_per_student=5)
+    order = papers.question_order(exam, 7, 20)
+    assert len(order) == 5 and list(order) == sorted(order)
+    assert all(papers.in_student_paper(exam, 7, 20, index) for index in order)
+    assert sum(papers.in_student_paper(exam, 7, 20, i) for i in range(20)) == 5
+
+
+def test_option_orders_follow_exam_edits():
+    exam = paper_exam(id=2, shuffle_options=True)
+    assert [len(perm) for perm in papers.option_orders(exam, 7, (3, 4))] == [3, 4]
+    # The cache is keyed on the exam version, not on the option counts
+    exam.updated_at = datetime(2026, 1, 2)
+    assert [len(perm) for perm in papers.option_orders(exam, 7, (5,))] == [5]
+
+
+def test_questions_with_many_options():
+    exam = paper_exam(id=3, shuffle_options=True)
+    (question,) = papers.student_questions(exam, 7, pool(1, options=300))
+    assert sorted(question.options, key=int) == [str(i) for i in range(300)]
+
+
+def test_students_get_their_own_paper(client, faculty, student, exam):
+    created = exam(faculty(), questions=10, shuffle_questions=True, paper_seed=5)
+    first, second = student(), student()
+
+    def paper(who):
+        response = client.get(f"/api/exams/{created['id']}", headers=bearer(who["tokens"]))
+        assert response.status_code == 200
+        return [q["id"] for q in response.json()["questions"]]
+
+    assert paper(first) == paper(first)
+    assert sorted(paper(first)) == sorted(q["id"] for q in created["questions"])
+    assert paper(first) != paper(second)
+
+
+def test_students_answer_only_questions_dealt_to_them(client, faculty, student, exam, submit):
+    created = exam(faculty(), questions=10, questions_per_student=3)
+    me = student()
+    response = client.get(f"/api/exams/{created['id']}", headers=bearer(me["tokens"]))
+    dealt = {q["id"] for q in response.json()["questions"]}
+    assert len(dealt) == 3
+
+    undealt = next(
+        index for index, q in enumerate(created["questions"]) if q["id"] not in dealt
+    )
+    assert submit(me, created, question=undealt).status_code == 400
+    index = next(i for i, q in enumerate(created["questions"]) if q["id"] in dealt)
+    assert submit(me, created, question=index).status_code == 200
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+from app.auth import refresh
+from app.auth.models import RefreshToken
+
+from conftest import bearer
+
+
+def renew(client, token):
+    return client.post("/api/auth/refresh", json={"refresh_token": token})
+
+
+def test_refresh_rotates_the_token(client, student):
+    me = student()
+    response = renew(client, me["tokens"]["refresh_token"])
+    assert response.status_code == 200
+    tokens = response.json()
+    assert tokens["refresh_token"] != me["tokens"]["refresh_token"]
+    assert client.get("/api/users/me", headers=bearer(tokens)).json()["id"] == me["id"]
+    assert renew(client, tokens["refresh_token"]).status_code == 200
+
+
+def test_reusing_a_token_revokes_its_session(client, student):
+    me = student()
+    first = me["tokens"]["refresh_token"]
+    second = renew(client, first).json()["refresh_token"]
+
+    assert renew(client, first).status_code == 401
+    # The thief and the client alike have to log in again
+    assert renew(client, second).status_code == 401
+
+
+def test_reuse_leaves_other_sessions_alone(client, student):
+    me = student()
+    other = client.post(
+        "/api/auth/token", data={"username": me["roll_number"], "password": "secret"}
+    ).json()
+    first = me["tokens"]["refresh_token"]
+    renew(client, first)
+    renew(client, first)
+    assert renew(client, other["refresh_token"]).status_code == 200
+
+
+def test_faculty_tokens_rotate(client, exam):
+    client.post(
+        "/api/faculty/signup",
+        json={"email": "rotating@exam.io", "name": "Faculty", "password": "secret"},
+    )
+    tokens = client.post(
+        "/api/faculty/login", data={"username": "rotating@exam.io", "password": "secret"}
+    ).json()
+    renewed = renew(client, tokens["refresh_token"]).json()
+    # The new access token still names the faculty member
+    assert exam(bearer(renewed))["title"] == "Exam"
+
+
+def test_expired_and_unknown_tokens(client, db, student):
+    me = student()
+    token = me["tokens"]["refresh_token"]
+    db.query(RefreshToken).filter(
+        RefreshToken.token_hash == refresh.token_hash(token)
+    ).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    assert renew(client, token).status_code == 401
+    assert renew(client, "not-a-token").status_code == 401
+    assert refresh.purge(db) >= 1
+
+
+def test_logout(client, student):
+    me = student()
+    again = client.post(
+        "/api/auth/token", data={"username": me["roll_number"], "password": "secret"}
+    ).json()
+
+    response = client.post(
+        "/api/auth/logout", json={"refresh_token": me["tokens"]["refresh_token"]}
+    )
+    assert response.status_code == 204
+    assert renew(client, me["tokens"]["refresh_token"]).status_code == 401
+    assert renew(client, again["refresh_token"]).status_code == 200
+
+
+def test_logout_everywhere(client, student):
+    me = student()
+    again = client.post(
+        "/api/auth/token", data={"username": me["roll_number"], "password": "secret"}
+    ).json()
+
+    client.post(
+        "/api/auth/logout",
+        json={"refresh_token": me["tokens"]["refresh_token"], "everywhere": True},
+    )
+    assert renew(client, again["refresh_token"]).status_code == 401
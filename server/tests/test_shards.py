@@ -0,0 +1,88 @@
+from app.exams import models, shards
+
+
+def live_rows(exam_id, shard):
+    live = shards.session(shard)
+    try:
+        submissions = (
+            live.query(models.ExamSubmission.id)
+            .filter(models.ExamSubmission.exam_id == exam_id)
+            .all()
+        )
+        ids = [submission_id for (submission_id,) in submissions]
+        answers = (
+            live.query(models.AnswerSubmission.id)
+            .filter(models.AnswerSubmission.submission_id.in_(ids))
+            .all()
+        )
+        return sorted(ids), sorted(answer_id for (answer_id,) in answers)
+    finally:
+        live.close()
+
+
+def test_submissions_go_to_the_exam_shard(faculty, student, exam, submit):
+    headers = faculty()
+    created = exam(headers)
+    assert submit(student(), created).status_code == 200
+
+    shard = shards.shard_map.shard_of(created["id"])
+    assert shard == 1 + created["id"] % 2
+    assert len(live_rows(created["id"], shard)[0]) == 1
+    assert live_rows(created["id"], 0) == ([], [])
+
+
+def test_ids_are_unique_across_shards(faculty, student, exam, submit):
+    headers = faculty()
+    first, second = exam(headers), exam(headers)
+    assert shards.shard_map.shard_of(first["id"]) != shards.shard_map.shard_of(
+        second["id"]
+    )
+    for _ in range(3):
+        who = student()
+        for created in (first, second):
+            assert submit(who, created).status_code == 200
+
+    rows = [
+        live_rows(created["id"], shards.shard_map.shard_of(created["id"]))
+        for created in (first, second)
+    ]
+    assert not set(rows[0][0]) & set(rows[1][0])
+    assert not set(rows[0][1]) & set(rows[1][1])
+
+
+def test_move_exam_keeps_ids(client, faculty, student, exam, submit):
+    headers = faculty()
+    created = exam(headers)
+    submit(student(), created)
+    submit(student(), created, answer="b")
+    source = shards.shard_map.shard_of(created["id"])
+    target = 3 - source
+    before = live_rows(created["id"], source)
+
+    assert shards.move_exam(created["id"], target, grace_seconds=0) == 2
+    assert shards.shard_map.shard_of(created["id"]) == target
+    assert live_rows(created["id"], target) == before
+    assert live_rows(created["id"], source) == ([], [])
+
+    marks = []
+    for submission_id in before[0]:
+        details = client.get(
+            f"/api/exams/{created['id']}/submissions/{submission_id}",
+            headers=headers,
+        )
+        assert details.status_code == 200
+        marks += [a["marks_obtained"] for a in details.json()["answers"]]
+    assert marks == [2, 0]
+    # Moved back, the copy on the old shard goes again
+    assert shards.move_exam(created["id"], source, grace_seconds=0) == 2
+    assert live_rows(created["id"], source) == before
+
+
+def test_plan_rebalance_moves_largest_exams_first():
+    sizes = [{}, {1: 10, 2: 4, 3: 2}, {}]
+    moves = shards.plan_rebalance(sizes, lambda exam_id: True)
+    assert moves == [(1, 1, 0)]
+    assert shards.plan_rebalance(sizes, lambda exam_id: exam_id != 1) == [
+        (2, 1, 0),
+        (3, 1, 2),
+    ]
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+def test_followers_share_the_leaders_result():
+    flight = SingleFlight("test-share")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return 42
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", load)))
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=lambda: results.append(flight.do("k", load)))
+    follower.start()
+    while flight.shared == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert results == [42, 42]
+    assert calls == [1]
+
+
+def test_followers_share_the_leaders_exception():
+    flight = SingleFlight("test-error")
+
+    async def main():
+        started = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        release = threading.Event()
+
+        def load():
+            loop.call_soon_threadsafe(started.set)
+            release.wait()
+            raise ValueError("boom")
+
+        leader = asyncio.create_task(flight.do_async("k", load))
+        await started.wait()
+        follower = asyncio.create_task(flight.do_async("k", load))
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert flight.errors == 1
+
+
+def test_cancelled_leader_hands_over_to_a_follower():
+    flight = SingleFlight("test-cancel")
+
+    async def main():
+        started = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        release = threading.Event()
+        calls = []
+
+        def load():
+            calls.append(1)
+            if len(calls) == 1:
+                loop.call_soon_threadsafe(started.set)
+                release.wait()
+            return len(calls)
+
+        leader = asyncio.create_task(flight.do_async("k", load))
+        await started.wait()
+        follower = asyncio.create_task(flight.do_async("k", load))
+        await asyncio.sleep(0.01)
+        # The leader's client goes away while its load runs
+        leader.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower, calls
+
+    result, calls = asyncio.run(main())
+    # The follower ran the load again instead of raising CancelledError
+    assert result == 2
+    assert calls == [1, 1]
+    assert flight.errors == 0
+    assert flight.stats()["in_flight"] == 0
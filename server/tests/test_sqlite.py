@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.config import settings
+from app.database.sqlite import WriterQueue
+
+
+def test_writer_gives_up_after_the_busy_timeout(monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_BUSY_TIMEOUT_MS", 50)
+    queue = WriterQueue()
+    queue.acquire()
+
+    with pytest.raises(OperationalError, match="database is locked"):
+        queue.acquire()
+    assert queue.stats()["timeouts"] == 1
+    assert queue.waiting == 0
+
+    # The abandoned ticket is skipped: the next writer gets its turn
+    queue.release()
+    queue.acquire()
+    queue.release()
+    assert queue.stats()["waiting"] == 0
+
+
+def test_writers_are_served_in_order():
+    queue = WriterQueue()
+    queue.acquire()
+    served = []
+
+    def write(number):
+        queue.acquire()
+        served.append(number)
+        queue.release()
+
+    threads = []
+    for number in range(3):
+        thread = threading.Thread(target=write, args=(number,))
+        thread.start()
+        threads.append(thread)
+        while queue.waiting != number + 1:
+            pass
+    queue.release()
+    for thread in threads:
+        thread.join()
+    assert served == [0, 1, 2]